@@ -3,12 +3,13 @@ from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 from notifications.middleware import JWTAuthMiddlewareStack
 from notifications.routing import websocket_urlpatterns  # Import your actual websocket URL patterns
+from workouts.routing import websocket_urlpatterns as workout_websocket_urlpatterns
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": JWTAuthMiddlewareStack(
         URLRouter(
-            websocket_urlpatterns
+            websocket_urlpatterns + workout_websocket_urlpatterns
         )
     ),
 })
\ No newline at end of file
@@ -0,0 +1,110 @@
+# config/db_router.py
+import contextvars
+import logging
+import random
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Set while a view marked with read_from_replica runs
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+# Set once the current request wrote to the primary
+_wrote = contextvars.ContextVar('wrote', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def _pin_key(user_id) -> str:
+    return f"db:pinned:{user_id}"
+
+
+def is_pinned(user) -> bool:
+    return bool(user and user.is_authenticated and cache.get(_pin_key(user.id)))
+
+
+def read_from_replica(view):
+    """
+    Lets a read-only view (function or viewset action) read from a replica,
+    unless its user wrote recently and must see their own writes.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if hasattr(arg, 'method'))
+        if request.method not in SAFE_METHODS or not replica_aliases() or is_pinned(request.user):
+            return view(*args, **kwargs)
+        token = _replica_reads.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """
+    Reads inside go to the primary even in replica views. For code that fills
+    caches invalidated on commit: a lagging replica would cache stale rows.
+    """
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary. Reads go to a random replica only inside views
+    marked with read_from_replica, and never after the request wrote or
+    inside a transaction, where they must see uncommitted rows.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not _wrote.get() and not connections['default'].in_atomic_block:
+            replicas = replica_aliases()
+            if replicas:
+                return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so rows from either may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReadYourWritesMiddleware:
+    """
+    After a request that wrote, pins its user to the primary for
+    DATABASE_REPLICA_STICKY_SECONDS, longer than replicas take to catch up,
+    so the next screen shows the post or comment just created.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            user = getattr(request, 'user', None)
+            if _wrote.get() and replica_aliases() and user is not None and user.is_authenticated:
+                cache.set(_pin_key(user.id), True, settings.DATABASE_REPLICA_STICKY_SECONDS)
+            return response
+        finally:
+            _wrote.reset(token)
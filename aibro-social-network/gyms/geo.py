@@ -0,0 +1,153 @@
+# gyms/geo.py
+"""
+Geohash and distance helpers used to index and search gyms by location.
+
+A geohash is a base32 string where every extra character narrows the cell,
+so "all gyms in a cell" is a prefix match on an indexed column.
+"""
+import math
+from typing import Iterable, Optional, Set, Tuple
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+BASE32_INDEX = {char: index for index, char in enumerate(BASE32)}
+
+GEOHASH_PRECISION = 9  # ~5m cells; stored on Gym, searches use shorter prefixes
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value_range, value = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def decode_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lng, max_lat, max_lng) of a geohash cell"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        bits = BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            value_range = lng_range if even else lat_range
+            middle = (value_range[0] + value_range[1]) / 2
+            if bits >> shift & 1:
+                value_range[0] = middle
+            else:
+                value_range[1] = middle
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) of a geohash cell in degrees"""
+    lat_bits = 5 * precision // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def gym_geohash(latitude, longitude) -> str:
+    if latitude is None or longitude is None:
+        return ''
+    return encode(float(latitude), float(longitude))
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lng, max_lat, max_lng) enclosing a circle; longitudes widen with latitude"""
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(latitude))
+    lng_delta = 180.0 if cos_lat < 1e-6 else min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+    return (
+        max(-90.0, latitude - lat_delta),
+        longitude - lng_delta,
+        min(90.0, latitude + lat_delta),
+        longitude + lng_delta,
+    )
+
+
+def estimate_cell_count(box: Tuple[float, float, float, float], precision: int) -> int:
+    """Upper bound of cells_in_box(box, precision), computed without enumerating them"""
+    height, width = cell_size(precision)
+    return (math.ceil((box[2] - box[0]) / height) + 1) * (math.ceil((box[3] - box[1]) / width) + 1)
+
+
+def cells_in_box(box: Tuple[float, float, float, float], precision: int) -> Set[str]:
+    """Every geohash cell of the given precision intersecting a bounding box"""
+    min_lat, min_lng, max_lat, max_lng = box
+    height, width = cell_size(precision)
+    cells = set()
+    lat = min_lat
+    while True:
+        lng = min_lng
+        while True:
+            wrapped = (lng + 180.0) % 360.0 - 180.0
+            cells.add(encode(min(max(lat, -90.0), 90.0 - 1e-9), wrapped, precision))
+            if lng >= max_lng:
+                break
+            lng = min(lng + width, max_lng)
+        if lat >= max_lat:
+            break
+        lat = min(lat + height, max_lat)
+    return cells
+
+
+def covering_prefixes(latitude: float, longitude: float, radius_km: float,
+                      max_cells: int = 16) -> Set[str]:
+    """
+    A small set of geohash prefixes whose cells cover the circle. Uses the
+    longest prefix that keeps the cell count at or below `max_cells`.
+    """
+    box = bounding_box(latitude, longitude, radius_km)
+    best = None
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        # Estimate before enumerating so wide searches never build huge sets
+        if estimate_cell_count(box, precision) > max_cells:
+            break
+        best = cells_in_box(box, precision)
+    return best or {''}
+
+
+def parse_point(value: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Parse "lat,lng"; returns None for anything else"""
+    if not value or value.count(',') != 1:
+        return None
+    try:
+        lat, lng = (float(part) for part in value.split(','))
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def prefix_filter(prefixes: Iterable[str], field: str = 'geohash'):
+    """Q object matching rows whose geohash starts with any of the prefixes"""
+    from django.db.models import Q
+
+    query = Q()
+    for prefix in sorted(prefixes):
+        query |= Q(**{f'{field}__startswith': prefix})
+    return query
@@ -0,0 +1,161 @@
+# gyms/geocoding.py
+import hashlib
+import logging
+import re
+import unicodedata
+from datetime import timedelta
+from typing import Callable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .geo import parse_point
+from .models import GazetteerPlace, GeocodeCacheEntry
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL = timedelta(days=30)
+NEGATIVE_TTL = timedelta(days=1)  # addresses the geocoder could not resolve are retried sooner
+MEMORY_TTL = 24 * 3600  # seconds a resolved address stays in the shared cache
+NOT_FOUND = 'not_found'
+IGNORED_PARTS = {'france'}  # remote lookups are already biased to France
+POSTCODE_RE = re.compile(r'\b\d{5}\b')
+
+
+def normalize_part(text: str) -> str:
+    """Lowercase, accent-free words: 'Saint-Étienne ' -> 'saint etienne'"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return ' '.join(re.sub(r'[^\w]+', ' ', text).split())
+
+
+def normalize_address(address: str) -> str:
+    """Comma-separated normalized parts, so equivalent spellings share cache entries"""
+    parts = [normalize_part(part) for part in (address or '').split(',')]
+    return ', '.join(part for part in parts if part and part not in IGNORED_PARTS)[:255]
+
+
+class Geocoder:
+    """
+    Resolves free-text locations in order of cost: coordinates, the shared
+    cache, the persistent geocoding cache, the offline gazetteer and finally
+    the remote geocoder, whose answers (including misses) are kept with a TTL.
+    """
+
+    @classmethod
+    def _memory_key(cls, query: str) -> str:
+        return f"geocode:{hashlib.md5(query.encode()).hexdigest()}"
+
+    @classmethod
+    def geocode(cls, address: str,
+                remote: Optional[Callable[[str], Optional[Tuple[float, float]]]] = None
+                ) -> Optional[Tuple[float, float]]:
+        """
+        Coordinates for an address, or None. Without `remote` only offline
+        sources are used, so the call never leaves the process and database;
+        street addresses then fall back to the gazetteer entry of their
+        postcode or city.
+        """
+        point = parse_point(address)
+        if point:
+            return point
+
+        query = normalize_address(address)
+        if not query:
+            return None
+
+        memory_key = cls._memory_key(query)
+        cached = cache.get(memory_key)
+        if cached == NOT_FOUND:
+            return None
+        if cached is not None:
+            return tuple(cached)
+
+        found, coords = cls._stored(query)
+        if not found:
+            coords = cls.gazetteer_lookup(query)
+            found = coords is not None
+        if found:
+            cache.set(memory_key, coords or NOT_FOUND, MEMORY_TTL)
+            return coords
+
+        if remote is None:
+            return cls.gazetteer_lookup(query, partial=True)
+
+        try:
+            coords = remote(address)
+        except Exception as e:
+            logger.error(f"Error geocoding address: {e}")
+            return cls.gazetteer_lookup(query, partial=True)
+        cls.store(query, coords)
+        cache.set(memory_key, coords or NOT_FOUND, MEMORY_TTL)
+        return coords
+
+    @classmethod
+    def _stored(cls, query: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """(found, coords) from an unexpired persistent entry"""
+        entry = GeocodeCacheEntry.objects.filter(query=query, expires_at__gt=timezone.now()).first()
+        if entry is None:
+            return False, None
+        if entry.latitude is None or entry.longitude is None:
+            return True, None
+        return True, (float(entry.latitude), float(entry.longitude))
+
+    @classmethod
+    def _candidates(cls, query: str) -> List[str]:
+        """Place names in the query, from the last part (usually the city) backwards"""
+        candidates = []
+        for part in reversed(query.split(', ')):
+            candidates.append(part)
+            without_postcode = ' '.join(POSTCODE_RE.sub(' ', part).split())
+            if without_postcode and without_postcode != part:
+                candidates.append(without_postcode)
+        return list(dict.fromkeys(candidates))
+
+    @classmethod
+    def gazetteer_lookup(cls, query: str, partial: bool = False) -> Optional[Tuple[float, float]]:
+        """
+        Most populated gazetteer place for a query that is only a place name
+        and/or postcode ('lyon', '69003', '69003 lyon'). With partial, a postcode
+        or place name anywhere in a longer address also matches.
+        """
+        places = GazetteerPlace.objects.order_by('-population')
+        postcode = POSTCODE_RE.search(query)
+        name = ' '.join(POSTCODE_RE.sub(' ', query.replace(',', ' ')).split())
+
+        if not partial:
+            if postcode and name:
+                place = places.filter(postcode=postcode.group(), name=name).first()
+            elif postcode:
+                place = places.filter(postcode=postcode.group()).first()
+            else:
+                place = places.filter(name=name).first()
+            return (float(place.latitude), float(place.longitude)) if place else None
+
+        if postcode:
+            place = places.filter(postcode=postcode.group()).first()
+            if place:
+                return float(place.latitude), float(place.longitude)
+        for candidate in cls._candidates(query):
+            place = places.filter(name=candidate).first()
+            if place:
+                return float(place.latitude), float(place.longitude)
+        return None
+
+    @classmethod
+    def store(cls, query: str, coords: Optional[Tuple[float, float]]):
+        """Persist a remote answer; misses are kept for less time"""
+        now = timezone.now()
+        GeocodeCacheEntry.objects.update_or_create(
+            query=query,
+            defaults={
+                'latitude': round(coords[0], 8) if coords else None,
+                'longitude': round(coords[1], 8) if coords else None,
+                'expires_at': now + (CACHE_TTL if coords else NEGATIVE_TTL),
+            },
+        )
+
+    @classmethod
+    def purge_expired(cls) -> int:
+        deleted, _ = GeocodeCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
@@ -0,0 +1,137 @@
+# gyms/ingest.py
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional
+
+from django.db import close_old_connections
+
+from .geo import gym_geohash
+from .models import Gym
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+# Provider-owned fields refreshed when a known gym is seen again; description and
+# equipment are curated locally and never overwritten
+UPSERT_FIELDS = [
+    'name', 'location', 'latitude', 'longitude', 'geohash', 'phone', 'website',
+    'amenities', 'opening_hours', 'photos', 'updated_at',
+]
+
+# One worker: ingestion is background bookkeeping and must not compete with requests
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gym-ingest')
+
+
+def _truncate(value, field_name: str) -> str:
+    return (value or '')[:Gym._meta.get_field(field_name).max_length]
+
+
+def _coordinate(value, places: int = 8) -> Optional[Decimal]:
+    if value is None:
+        return None
+    try:
+        return round(Decimal(str(value)), places)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+class GymIngestService:
+    """Bulk upsert of provider gym results into the local Gym table"""
+
+    @classmethod
+    def build(cls, gym_data: Dict) -> Gym:
+        """Unsaved Gym from a standardized provider result (see providers.py)"""
+        latitude = _coordinate(gym_data.get('latitude'))
+        longitude = _coordinate(gym_data.get('longitude'))
+        website = gym_data.get('website') or ''
+        return Gym(
+            name=_truncate(gym_data.get('name'), 'name'),
+            location=_truncate(gym_data.get('location'), 'location'),
+            description=gym_data.get('description', ''),
+            latitude=latitude,
+            longitude=longitude,
+            # bulk_create skips Gym.save(), so derived fields are set here
+            geohash=gym_geohash(latitude, longitude),
+            phone=_truncate(gym_data.get('phone'), 'phone'),
+            website=website if len(website) <= Gym._meta.get_field('website').max_length else '',
+            external_id=_truncate(gym_data.get('external_id'), 'external_id') or None,
+            source=_truncate(gym_data.get('source') or 'google_places', 'source'),
+            amenities=gym_data.get('amenities') or {},
+            equipment={},
+            opening_hours=gym_data.get('opening_hours') or {},
+            photos=gym_data.get('photos') or [],
+        )
+
+    @classmethod
+    def upsert(cls, gyms_data: Iterable[Dict], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Insert new gyms and refresh known ones, matched on (source, external_id),
+        in one bulk_create per batch. Results without an external id or name are
+        ignored, as are gyms whose name and location already belong to a
+        different gym. Returns the number of rows written.
+        """
+        written, batch = 0, []
+        for gym_data in gyms_data:
+            batch.append(gym_data)
+            if len(batch) >= batch_size:
+                written += cls._upsert_batch(batch)
+                batch = []
+        if batch:
+            written += cls._upsert_batch(batch)
+        return written
+
+    @classmethod
+    def _upsert_batch(cls, gyms_data: List[Dict]) -> int:
+        gyms, keys, places = [], set(), set()
+        for gym_data in gyms_data:
+            gym = cls.build(gym_data)
+            key, place = (gym.source, gym.external_id), (gym.name, gym.location)
+            # A row may only appear once per statement for either unique constraint
+            if not gym.external_id or not gym.name or key in keys or place in places:
+                continue
+            keys.add(key)
+            places.add(place)
+            gyms.append(gym)
+        if not gyms:
+            return 0
+
+        # ON CONFLICT takes a single target, so (name, location) clashes with
+        # other gyms are resolved up front instead of failing the whole batch
+        taken = {
+            (name, location): (source, external_id)
+            for name, location, source, external_id in Gym.objects.filter(
+                name__in={gym.name for gym in gyms}, location__in={gym.location for gym in gyms}
+            ).values_list('name', 'location', 'source', 'external_id')
+        }
+        gyms = [
+            gym for gym in gyms
+            if taken.get((gym.name, gym.location), (gym.source, gym.external_id)) == (gym.source, gym.external_id)
+        ]
+        if not gyms:
+            return 0
+
+        Gym.objects.bulk_create(
+            gyms,
+            update_conflicts=True,
+            unique_fields=['source', 'external_id'],
+            update_fields=UPSERT_FIELDS,
+        )
+        return len(gyms)
+
+    @classmethod
+    def upsert_async(cls, gyms_data: List[Dict]):
+        """Queue an upsert off the request path, e.g. after an external search"""
+        if gyms_data:
+            _executor.submit(cls._run_upsert, list(gyms_data))
+
+    @classmethod
+    def _run_upsert(cls, gyms_data: List[Dict]):
+        try:
+            written = cls.upsert(gyms_data)
+            logger.debug(f"Ingested {written} external gyms")
+        except Exception as e:
+            logger.error(f"Error ingesting external gyms: {e}")
+        finally:
+            close_old_connections()
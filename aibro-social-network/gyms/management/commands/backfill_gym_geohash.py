@@ -0,0 +1,33 @@
+# gyms/management/commands/backfill_gym_geohash.py
+from django.core.management.base import BaseCommand
+from gyms.geo import gym_geohash
+from gyms.models import Gym
+
+
+class Command(BaseCommand):
+    help = 'Compute the geohash used by nearby searches for every gym with coordinates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of gyms to update in each batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated, batch = 0, []
+        for gym in Gym.objects.only('id', 'latitude', 'longitude', 'geohash').iterator(chunk_size=batch_size):
+            geohash = gym_geohash(gym.latitude, gym.longitude)
+            if geohash != gym.geohash:
+                gym.geohash = geohash
+                batch.append(gym)
+            if len(batch) >= batch_size:
+                Gym.objects.bulk_update(batch, ['geohash'])
+                updated += len(batch)
+                batch = []
+        Gym.objects.bulk_update(batch, ['geohash'])
+        updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Updated the geohash of {updated} gyms'))
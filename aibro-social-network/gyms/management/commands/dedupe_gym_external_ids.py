@@ -0,0 +1,62 @@
+# gyms/management/commands/dedupe_gym_external_ids.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min
+
+from gyms.models import Gym
+
+
+class Command(BaseCommand):
+    help = (
+        'Prepare gyms for the (source, external_id) unique constraint: store blank '
+        'external ids as NULL and merge gyms sharing a provider id into the oldest one. '
+        'Run before migrating the constraint onto existing data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        blank = Gym.objects.filter(external_id='')
+        duplicates = (
+            Gym.objects.exclude(external_id__isnull=True).exclude(external_id='')
+            .values('source', 'external_id')
+            .annotate(gyms=Count('id'), keep_id=Min('id'))
+            .filter(gyms__gt=1)
+        )
+
+        if dry_run:
+            extra = sum(duplicate['gyms'] - 1 for duplicate in duplicates)
+            self.stdout.write(
+                f'Would clear {blank.count()} blank external ids and merge '
+                f'{extra} duplicate gyms into {len(duplicates)}'
+            )
+            return
+
+        with transaction.atomic():
+            cleared = blank.update(external_id=None)
+            merged = 0
+            for duplicate in duplicates:
+                duplicate_ids = list(
+                    Gym.objects.filter(source=duplicate['source'], external_id=duplicate['external_id'])
+                    .exclude(id=duplicate['keep_id']).values_list('id', flat=True)
+                )
+                self._repoint(duplicate_ids, duplicate['keep_id'])
+                merged += Gym.objects.filter(id__in=duplicate_ids).delete()[1].get(Gym._meta.label, 0)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Cleared {cleared} blank external ids and merged {merged} duplicate gyms'
+        ))
+
+    def _repoint(self, duplicate_ids, keep_id):
+        """Move users, logs and group workouts of the duplicates to the gym that is kept"""
+        for relation in Gym._meta.related_objects:
+            if relation.one_to_many:
+                relation.related_model._base_manager.filter(
+                    **{f'{relation.field.name}__in': duplicate_ids}
+                ).update(**{relation.field.name: keep_id})
@@ -0,0 +1,26 @@
+# gyms/management/commands/gym_tile_cache_stats.py
+from django.core.management.base import BaseCommand
+from gyms.tile_cache import GymTileCache
+
+
+class Command(BaseCommand):
+    help = 'Report the hit ratio of the external gym search tile cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after reporting them',
+        )
+
+    def handle(self, *args, **options):
+        stats = GymTileCache.stats()
+        self.stdout.write(
+            f"Tile lookups: {stats['hits'] + stats['misses']} "
+            f"(hits: {stats['hits']}, misses: {stats['misses']})"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Hit ratio: {stats['hit_ratio']:.1%}"))
+
+        if options['reset']:
+            GymTileCache.reset_stats()
+            self.stdout.write('Counters reset')
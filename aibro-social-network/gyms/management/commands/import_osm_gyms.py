@@ -0,0 +1,112 @@
+# gyms/management/commands/import_osm_gyms.py
+import bz2
+import gzip
+import json
+import xml.etree.ElementTree as ET
+
+from django.core.management.base import BaseCommand, CommandError
+from gyms.ingest import DEFAULT_BATCH_SIZE, GymIngestService
+from gyms.providers import OverpassProvider
+
+GYM_TAGS = {('amenity', 'gym'), ('leisure', 'fitness_centre')}
+
+
+def open_extract(path):
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def is_gym(tags):
+    return any((key, value) in GYM_TAGS for key, value in tags.items())
+
+
+def json_elements(path):
+    """Elements of an Overpass JSON export (`[out:json]... out center;`)"""
+    with open_extract(path) as extract:
+        data = json.load(extract)
+    for element in data.get('elements', []):
+        if is_gym(element.get('tags', {})):
+            yield element
+
+
+def xml_elements(path):
+    """
+    Gym nodes and ways of an .osm XML extract, streamed in two passes: the first
+    collects gyms and the nodes their ways reference, the second resolves
+    those nodes so each way gets a centre like Overpass `out center`.
+    """
+    ways, refs = [], set()
+    with open_extract(path) as extract:
+        for _, elem in ET.iterparse(extract):
+            if elem.tag == 'node':
+                tags = {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+                if is_gym(tags):
+                    yield {
+                        'type': 'node', 'id': elem.get('id'),
+                        'lat': float(elem.get('lat')), 'lon': float(elem.get('lon')), 'tags': tags,
+                    }
+            elif elem.tag == 'way':
+                tags = {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+                if is_gym(tags):
+                    way_refs = [nd.get('ref') for nd in elem.iter('nd')]
+                    ways.append({'type': 'way', 'id': elem.get('id'), 'refs': way_refs, 'tags': tags})
+                    refs.update(way_refs)
+            if elem.tag in ('node', 'way', 'relation'):
+                elem.clear()
+
+    if not ways:
+        return
+    coordinates = {}
+    with open_extract(path) as extract:
+        for _, elem in ET.iterparse(extract):
+            if elem.tag == 'node':
+                if elem.get('id') in refs:
+                    coordinates[elem.get('id')] = (float(elem.get('lat')), float(elem.get('lon')))
+                elem.clear()
+
+    for way in ways:
+        points = [coordinates[ref] for ref in way.pop('refs') if ref in coordinates]
+        if points:
+            way['center'] = {
+                'lat': sum(lat for lat, _ in points) / len(points),
+                'lon': sum(lon for _, lon in points) / len(points),
+            }
+            yield way
+
+
+class Command(BaseCommand):
+    help = 'Import gyms from an OpenStreetMap extract (.osm XML or Overpass JSON, optionally .gz/.bz2)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the extract file')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of gyms to upsert in each batch',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the gyms found without writing them',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        is_json = path.removesuffix('.bz2').removesuffix('.gz').endswith('.json')
+        elements = json_elements(path) if is_json else xml_elements(path)
+
+        try:
+            gyms = (gym for element in elements for gym in OverpassProvider.process_elements([element]))
+            if options['dry_run']:
+                found = sum(1 for _ in gyms)
+                self.stdout.write(self.style.SUCCESS(f'Found {found} gyms in {path}'))
+                return
+            written = GymIngestService.upsert(gyms, batch_size=options['batch_size'])
+        except (OSError, ValueError, ET.ParseError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {written} gyms from {path}'))
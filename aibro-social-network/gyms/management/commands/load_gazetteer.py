@@ -0,0 +1,105 @@
+# gyms/management/commands/load_gazetteer.py
+import csv
+import io
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from gyms.geocoding import normalize_part
+from gyms.models import GazetteerPlace
+
+# GeoNames dumps (https://download.geonames.org/export/): postal code files have
+# 12 tab-separated columns, city files (cities15000.txt, FR.txt...) have 19
+POSTAL_COLUMNS = 12
+CITY_COLUMNS = 19
+
+
+def read_rows(path):
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            name = next(name for name in archive.namelist() if name.endswith('.txt') and 'readme' not in name.lower())
+            with archive.open(name) as dump:
+                yield from csv.reader(io.TextIOWrapper(dump, encoding='utf-8'), delimiter='\t', quoting=csv.QUOTE_NONE)
+    else:
+        with open(path, encoding='utf-8', newline='') as dump:
+            yield from csv.reader(dump, delimiter='\t', quoting=csv.QUOTE_NONE)
+
+
+def to_place(row, source):
+    if len(row) == POSTAL_COLUMNS:
+        country, postcode, name, latitude, longitude = row[0], row[1], row[2], row[9], row[10]
+        population = 0
+    elif len(row) == CITY_COLUMNS:
+        country, postcode, name, latitude, longitude = row[8], '', row[1], row[4], row[5]
+        population = int(row[14] or 0)
+    else:
+        return None
+    if not name or not latitude or not longitude:
+        return None
+    return GazetteerPlace(
+        name=normalize_part(name)[:200],
+        display_name=name[:200],
+        postcode=postcode[:20],
+        country_code=country[:2],
+        latitude=round(float(latitude), 8),
+        longitude=round(float(longitude), 8),
+        population=population,
+        source=source,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Load the offline geocoding gazetteer from a GeoNames city or postal code dump (.txt or .zip)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the GeoNames dump')
+        parser.add_argument(
+            '--country',
+            action='append',
+            default=[],
+            help='Only load places of this ISO country code (repeatable)',
+        )
+        parser.add_argument(
+            '--source',
+            help='Name recorded on the loaded places; defaults to the file name',
+        )
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Delete places previously loaded from the same source first',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of places to insert in each batch',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        source = (options['source'] or path.rsplit('/', 1)[-1])[:50]
+        countries = {country.upper() for country in options['country']}
+        batch_size = options['batch_size']
+
+        loaded, batch = 0, []
+        try:
+            with transaction.atomic():
+                if options['replace']:
+                    deleted, _ = GazetteerPlace.objects.filter(source=source).delete()
+                    self.stdout.write(f'Deleted {deleted} places from {source}')
+
+                for row in read_rows(path):
+                    place = to_place(row, source)
+                    if place is None or (countries and place.country_code not in countries):
+                        continue
+                    batch.append(place)
+                    if len(batch) >= batch_size:
+                        GazetteerPlace.objects.bulk_create(batch)
+                        loaded += len(batch)
+                        batch = []
+                GazetteerPlace.objects.bulk_create(batch)
+                loaded += len(batch)
+        except (OSError, ValueError, StopIteration, zipfile.BadZipFile) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Loaded {loaded} places from {path}'))
@@ -0,0 +1,11 @@
+# gyms/management/commands/purge_geocode_cache.py
+from django.core.management.base import BaseCommand
+from gyms.geocoding import Geocoder
+
+
+class Command(BaseCommand):
+    help = 'Delete expired entries of the persistent geocoding cache'
+
+    def handle(self, *args, **options):
+        deleted = Geocoder.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired geocoding entries'))
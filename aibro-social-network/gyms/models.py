@@ -1,6 +1,8 @@
 # gyms/models.py - Updated version
 from django.db import models
 
+from .geo import gym_geohash
+
 class Gym(models.Model):
     EQUIPMENT_TYPES = [
         ('cardio', 'Cardio Equipment'),
@@ -18,13 +20,16 @@ class Gym(models.Model):
     # Geographic data (ESSENTIAL for search)
     latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
     longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False, db_index=True,
+                               help_text="Derived from latitude/longitude; prefix searches find nearby gyms")
     
     # Contact info
     phone = models.CharField(max_length=20, blank=True, default='')
     website = models.URLField(blank=True, default='')
     
     # External API tracking
-    external_id = models.CharField(max_length=100, blank=True, default='')
+    # Null for gyms not imported from a provider, so they never collide on (source, external_id)
+    external_id = models.CharField(max_length=100, blank=True, null=True, default=None)
     source = models.CharField(max_length=50, blank=True, default='manual')  # 'openstreetmap', 'google', 'manual'
     
     # Structured data
@@ -40,10 +45,61 @@ class Gym(models.Model):
     class Meta:
         unique_together = ['name', 'location']
         ordering = ['name', 'location']
+        constraints = [
+            # Upsert target of provider imports; also indexes lookups by external id.
+            # Existing databases: run dedupe_gym_external_ids before migrating it
+            models.UniqueConstraint(fields=['source', 'external_id'], name='gym_source_external_id_uniq'),
+        ]
         indexes = [
             models.Index(fields=['latitude', 'longitude']),  # For location searches
             models.Index(fields=['name']),  # For name searches
         ]
 
     def __str__(self):
-        return f"{self.name} - {self.location}"
\ No newline at end of file
+        return f"{self.name} - {self.location}"
+
+    def save(self, *args, **kwargs):
+        self.external_id = self.external_id or None
+        self.geohash = gym_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
+
+class GazetteerPlace(models.Model):
+    """
+    Offline city/postcode coordinates loaded from a local dataset (see the
+    load_gazetteer command), so free-text locations resolve without an API call.
+    """
+    name = models.CharField(max_length=200, help_text="Normalized place name used for lookups")
+    display_name = models.CharField(max_length=200)
+    postcode = models.CharField(max_length=20, blank=True, default='')
+    country_code = models.CharField(max_length=2, blank=True, default='')
+    latitude = models.DecimalField(max_digits=10, decimal_places=8)
+    longitude = models.DecimalField(max_digits=11, decimal_places=8)
+    population = models.PositiveIntegerField(default=0)
+    source = models.CharField(max_length=50, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Ambiguous names resolve to the most populated place
+            models.Index(fields=['name', '-population']),
+            models.Index(fields=['postcode', '-population']),
+        ]
+
+    def __str__(self):
+        return f"{self.display_name} {self.postcode}".strip()
+
+
+class GeocodeCacheEntry(models.Model):
+    """Remote geocoding result for a normalized address, kept until expires_at"""
+    query = models.CharField(max_length=255, unique=True)
+    # Both null when the geocoder found nothing (negative entry)
+    latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.query
@@ -0,0 +1,378 @@
+# gyms/providers.py
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_PLACES_URL = "https://maps.googleapis.com/maps/api/place"
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+DEFAULT_DEADLINE = 6.0  # seconds shared by all providers of one search
+
+
+class GymProviderError(Exception):
+    """A provider answered with an error instead of results"""
+
+
+class GooglePlacesProvider:
+    """Google Places text and nearby search"""
+    name = 'google_places'
+
+    def __init__(self, api_key: str, base_url: str = GOOGLE_PLACES_URL):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    async def search(self, session: aiohttp.ClientSession, query: str,
+                     location: Optional[str], radius: int) -> List[Dict]:
+        if location and not query:
+            url = f"{self.base_url}/nearbysearch/json"
+            params = {'location': location, 'radius': radius, 'type': 'gym', 'key': self.api_key}
+        else:
+            url = f"{self.base_url}/textsearch/json"
+            params = {
+                'query': f"{query} gym fitness center",
+                'key': self.api_key,
+                'region': 'fr',  # Bias results to France
+                'type': 'gym'
+            }
+            if location:
+                params['location'] = location
+                params['radius'] = radius
+
+        async with session.get(url, params=params) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+
+        if data.get('status') not in ('OK', 'ZERO_RESULTS'):
+            # Quota or key errors say nothing about whether there are gyms here
+            raise GymProviderError(f"Places API error: {data.get('status')}")
+        return self.process_results(data.get('results', []))
+
+    def process_results(self, results: List[Dict]) -> List[Dict]:
+        """Process and standardize Places API results"""
+        processed = []
+
+        for place in results:
+            try:
+                # Extract location
+                location = place.get('geometry', {}).get('location', {})
+                lat = location.get('lat')
+                lng = location.get('lng')
+
+                # Build address
+                address = place.get('formatted_address', '')
+                if not address:
+                    address = place.get('vicinity', '')
+
+                gym_data = {
+                    'external_id': place.get('place_id'),
+                    'name': place.get('name', ''),
+                    'location': address,
+                    'latitude': lat,
+                    'longitude': lng,
+                    'description': '',
+                    'phone': '',
+                    'website': '',
+                    'source': 'google_places',
+                    'rating': place.get('rating'),
+                    'user_ratings_total': place.get('user_ratings_total'),
+                    'price_level': place.get('price_level'),
+                    'business_status': place.get('business_status'),
+                    'types': place.get('types', []),
+                    'photos': self.extract_photo_urls(place.get('photos', [])),
+                    'opening_hours': self.extract_opening_hours(place.get('opening_hours')),
+                    'amenities': {}
+                }
+
+                processed.append(gym_data)
+
+            except Exception as e:
+                logger.error(f"Error processing place data: {e}")
+                continue
+
+        return processed
+
+    def extract_photo_urls(self, photos: List[Dict]) -> List[str]:
+        """Extract photo URLs from Places API photos"""
+        if not photos or not self.api_key:
+            return []
+
+        photo_urls = []
+        for photo in photos[:5]:  # Limit to 5 photos
+            photo_reference = photo.get('photo_reference')
+            if photo_reference:
+                url = f"{self.base_url}/photo?maxwidth=400&photoreference={photo_reference}&key={self.api_key}"
+                photo_urls.append(url)
+
+        return photo_urls
+
+    @staticmethod
+    def extract_opening_hours(opening_hours: Dict) -> Dict:
+        """Extract opening hours information"""
+        if not opening_hours:
+            return {}
+
+        return {
+            'open_now': opening_hours.get('open_now'),
+            'weekday_text': opening_hours.get('weekday_text', []),
+            'periods': opening_hours.get('periods', [])
+        }
+
+
+class OverpassProvider:
+    """OpenStreetMap gyms through the Overpass API (free, location searches only)"""
+    name = 'openstreetmap'
+    enabled = True
+
+    def __init__(self, url: str = OVERPASS_URL):
+        self.url = url
+
+    async def search(self, session: aiohttp.ClientSession, query: str,
+                     location: Optional[str], radius: int) -> List[Dict]:
+        if not location:
+            return []
+        lat, lng = map(float, location.split(','))
+        overpass_query = f'[out:json][timeout:5];node["amenity"="gym"](around:{radius},{lat},{lng});out;'
+
+        async with session.post(self.url, data=overpass_query.encode('utf-8'),
+                                headers={'Content-Type': 'text/plain'}) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        return self.process_elements(data.get('elements', []))
+
+    @staticmethod
+    def process_elements(elements: List[Dict]) -> List[Dict]:
+        """Process OpenStreetMap results into standardized format"""
+        processed = []
+
+        for element in elements:
+            try:
+                # Get coordinates
+                if element['type'] == 'node':
+                    lat, lng = element['lat'], element['lon']
+                elif element['type'] == 'way' and 'center' in element:
+                    lat, lng = element['center']['lat'], element['center']['lon']
+                else:
+                    continue
+
+                tags = element.get('tags', {})
+                name = tags.get('name', 'Gym')
+
+                # Build address from OSM tags
+                address_parts = []
+                if tags.get('addr:housenumber'):
+                    address_parts.append(tags['addr:housenumber'])
+                if tags.get('addr:street'):
+                    address_parts.append(tags['addr:street'])
+                if tags.get('addr:city'):
+                    address_parts.append(tags['addr:city'])
+                elif tags.get('addr:town'):
+                    address_parts.append(tags['addr:town'])
+                if tags.get('addr:postcode'):
+                    address_parts.append(tags['addr:postcode'])
+
+                address = ', '.join(address_parts) if address_parts else f"Near {lat:.4f}, {lng:.4f}"
+
+                # Extract amenities and opening hours
+                amenities = {}
+                opening_hours = {}
+
+                if tags.get('opening_hours'):
+                    opening_hours['weekday_text'] = [tags['opening_hours']]
+
+                # Map OSM tags to amenities
+                if tags.get('wheelchair') == 'yes':
+                    amenities['wheelchair_accessible'] = True
+                if tags.get('internet_access'):
+                    amenities['wifi'] = tags['internet_access'] in ['wlan', 'wifi', 'yes']
+                if tags.get('changing_room') == 'yes':
+                    amenities['changing_rooms'] = True
+
+                gym_data = {
+                    'external_id': f"osm_{element['type']}_{element['id']}",
+                    'name': name,
+                    'location': address,
+                    'latitude': lat,
+                    'longitude': lng,
+                    'description': '',
+                    'phone': tags.get('phone', ''),
+                    'website': tags.get('website', ''),
+                    'source': 'openstreetmap',
+                    'amenities': amenities,
+                    'opening_hours': opening_hours,
+                    'photos': [],
+                    'types': [tags.get('leisure', tags.get('amenity', 'gym'))],
+                    'brand': tags.get('brand', ''),
+                }
+
+                processed.append(gym_data)
+
+            except Exception as e:
+                logger.error(f"Error processing OSM element: {e}")
+                continue
+
+        return processed
+
+
+def search_key(query: str, location: Optional[str], radius: int) -> str:
+    """Normalized identity of a search, used to coalesce concurrent identical requests"""
+    normalized = ' '.join((query or '').lower().split())
+    if location:
+        try:
+            lat, lng = map(float, location.split(','))
+            location = f"{lat:.4f},{lng:.4f}"  # ~10m; closer points are the same search
+        except ValueError:
+            location = location.strip().lower()
+    return hashlib.md5(f"{normalized}|{location or ''}|{radius}".encode()).hexdigest()
+
+
+class GymSearchCoordinator:
+    """
+    Runs provider searches concurrently on one background event loop with a
+    pooled HTTP session. Google results are preferred, OSM results are used
+    when Google has nothing, and identical searches already in flight share
+    one result instead of calling the providers again.
+    """
+
+    def __init__(self, providers, deadline: float = DEFAULT_DEADLINE, max_connections: int = 50):
+        self.providers = providers
+        self.deadline = deadline
+        self.max_connections = max_connections
+        self._loop = None
+        self._session = None
+        self._lock = threading.RLock()  # done callbacks may run while it is held
+        self._inflight: Dict[str, Future] = {}
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            providers=[
+                GooglePlacesProvider(
+                    getattr(settings, 'GOOGLE_PLACES_API_KEY', ''),
+                    getattr(settings, 'GOOGLE_PLACES_URL', GOOGLE_PLACES_URL),
+                ),
+                OverpassProvider(getattr(settings, 'OVERPASS_URL', OVERPASS_URL)),
+            ],
+            deadline=getattr(settings, 'GYM_SEARCH_DEADLINE', DEFAULT_DEADLINE),
+        )
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name='gym-search-loop', daemon=True
+                ).start()
+        return self._loop
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily on the loop thread; reused so connections are pooled
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.deadline),
+            )
+        return self._session
+
+    async def _run_provider(self, provider, session, query, location, radius):
+        try:
+            return await provider.search(session, query, location, radius)
+        except Exception as e:
+            logger.warning(f"{provider.name} gym search failed: {e}")
+            return None
+
+    async def search_async(self, query: str, location: Optional[str], radius: int) -> Optional[List[Dict]]:
+        """
+        Query every enabled provider at once and stop waiting at the deadline.
+        Returns None when no provider found gyms and one of them failed or was
+        too slow, so a failure is never mistaken for an area without gyms.
+        """
+        session = await self._get_session()
+        tasks = {
+            asyncio.ensure_future(self._run_provider(provider, session, query, location, radius)): provider
+            for provider in self.providers if provider.enabled
+        }
+        if not tasks:
+            return []
+
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        for task in pending:
+            logger.warning(f"{tasks[task].name} gym search missed the {self.deadline}s deadline")
+            task.cancel()
+
+        results = {tasks[task].name: task.result() for task in done}
+        # Providers are listed in order of preference
+        for provider in self.providers:
+            if results.get(provider.name):
+                return results[provider.name]
+        if pending or any(result is None for result in results.values()):
+            return None
+        return []
+
+    def search(self, query: str, location: Optional[str] = None, radius: int = 50000) -> Optional[List[Dict]]:
+        """Blocking entry point for sync views; waits at most the deadline. None if the search failed"""
+        key = search_key(query, location, radius)
+        loop = self._ensure_loop()
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = asyncio.run_coroutine_threadsafe(self.search_async(query, location, radius), loop)
+                self._inflight[key] = future
+                future.add_done_callback(lambda _: self._forget(key, future))
+
+        try:
+            return future.result(timeout=self.deadline + 1)
+        except FutureTimeoutError:
+            logger.warning("Gym search timed out")
+            return None
+        except Exception as e:
+            logger.warning(f"Gym search failed: {e}")
+            return None
+
+    def search_many(self, searches: List[Tuple[str, Optional[str], int]]) -> List[Optional[List[Dict]]]:
+        """Run several (query, location, radius) searches at once under one deadline; failed ones are None"""
+        if not searches:
+            return []
+        if len(searches) == 1:
+            return [self.search(*searches[0])]
+
+        async def gather():
+            return await asyncio.gather(*(self.search_async(*search) for search in searches))
+
+        future = asyncio.run_coroutine_threadsafe(gather(), self._ensure_loop())
+        try:
+            return future.result(timeout=self.deadline + 1)
+        except FutureTimeoutError:
+            logger.warning("Gym searches timed out")
+            future.cancel()
+        except Exception as e:
+            logger.warning(f"Gym searches failed: {e}")
+        return [None for _ in searches]
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+
+_coordinator = None
+_coordinator_lock = threading.Lock()
+
+
+def get_search_coordinator() -> GymSearchCoordinator:
+    """Process-wide coordinator so the event loop and connection pool are shared"""
+    global _coordinator
+    with _coordinator_lock:
+        if _coordinator is None:
+            _coordinator = GymSearchCoordinator.from_settings()
+        return _coordinator
@@ -0,0 +1,84 @@
+# gyms/search.py
+import math
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+from .geo import EARTH_RADIUS_KM, bounding_box, haversine_km
+from .models import Gym
+
+DEFAULT_RADIUS_M = 50000
+MAX_RADIUS_M = 200000
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def distance_km_expression(latitude: float, longitude: float):
+    """Haversine distance from a point to Gym.latitude/longitude, computed by the database"""
+    gym_lat = Radians(Cast(F('latitude'), FloatField()))
+    gym_lng = Radians(Cast(F('longitude'), FloatField()))
+    lat = math.radians(latitude)
+    half_lat = Sin((gym_lat - Value(lat)) / 2)
+    half_lng = Sin((gym_lng - Value(math.radians(longitude))) / 2)
+    a = Power(half_lat, 2) + Value(math.cos(lat)) * Cos(gym_lat) * Power(half_lng, 2)
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Least(Value(1.0), Sqrt(a)))
+
+
+class LocalGymSearch:
+    """Search the local Gym table by name and/or distance"""
+
+    @classmethod
+    def search(cls, query: str = '', point: Optional[Tuple[float, float]] = None,
+               radius_km: float = DEFAULT_RADIUS_M / 1000):
+        """
+        Gyms matching the query. With a point, gyms are prefiltered on the indexed
+        latitude/longitude columns by bounding box, then ranked by exact distance
+        (annotated as distance_km) and cut at the radius.
+        """
+        queryset = Gym.objects.all()
+        if query:
+            queryset = queryset.filter(name__icontains=query)
+
+        if point is None:
+            return queryset.order_by('name', 'location')
+
+        min_lat, min_lng, max_lat, max_lng = bounding_box(point[0], point[1], radius_km)
+        queryset = queryset.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+        if max_lng - min_lng < 360:
+            # Boxes crossing the antimeridian become two longitude ranges
+            if min_lng < -180:
+                queryset = queryset.filter(Q(longitude__gte=min_lng + 360) | Q(longitude__lte=max_lng))
+            elif max_lng > 180:
+                queryset = queryset.filter(Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng - 360))
+            else:
+                queryset = queryset.filter(longitude__gte=min_lng, longitude__lte=max_lng)
+
+        return queryset.annotate(
+            distance_km=distance_km_expression(point[0], point[1])
+        ).filter(distance_km__lte=radius_km).order_by('distance_km', 'name')
+
+    @classmethod
+    def external_with_distance(cls, external_gyms: List[Dict], point: Optional[Tuple[float, float]],
+                               radius_km: float) -> List[Dict]:
+        """Attach distance_km to provider results and drop those outside the radius"""
+        if point is None:
+            return external_gyms
+        results = []
+        for gym in external_gyms:
+            if gym.get('latitude') is None or gym.get('longitude') is None:
+                continue
+            distance = haversine_km(point[0], point[1], float(gym['latitude']), float(gym['longitude']))
+            if distance <= radius_km:
+                results.append({**gym, 'distance_km': round(distance, 3)})
+        results.sort(key=lambda gym: gym['distance_km'])
+        return results
+
+    @classmethod
+    def merge_by_distance(cls, local_gyms: List[Dict], external_gyms: List[Dict]) -> List[Dict]:
+        """One list ordered by distance; local gyms win ties and keep their name order without a point"""
+        merged = [{**gym, 'is_local': True} for gym in local_gyms]
+        merged += [{**gym, 'is_local': False} for gym in external_gyms]
+        if all(gym.get('distance_km') is not None for gym in merged):
+            merged.sort(key=lambda gym: (gym['distance_km'], not gym['is_local']))
+        return merged
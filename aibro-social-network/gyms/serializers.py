@@ -4,6 +4,7 @@ from .models import Gym
 class GymSerializer(serializers.ModelSerializer):
     member_count = serializers.SerializerMethodField()
     active_users_today = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
     description = serializers.CharField(required=False, allow_blank=True)
     amenities = serializers.JSONField(required=False, default=dict)
     equipment = serializers.JSONField(required=False, default=dict)
@@ -16,7 +17,7 @@ class GymSerializer(serializers.ModelSerializer):
             'id', 'name', 'location', 'description', 'latitude', 'longitude',
             'phone', 'website', 'external_id', 'source',
             'amenities', 'equipment', 'opening_hours', 
-            'photos', 'member_count', 'active_users_today',
+            'photos', 'member_count', 'active_users_today', 'distance_km',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
@@ -26,6 +27,11 @@ class GymSerializer(serializers.ModelSerializer):
 
     def get_active_users_today(self, obj):
         return getattr(obj, 'active_users_today', 0)
+
+    def get_distance_km(self, obj):
+        # Only set by location searches
+        distance = getattr(obj, 'distance_km', None)
+        return round(distance, 3) if distance is not None else None
         
     def to_internal_value(self, data):
         # Ensure default values for JSON fields if not provided
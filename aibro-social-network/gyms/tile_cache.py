@@ -0,0 +1,296 @@
+# gyms/tile_cache.py
+import hashlib
+import logging
+import math
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+
+from .geo import bounding_box, cells_in_box, decode_bounds, encode, estimate_cell_count, haversine_km
+
+logger = logging.getLogger(__name__)
+
+TILE_TTL = 6 * 3600  # seconds a cell's provider results are reused
+NEGATIVE_TTL = 900  # empty cells are retried sooner
+TEXT_PRECISION = 5  # ~5km: text searches from nearby points share a cell
+MAX_TILES = 64
+MAX_FETCH_RADIUS_M = 50000  # Places nearby search rejects larger radii
+TEXT_RADII_M = (1000, 2000, 5000, 10000, 20000, MAX_FETCH_RADIUS_M)  # text search radius buckets
+NEARBY_PAGE_SIZE = 20  # Places nearby search returns at most one page of 20 results per call
+MAX_FETCH_CALLS = 4  # provider calls one nearby search may make on a cold cache
+TILE_PRECISIONS = (6, 5, 4, 3)  # finest first; the first one needing <= MAX_TILES cells is used
+
+STATS_HITS_KEY = 'gym_tiles:stats:hits'
+STATS_MISSES_KEY = 'gym_tiles:stats:misses'
+
+
+def _incr(key, amount=1):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.set(key, amount, None)
+
+
+class GymTileCache:
+    """
+    Caches external gym results per geohash cell instead of per raw location
+    string, so searches from nearby points reuse the same provider calls.
+    """
+
+    @classmethod
+    def tile_precision(cls, box) -> int:
+        for precision in TILE_PRECISIONS:
+            # Estimated, so wide boxes never enumerate their fine cells
+            if estimate_cell_count(box, precision) <= MAX_TILES:
+                return precision
+        return TILE_PRECISIONS[-1]
+
+    @classmethod
+    def _tile_key(cls, cell: str) -> str:
+        return f"gym_tiles:nearby:{cell}"
+
+    @classmethod
+    def _circle_key(cls, location: str, radius_m: int) -> str:
+        return f"gym_tiles:circle:{location}:{radius_m}"
+
+    @classmethod
+    def _text_key(cls, query: str, cell: str, radius_m: int) -> str:
+        digest = hashlib.md5(' '.join(query.lower().split()).encode()).hexdigest()
+        return f"gym_tiles:text:{digest}:{cell}:{radius_m}"
+
+    @classmethod
+    def _text_radius(cls, radius_m: int) -> int:
+        """Smallest bucket covering radius_m, so close radii share a cache entry"""
+        return next((bucket for bucket in TEXT_RADII_M if bucket >= radius_m), MAX_FETCH_RADIUS_M)
+
+    @classmethod
+    def _covering_circle(cls, cells) -> Tuple[Tuple[float, float], float]:
+        """Centre and radius (km) of a circle containing every given cell"""
+        bounds = [decode_bounds(cell) for cell in cells]
+        min_lat = min(b[0] for b in bounds)
+        min_lng = min(b[1] for b in bounds)
+        max_lat = max(b[2] for b in bounds)
+        max_lng = max(b[3] for b in bounds)
+        centre = ((min_lat + max_lat) / 2, (min_lng + max_lng) / 2)
+        radius_km = max(
+            haversine_km(centre[0], centre[1], lat, lng)
+            for lat in (min_lat, max_lat) for lng in (min_lng, max_lng)
+        )
+        return centre, radius_km
+
+    @classmethod
+    def _cell_inside(cls, cell: str, point: Tuple[float, float], radius_km: float) -> bool:
+        """True if the whole cell lies within the circle"""
+        min_lat, min_lng, max_lat, max_lng = decode_bounds(cell)
+        return all(
+            haversine_km(point[0], point[1], lat, lng) <= radius_km + 1e-6
+            for lat in (min_lat, max_lat) for lng in (min_lng, max_lng)
+        )
+
+    @classmethod
+    def _cell_intersects(cls, cell: str, point: Tuple[float, float], radius_km: float) -> bool:
+        """True if any part of the cell lies within the circle"""
+        min_lat, min_lng, max_lat, max_lng = decode_bounds(cell)
+        lng = point[1]
+        if not min_lng <= lng <= max_lng:
+            # Compare against the cell edge nearest in longitude, across the antimeridian too
+            lng = min((min_lng, max_lng), key=lambda edge: abs((edge - point[1] + 180) % 360 - 180))
+        lat = min(max(point[0], min_lat), max_lat)
+        return haversine_km(point[0], point[1], lat, lng) <= radius_km
+
+    @classmethod
+    def _fetch_groups(cls, cells: List[str], prefix_len: int = 0):
+        """
+        Split cells into groups small enough for one provider call each, as
+        (centre, radius_m, cells). Neighbouring cells share a geohash prefix.
+        """
+        centre, radius_km = cls._covering_circle(cells)
+        radius_m = int(math.ceil(radius_km * 1000))
+        if radius_m <= MAX_FETCH_RADIUS_M or len(cells) == 1:
+            return [(centre, min(radius_m, MAX_FETCH_RADIUS_M), cells)]
+        groups: Dict[str, List[str]] = {}
+        for cell in cells:
+            groups.setdefault(cell[:prefix_len + 1], []).append(cell)
+        return [
+            fetch_group
+            for group in groups.values()
+            for fetch_group in cls._fetch_groups(group, prefix_len + 1)
+        ]
+
+    @classmethod
+    def _split(cls, cells: List[str]):
+        """Fetch groups of smaller circles, one per geohash prefix a level below the shared one"""
+        prefix_len = len(os.path.commonprefix(cells)) + 1
+        groups: Dict[str, List[str]] = {}
+        for cell in cells:
+            groups.setdefault(cell[:prefix_len], []).append(cell)
+        return [
+            fetch_group
+            for group in groups.values()
+            for fetch_group in cls._fetch_groups(group, prefix_len)
+        ]
+
+    @classmethod
+    def nearby(cls, point: Tuple[float, float], radius_m: int,
+               fetch: Callable[[List[Tuple[str, int]]], List[Optional[List[Dict]]]]) -> List[Dict]:
+        """
+        Gyms within radius_m of point, served from the union of the geohash cells
+        covering the search circle. Missing cells are fetched with
+        `fetch([(location, radius), ...])`, returning one result list per circle
+        or None for a failed call, and stored per cell; cells with no gyms are
+        cached too, for less time. Cells of failed calls are left uncached.
+        """
+        radius_km = radius_m / 1000
+        box = bounding_box(point[0], point[1], radius_km)
+        precision = cls.tile_precision(box)
+        cells = [cell for cell in cells_in_box(box, precision) if cls._cell_intersects(cell, point, radius_km)]
+        keys = {cls._tile_key(cell): cell for cell in cells}
+        cached = cache.get_many(list(keys))
+        missing = [keys[key] for key in keys if key not in cached]
+
+        _incr(STATS_HITS_KEY, len(cells) - len(missing))
+        _incr(STATS_MISSES_KEY, len(missing))
+
+        gyms = [gym for cell_gyms in cached.values() for gym in cell_gyms]
+        if missing:
+            gyms.extend(cls._fetch_missing(sorted(missing), point, precision, fetch))
+        return cls._within(gyms, point, radius_km)
+
+    @classmethod
+    def _fetch_missing(cls, missing: List[str], point, precision, fetch) -> List[Dict]:
+        """
+        One provider call for the circle around every missing cell, its results
+        spread into the cells it fully covers. Only if that call filled a page,
+        and so may have left gyms out, are the missing cells fetched again as
+        smaller circles, nearest first, up to MAX_FETCH_CALLS calls in total.
+        Cells not covered by a complete answer stay uncached.
+        """
+        centre, radius_km = cls._covering_circle(missing)
+        first = (centre, min(int(math.ceil(radius_km * 1000)), MAX_FETCH_RADIUS_M), missing)
+        fetched = cls._fetch_and_store([first], precision, fetch)
+        results = list(fetched[0] or [])
+        if len(results) < NEARBY_PAGE_SIZE or len(missing) == 1:
+            return results
+
+        groups = sorted(
+            cls._split(missing),
+            key=lambda group: haversine_km(point[0], point[1], group[0][0], group[0][1]),
+        )[:MAX_FETCH_CALLS - 1]
+        for group_results in cls._fetch_and_store(groups, precision, fetch):
+            results.extend(group_results or [])
+        return results
+
+    @classmethod
+    def _fetch_and_store(cls, groups, precision, fetch) -> List[Optional[List[Dict]]]:
+        """
+        Fetch (centre, radius_m, cells) groups at once and store the cells each
+        call fully answered. Every answer is also kept under its circle, so a
+        repeat of the same search reuses calls whose cells could not be stored.
+        """
+        searches = [(f"{centre[0]:.6f},{centre[1]:.6f}", radius_m) for centre, radius_m, _ in groups]
+        circle_keys = [cls._circle_key(*search) for search in searches]
+        answered = cache.get_many(circle_keys)
+        to_fetch = [index for index, key in enumerate(circle_keys) if key not in answered]
+        fetched = [answered.get(key) for key in circle_keys]
+        for index, results in zip(to_fetch, fetch([searches[index] for index in to_fetch]) if to_fetch else []):
+            fetched[index] = results
+            if results is not None:
+                cache.set(circle_keys[index], results, TILE_TTL if results else NEGATIVE_TTL)
+
+        for index in to_fetch:
+            (centre, radius_m, group), results = groups[index], fetched[index]
+            # A failed call, or a full page that may have left gyms out, says nothing about its cells
+            if results is None or len(results) >= NEARBY_PAGE_SIZE:
+                continue
+            # Cells reaching past the call's circle were only partly searched; those stay uncached
+            complete = [cell for cell in group if cls._cell_inside(cell, centre, radius_m / 1000)]
+            cls._store_cells(complete, results, precision)
+        return fetched
+
+    @classmethod
+    def _store_cells(cls, cells, gyms, precision):
+        by_cell: Dict[str, List[Dict]] = {}
+        for gym in gyms:
+            if gym.get('latitude') is None or gym.get('longitude') is None:
+                continue
+            cell = encode(float(gym['latitude']), float(gym['longitude']), precision)
+            by_cell.setdefault(cell, []).append(gym)
+
+        positive, negative = {}, {}
+        for cell in cells:
+            cell_gyms = by_cell.get(cell, [])
+            (positive if cell_gyms else negative)[cls._tile_key(cell)] = cell_gyms
+        if positive:
+            cache.set_many(positive, TILE_TTL)
+        if negative:
+            cache.set_many(negative, NEGATIVE_TTL)
+
+    @classmethod
+    def text(cls, query: str, point: Optional[Tuple[float, float]], radius_m: int,
+             fetch: Callable[[str, Optional[str], int], Optional[List[Dict]]]) -> List[Dict]:
+        """
+        Text search results, shared by every search for the same query from the
+        same cell with a radius in the same bucket. Located results are fetched
+        for the whole bucket and cut down to the caller's own circle.
+        """
+        if not point:
+            return cls._cached_text(cls._text_key(query, '', 0), lambda: fetch(query, None, radius_m))
+
+        cell = encode(point[0], point[1], TEXT_PRECISION)
+        bucket_m = cls._text_radius(radius_m)
+        # Search from the cell centre, far enough that the stored result fits any point of the cell
+        centre, cell_radius_km = cls._covering_circle([cell])
+        fetch_radius_m = min(bucket_m + int(math.ceil(cell_radius_km * 1000)), MAX_FETCH_RADIUS_M)
+        results = cls._cached_text(
+            cls._text_key(query, cell, bucket_m),
+            lambda: fetch(query, f"{centre[0]},{centre[1]}", fetch_radius_m),
+        )
+        return cls._within(results, point, radius_m / 1000)
+
+    @classmethod
+    def _cached_text(cls, key: str, fetch: Callable[[], Optional[List[Dict]]]) -> List[Dict]:
+        results = cache.get(key)
+        if results is not None:
+            _incr(STATS_HITS_KEY)
+            return results
+
+        _incr(STATS_MISSES_KEY)
+        results = fetch()
+        if results is None:
+            return []
+        cache.set(key, results, TILE_TTL if results else NEGATIVE_TTL)
+        return results
+
+    @classmethod
+    def _within(cls, gyms: List[Dict], point, radius_km) -> List[Dict]:
+        """Deduplicate by external id and keep gyms inside the circle, nearest first"""
+        seen, results = set(), []
+        for gym in gyms:
+            if gym.get('latitude') is None or gym.get('longitude') is None:
+                continue
+            external_id = gym.get('external_id')
+            if external_id in seen:
+                continue
+            distance = haversine_km(point[0], point[1], float(gym['latitude']), float(gym['longitude']))
+            if distance <= radius_km:
+                seen.add(external_id)
+                results.append((distance, gym))
+        results.sort(key=lambda item: item[0])
+        return [gym for _, gym in results]
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        hits = cache.get(STATS_HITS_KEY) or 0
+        misses = cache.get(STATS_MISSES_KEY) or 0
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+        }
+
+    @classmethod
+    def reset_stats(cls):
+        cache.delete_many([STATS_HITS_KEY, STATS_MISSES_KEY])
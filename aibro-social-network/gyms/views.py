@@ -3,11 +3,15 @@ from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
+from rest_framework.pagination import PageNumberPagination
 from django.http import JsonResponse
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from .models import Gym
 from .serializers import GymSerializer, GymCreateSerializer
 from .services import GymExternalService
+from .search import LocalGymSearch, DEFAULT_RADIUS_M, MAX_RADIUS_M, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .geocoding import Geocoder
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,9 +29,24 @@ class GymViewSet(ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def save_external_gym(self, request):
-        """Save an external gym to database"""
+        """
+        Save an external gym to database
+        
+        Accepts one gym, or {"gyms": [...]} to upsert a batch of search results.
+        """
         gym_data = request.data
         
+        if isinstance(gym_data.get('gyms'), list):
+            try:
+                saved = GymExternalService().save_gyms_to_database(gym_data['gyms'])
+                return Response({'saved': saved}, status=status.HTTP_200_OK)
+            except Exception as e:
+                logger.error(f"Error saving external gyms: {e}")
+                return Response(
+                    {'error': 'Failed to save gyms'}, 
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+        
         if not gym_data.get('external_id'):
             return Response(
                 {'error': 'external_id is required'}, 
@@ -60,11 +79,18 @@ def search_external_gyms(request):
     Query Parameters:
     - q: Search query (gym name, brand, etc.)
     - location: Address or "lat,lng" for location-based search
-    - radius: Search radius in meters (default 50000)
+    - radius: Search radius in meters (default 50000, capped at MAX_RADIUS_M)
     """
     query = request.GET.get('q', '').strip()
     location_param = request.GET.get('location', '').strip()
-    radius = int(request.GET.get('radius', 50000))
+    
+    try:
+        radius = min(int(request.GET.get('radius', DEFAULT_RADIUS_M)), MAX_RADIUS_M)
+    except ValueError:
+        return Response(
+            {'error': 'radius must be an integer number of meters'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     if not query and not location_param:
         return Response(
@@ -75,24 +101,12 @@ def search_external_gyms(request):
     try:
         service = GymExternalService()
         
-        # If location is provided as address, geocode it
+        # Coordinates are used as is; addresses are geocoded (cached, gazetteer, then API)
         location_coords = None
         if location_param:
-            # Check if it's already coordinates (lat,lng format)
-            if ',' in location_param and len(location_param.split(',')) == 2:
-                try:
-                    lat, lng = map(float, location_param.split(','))
-                    location_coords = f"{lat},{lng}"
-                except ValueError:
-                    # Not coordinates, try geocoding as address
-                    coords = service.geocode_location(location_param)
-                    if coords:
-                        location_coords = f"{coords[0]},{coords[1]}"
-            else:
-                # Geocode the address
-                coords = service.geocode_location(location_param)
-                if coords:
-                    location_coords = f"{coords[0]},{coords[1]}"
+            coords = service.geocode_location(location_param)
+            if coords:
+                location_coords = f"{coords[0]},{coords[1]}"
         
         # Search for gyms
         results = service.search_gyms(
@@ -140,6 +154,11 @@ def get_external_gym_details(request, place_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+class GymSearchPagination(PageNumberPagination):
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def search_all_gyms(request):
@@ -148,66 +167,69 @@ def search_all_gyms(request):
     
     Query Parameters:
     - q: Search query
-    - location: Location for search
+    - location: "lat,lng", or a city/postcode resolved offline, to rank gyms by distance
+    - radius: Search radius in meters (default 50000)
     - include_external: Include external API results (default: true)
+    - page / page_size: Pagination of local results; external results come with the first page
     """
     query = request.GET.get('q', '').strip()
     location = request.GET.get('location', '').strip()
     include_external = request.GET.get('include_external', 'true').lower() == 'true'
     
     try:
-        results = {
-            'local_gyms': [],
-            'external_gyms': [],
-            'total_count': 0
-        }
-        
-        # Search local database
-        if query:
-            local_gyms = Gym.objects.filter(
-                name__icontains=query
-            ).order_by('name')
-        else:
-            local_gyms = Gym.objects.all().order_by('name')
-        
-        serializer = GymSerializer(local_gyms, many=True)
-        results['local_gyms'] = serializer.data
+        radius = min(int(request.GET.get('radius', DEFAULT_RADIUS_M)), MAX_RADIUS_M)
+    except ValueError:
+        return Response(
+            {'error': 'radius must be an integer number of meters'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    radius_km = radius / 1000
+    # Offline only (cache and gazetteer): this endpoint must not wait on a geocoding API
+    point = Geocoder.geocode(location) if location else None
+    
+    local_gyms = LocalGymSearch.search(query=query, point=point, radius_km=radius_km)
+    paginator = GymSearchPagination()
+    page = paginator.paginate_queryset(local_gyms, request)
+    
+    try:
+        local_data = GymSerializer(page, many=True).data
         
-        # Search external API if requested (now with threading support)
-        if include_external and (query or location):
+        external_data = []
+        # External results are not paginated, so only the first page carries them
+        if include_external and (query or point) and not paginator.get_previous_link():
             service = GymExternalService()
-            
-            # Geocode location if provided
-            location_coords = None
-            if location:
-                if ',' in location and len(location.split(',')) == 2:
-                    try:
-                        lat, lng = map(float, location.split(','))
-                        location_coords = f"{lat},{lng}"
-                    except ValueError:
-                        pass  # Skip geocoding for now to avoid blocking
-                else:
-                    pass  # Skip geocoding for now to avoid blocking
-            
+            searched_at = timezone.now()
             external_gyms = service.search_gyms(
                 query=query,
-                location=location_coords
+                location=f"{point[0]},{point[1]}" if point else None,
+                radius=radius
             )
             
-            # Filter out gyms that are already in local database
+            # Filter out gyms that are already in local database; the search itself
+            # ingests new results in the background, and those are not in local_gyms yet
+            external_ids = [gym['external_id'] for gym in external_gyms if gym.get('external_id')]
             local_external_ids = set(
-                gym.external_id for gym in local_gyms 
-                if gym.external_id
+                Gym.objects.filter(
+                    external_id__in=external_ids, created_at__lt=searched_at
+                ).values_list('external_id', flat=True)
+            )
+            external_data = LocalGymSearch.external_with_distance(
+                [gym for gym in external_gyms if gym.get('external_id') not in local_external_ids],
+                point,
+                radius_km
             )
-            
-            results['external_gyms'] = [
-                gym for gym in external_gyms 
-                if gym.get('external_id') not in local_external_ids
-            ]
-        
-        results['total_count'] = len(results['local_gyms'])
         
-        return Response(results)
+        return Response({
+            'local_gyms': local_data,
+            'external_gyms': external_data,
+            'results': LocalGymSearch.merge_by_distance(local_data, external_data),
+            'total_count': paginator.page.paginator.count,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'location': location,
+            'geocoded_location': f"{point[0]},{point[1]}" if point else None,
+            'radius': radius,
+        })
         
     except Exception as e:
         logger.error(f"Error in combined gym search: {e}")
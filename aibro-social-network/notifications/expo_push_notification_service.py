@@ -10,6 +10,9 @@ from .translation_service import translation_service  # Import our translation s
 
 logger = logging.getLogger(__name__)
 
+# Passed as `preferences` when a bulk lookup found no NotificationPreference row
+DEFAULT_PREFERENCES = object()
+
 class ExpoPushNotificationService:
     _instance = None
 
@@ -109,104 +112,22 @@ class ExpoPushNotificationService:
     ) -> bool:
         """Send push notification to user's devices using Expo - FIXED TO TRANSLATE TEXT"""
         try:
-            # Check if user has push notifications enabled
-            if not self._should_send_push_notification(user, notification_type):
-                logger.info(f"Push notifications disabled for user {user.id} or type {notification_type}")
-                return False
-
-            # Get user's device tokens
-            tokens = self.get_user_tokens(user)
-            if not tokens:
-                logger.info(f"No Expo push tokens found for user {user.id}")
-                return False
-
-            logger.info(f"Sending Expo push notification to {len(tokens)} devices for user {user.id}")
-
-            # FIXED: Translate the notification content based on user's language preference
-            if title_key or body_key:
-                translated_content = translation_service.translate_notification(
-                    user=user,
-                    title_key=title_key or f'notifications.{notification_type}.push_title',
-                    body_key=body_key or f'notifications.{notification_type}.push_body',
-                    params=translation_params or {}
-                )
-                notification_title = translated_content['title']
-                notification_body = translated_content['body']
-            else:
-                # Use provided title/body or fallback
-                notification_title = title or "New Notification"
-                notification_body = body or "You have a new notification"
-
-            # Prepare notification data
-            notification_data = data or {}
-            notification_data.update({
-                'notification_type': notification_type or 'general',
-                'timestamp': str(timezone.now().isoformat()),
-            })
-
-            # Add translation support for frontend
-            if title_key:
-                notification_data['title_key'] = title_key
-            if body_key:
-                notification_data['body_key'] = body_key
-            if translation_params:
-                notification_data['translation_params'] = translation_params
-
-            # Debug log the final notification content
-            logger.info(f"📱 Sending notification - Title: '{notification_title}', Body: '{notification_body}'")
-
-            # Create push messages
-            messages = []
-            for token in tokens:
-                # Validate token before sending
-                if not self._is_valid_expo_token(token):
-                    logger.warning(f"Invalid Expo token format, skipping: {token}")
-                    continue
-
-                message = PushMessage(
-                    to=token,
-                    title=notification_title,  # Now contains actual translated text!
-                    body=notification_body,    # Now contains actual translated text!
-                    data=notification_data,
-                    sound='default',
-                    badge=1,
-                    channel_id='default',  # For Android
-                    priority='high' if priority in ['high', 'urgent'] else 'normal'
-                )
-                messages.append(message)
-
+            messages = self.build_messages(
+                user=user,
+                title=title,
+                body=body,
+                title_key=title_key,
+                body_key=body_key,
+                translation_params=translation_params,
+                data=data,
+                notification_type=notification_type,
+                priority=priority
+            )
             if not messages:
-                logger.warning(f"No valid Expo tokens for user {user.id}")
-                return False
-
-            # Send notifications
-            success_count = 0
-            try:
-                # Send messages in chunks to avoid rate limits
-                chunk_size = 100  # Expo recommends max 100 messages per request
-                for i in range(0, len(messages), chunk_size):
-                    chunk = messages[i:i + chunk_size]
-                    tickets = self.push_client.publish_multiple(chunk)
-                    
-                    # Process tickets and handle errors
-                    for j, ticket in enumerate(tickets):
-                        token = chunk[j].to
-                        if ticket.status == 'ok':
-                            success_count += 1
-                            logger.debug(f"Successfully sent to token: {token}")
-                        else:
-                            logger.error(f"Failed to send to token {token}: {ticket.message}")
-                            # Handle specific errors
-                            if ticket.details and ticket.details.get('error') == 'DeviceNotRegistered':
-                                self._handle_invalid_token(user, token)
-
-            except PushServerError as e:
-                logger.error(f"Expo push server error: {e}")
-                return False
-            except Exception as e:
-                logger.error(f"Unexpected error sending Expo notifications: {e}")
                 return False
 
+            logger.info(f"Sending Expo push notification to {len(messages)} devices for user {user.id}")
+            success_count = self.publish_messages(messages, {message.to: user for message in messages})
             logger.info(f"Successfully sent Expo notification to {success_count}/{len(messages)} devices")
             return success_count > 0
 
@@ -214,6 +135,155 @@ class ExpoPushNotificationService:
             logger.error(f"Failed to send Expo push notification: {e}")
             return False
 
+    def build_messages(
+        self,
+        user,
+        title: str = None,
+        body: str = None,
+        title_key: str = None,
+        body_key: str = None,
+        translation_params: Dict = None,
+        data: Optional[Dict] = None,
+        notification_type: str = None,
+        priority: str = 'normal',
+        preferences=None,
+        tokens: Optional[List[str]] = None
+    ) -> List[PushMessage]:
+        """
+        Build the Expo messages for one user's devices without sending them.
+        `preferences` and `tokens` can be passed in when they were loaded in bulk.
+        """
+        # Check if user has push notifications enabled
+        if not self._should_send_push_notification(user, notification_type, preferences):
+            logger.info(f"Push notifications disabled for user {user.id} or type {notification_type}")
+            return []
+
+        # Get user's device tokens
+        if tokens is None:
+            tokens = self.get_user_tokens(user)
+        if not tokens:
+            logger.info(f"No Expo push tokens found for user {user.id}")
+            return []
+
+        # FIXED: Translate the notification content based on user's language preference
+        if title_key or body_key:
+            translated_content = translation_service.translate_notification(
+                user=user,
+                title_key=title_key or f'notifications.{notification_type}.push_title',
+                body_key=body_key or f'notifications.{notification_type}.push_body',
+                params=translation_params or {}
+            )
+            notification_title = translated_content['title']
+            notification_body = translated_content['body']
+        else:
+            # Use provided title/body or fallback
+            notification_title = title or "New Notification"
+            notification_body = body or "You have a new notification"
+
+        # Prepare notification data
+        notification_data = dict(data or {})
+        notification_data.update({
+            'notification_type': notification_type or 'general',
+            'timestamp': str(timezone.now().isoformat()),
+        })
+
+        # Add translation support for frontend
+        if title_key:
+            notification_data['title_key'] = title_key
+        if body_key:
+            notification_data['body_key'] = body_key
+        if translation_params:
+            notification_data['translation_params'] = translation_params
+
+        # Create push messages
+        messages = []
+        for token in tokens:
+            # Validate token before sending
+            if not self._is_valid_expo_token(token):
+                logger.warning(f"Invalid Expo token format, skipping: {token}")
+                continue
+
+            messages.append(PushMessage(
+                to=token,
+                title=notification_title,  # Now contains actual translated text!
+                body=notification_body,    # Now contains actual translated text!
+                data=notification_data,
+                sound='default',
+                badge=1,
+                channel_id='default',  # For Android
+                priority='high' if priority in ['high', 'urgent'] else 'normal'
+            ))
+
+        if not messages:
+            logger.warning(f"No valid Expo tokens for user {user.id}")
+        return messages
+
+    def publish_messages(self, messages: List[PushMessage], users_by_token: Dict) -> int:
+        """
+        Send prepared messages in chunks of 100 (the Expo per-request limit).
+        Returns the number of accepted messages.
+        """
+        success_count = 0
+        chunk_size = 100  # Expo recommends max 100 messages per request
+        try:
+            for i in range(0, len(messages), chunk_size):
+                chunk = messages[i:i + chunk_size]
+                tickets = self.push_client.publish_multiple(chunk)
+
+                # Process tickets and handle errors
+                for j, ticket in enumerate(tickets):
+                    token = chunk[j].to
+                    if ticket.status == 'ok':
+                        success_count += 1
+                        logger.debug(f"Successfully sent to token: {token}")
+                    else:
+                        logger.error(f"Failed to send to token {token}: {ticket.message}")
+                        # Handle specific errors
+                        if ticket.details and ticket.details.get('error') == 'DeviceNotRegistered':
+                            self._handle_invalid_token(users_by_token.get(token), token)
+
+        except PushServerError as e:
+            logger.error(f"Expo push server error: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error sending Expo notifications: {e}")
+        return success_count
+
+    def get_tokens_for_users(self, users) -> Dict[int, List[str]]:
+        """Active Expo push tokens for several users with one query"""
+        tokens = {}
+        for user_id, token in DeviceToken.objects.filter(
+            user__in=users,
+            is_active=True
+        ).values_list('user_id', 'token'):
+            tokens.setdefault(user_id, []).append(token)
+        return tokens
+
+    def send_bulk_messages(self, items: List[Dict]) -> Dict[str, int]:
+        """
+        Send push notifications for several users in shared Expo requests.
+        Each item holds the `send_push_notification` keyword arguments
+        (plus optional `preferences`); device tokens are loaded in one query.
+        """
+        tokens = self.get_tokens_for_users([item['user'] for item in items])
+        messages, users_by_token = [], {}
+        for item in items:
+            user = item['user']
+            try:
+                user_messages = self.build_messages(tokens=tokens.get(user.id, []), **item)
+            except Exception as e:
+                logger.error(f"Failed to build Expo push notification for user {user.id}: {e}")
+                continue
+            messages.extend(user_messages)
+            users_by_token.update({message.to: user for message in user_messages})
+
+        success_count = self.publish_messages(messages, users_by_token) if messages else 0
+        logger.info(f"Successfully sent bulk Expo notification to {success_count}/{len(messages)} devices")
+        return {
+            'success_count': success_count,
+            'failure_count': len(messages) - success_count,
+            'total': len(messages)
+        }
+
     def send_bulk_notification(
         self, 
         users: List, 
@@ -226,29 +296,19 @@ class ExpoPushNotificationService:
         notification_type: str = None
     ) -> Dict[str, int]:
         """Send push notification to multiple users"""
-        success_count = 0
-        failure_count = 0
-        
-        for user in users:
-            if self.send_push_notification(
-                user=user, 
-                title=title, 
-                body=body,
-                title_key=title_key,
-                body_key=body_key,
-                translation_params=translation_params,
-                data=data, 
-                notification_type=notification_type
-            ):
-                success_count += 1
-            else:
-                failure_count += 1
-        
-        return {
-            'success_count': success_count,
-            'failure_count': failure_count,
-            'total': len(users)
-        }
+        return self.send_bulk_messages([
+            {
+                'user': user,
+                'title': title,
+                'body': body,
+                'title_key': title_key,
+                'body_key': body_key,
+                'translation_params': translation_params,
+                'data': data,
+                'notification_type': notification_type,
+            }
+            for user in users
+        ])
 
     def _is_valid_expo_token(self, token: str) -> bool:
         """Validate Expo push token format"""
@@ -263,10 +323,12 @@ class ExpoPushNotificationService:
         logger.warning(f"Marking token as inactive due to DeviceNotRegistered: {token}")
         DeviceToken.objects.filter(user=user, token=token).update(is_active=False)
 
-    def _should_send_push_notification(self, user, notification_type: str) -> bool:
+    def _should_send_push_notification(self, user, notification_type: str, preferences=None) -> bool:
         """Check if push notification should be sent based on user preferences"""
+        if preferences is DEFAULT_PREFERENCES:
+            return True
         try:
-            prefs = NotificationPreference.objects.get(user=user)
+            prefs = preferences or NotificationPreference.objects.get(user=user)
             
             # Check global push notification setting
             if not getattr(prefs, 'push_notifications_enabled', True):
@@ -6,7 +6,7 @@ import json
 from typing import Dict, Any, Optional
 
 from .models import Notification, NotificationPreference, NotificationTemplate
-from .expo_push_notification_service import expo_push_service
+from .expo_push_notification_service import expo_push_service, DEFAULT_PREFERENCES
 from .translation_service import translation_service
 
 class NotificationService:
@@ -358,6 +358,42 @@ class NotificationService:
         """
         Create a new notification with enhanced translation key support
         """
+        notification = cls.build_notification(
+            recipient,
+            notification_type,
+            sender=sender,
+            related_object=related_object,
+            translation_params=translation_params,
+            content=content,
+            priority=priority,
+            metadata=metadata
+        )
+        notification.save()
+        
+        # Send real-time notification
+        cls.send_realtime_notification(notification)
+        
+        # Send push notification
+        cls.send_push_notification(notification)
+        
+        # Send email notification if configured
+        cls.send_email_notification(notification)
+        
+        return notification
+    
+    @classmethod
+    def build_notification(
+        cls,
+        recipient,
+        notification_type: str,
+        sender=None,
+        related_object=None,
+        translation_params: Dict[str, Any] = None,
+        content: str = '',
+        priority: str = 'normal',
+        metadata: Dict[str, Any] = None
+    ):
+        """Prepare an unsaved Notification with its translation keys and parameters"""
         content_type = None
         object_id = None
         
@@ -369,8 +405,7 @@ class NotificationService:
         translation_config = cls.NOTIFICATION_TRANSLATIONS.get(notification_type, {})
         
         # Prepare translation parameters
-        if translation_params is None:
-            translation_params = {}
+        translation_params = dict(translation_params or {})
         
         # Add common parameters
         if sender:
@@ -385,7 +420,7 @@ class NotificationService:
         if related_object:
             translation_params.update(cls._extract_object_params(related_object))
         
-        notification = Notification.objects.create(
+        return Notification(
             recipient=recipient,
             sender=sender,
             notification_type=notification_type,
@@ -398,17 +433,6 @@ class NotificationService:
             priority=priority,
             metadata=metadata or {}
         )
-        
-        # Send real-time notification
-        cls.send_realtime_notification(notification)
-        
-        # Send push notification
-        cls.send_push_notification(notification)
-        
-        # Send email notification if configured
-        cls.send_email_notification(notification)
-        
-        return notification
     
     @classmethod
     def _extract_object_params(cls, obj) -> Dict[str, Any]:
@@ -502,18 +526,15 @@ class NotificationService:
         return params
     
     @classmethod
-    def send_realtime_notification(cls, notification):
+    def send_realtime_notification(cls, notification, preferences=None):
         """Send real-time notification via WebSocket"""
         channel_layer = get_channel_layer()
         
         # Check if user has push notifications enabled for this type
         pref_field = f"push_{cls._get_preference_category(notification.notification_type)}"
-        try:
-            prefs = NotificationPreference.objects.get(user=notification.recipient)
-            if not getattr(prefs, pref_field, True):
-                return
-        except NotificationPreference.DoesNotExist:
-            pass
+        prefs = cls._get_preferences(notification.recipient, preferences)
+        if prefs and not getattr(prefs, pref_field, True):
+            return
         
         # Translate notification for WebSocket (using user's language preference)
         translated_content = translation_service.translate_notification(
@@ -555,38 +576,46 @@ class NotificationService:
             }
         )
     
+    @classmethod
+    def _push_kwargs(cls, notification, preferences=None):
+        """Expo push arguments for a notification, using its push-specific translation keys"""
+        translation_config = cls.NOTIFICATION_TRANSLATIONS.get(notification.notification_type, {})
+        push_title_key = translation_config.get('push_title_key', notification.title_key)
+        push_body_key = translation_config.get('push_body_key', notification.body_key)
+        
+        # Prepare push notification data
+        push_data = {
+            'notification_id': str(notification.id),
+            'notification_type': notification.notification_type,
+            'title_key': push_title_key,
+            'body_key': push_body_key,
+            'translation_params': notification.translation_params,
+            'object_id': str(notification.object_id) if notification.object_id else None,
+            'sender_id': str(notification.sender.id) if notification.sender else None,
+            'priority': notification.priority,
+            'metadata': notification.metadata,
+        }
+        
+        return {
+            'user': notification.recipient,
+            'title_key': push_title_key,
+            'body_key': push_body_key,
+            'translation_params': notification.translation_params,
+            'data': push_data,
+            'notification_type': notification.notification_type,
+            'priority': notification.priority,
+            'preferences': preferences,
+        }
+    
     @classmethod
     def send_push_notification(cls, notification):
         """Send push notification using Expo with translation keys"""
         try:
-            # Get push-specific translation keys
-            translation_config = cls.NOTIFICATION_TRANSLATIONS.get(notification.notification_type, {})
-            push_title_key = translation_config.get('push_title_key', notification.title_key)
-            push_body_key = translation_config.get('push_body_key', notification.body_key)
-            
-            # Prepare push notification data
-            push_data = {
-                'notification_id': str(notification.id),
-                'notification_type': notification.notification_type,
-                'title_key': push_title_key,
-                'body_key': push_body_key,
-                'translation_params': notification.translation_params,
-                'object_id': str(notification.object_id) if notification.object_id else None,
-                'sender_id': str(notification.sender.id) if notification.sender else None,
-                'priority': notification.priority,
-                'metadata': notification.metadata,
-            }
+            push_kwargs = cls._push_kwargs(notification)
+            push_kwargs.pop('preferences')
             
             # Send push notification using translation keys
-            success = expo_push_service.send_push_notification(
-                user=notification.recipient,
-                title_key=push_title_key,
-                body_key=push_body_key,
-                translation_params=notification.translation_params,
-                data=push_data,
-                notification_type=notification.notification_type,
-                priority=notification.priority
-            )
+            success = expo_push_service.send_push_notification(**push_kwargs)
             
             if success:
                 print(f"✅ Expo push notification sent successfully for notification {notification.id}")
@@ -597,19 +626,40 @@ class NotificationService:
             print(f"❌ Error sending Expo push notification: {e}")
     
     @classmethod
-    def send_email_notification(cls, notification):
+    def send_email_notification(cls, notification, preferences=None):
         """Send email notification with translation keys"""
         from django.core.mail import send_mail
+        
+        message = cls.build_email_message(notification, preferences)
+        if message is None:
+            return
+        subject, body, from_email, recipients = message
+        
+        try:
+            send_mail(
+                subject,
+                body,
+                from_email,
+                recipients,
+                fail_silently=True,
+            )
+            print(f"✅ Email notification sent to {notification.recipient.email}")
+        except Exception as e:
+            print(f"❌ Error sending email notification: {e}")
+    
+    @classmethod
+    def build_email_message(cls, notification, preferences=None):
+        """
+        Translate an email notification into a (subject, body, from, [to]) tuple,
+        or None when the recipient opted out of this category
+        """
         from django.conf import settings
         
         # Check if user has email notifications enabled for this type
         pref_field = f"email_{cls._get_preference_category(notification.notification_type)}"
-        try:
-            prefs = NotificationPreference.objects.get(user=notification.recipient)
-            if not getattr(prefs, pref_field, True):
-                return
-        except NotificationPreference.DoesNotExist:
-            pass
+        prefs = cls._get_preferences(notification.recipient, preferences)
+        if prefs and not getattr(prefs, pref_field, True):
+            return None
         
         # Get email-specific translation keys
         translation_config = cls.NOTIFICATION_TRANSLATIONS.get(notification.notification_type, {})
@@ -631,17 +681,16 @@ class NotificationService:
         if notification.content:
             body += f"\n\n{notification.content}"
         
-        try:
-            send_mail(
-                subject,
-                body,
-                settings.DEFAULT_FROM_EMAIL,
-                [notification.recipient.email],
-                fail_silently=True,
-            )
-            print(f"✅ Email notification sent to {notification.recipient.email}")
-        except Exception as e:
-            print(f"❌ Error sending email notification: {e}")
+        return subject, body, settings.DEFAULT_FROM_EMAIL, [notification.recipient.email]
+    
+    @classmethod
+    def _get_preferences(cls, user, preferences=None):
+        """The user's NotificationPreference, or None when they have not saved any"""
+        if preferences is DEFAULT_PREFERENCES:
+            return None
+        if preferences is not None:
+            return preferences
+        return NotificationPreference.objects.filter(user=user).first()
     
     @classmethod
     def _get_preference_category(cls, notification_type: str) -> str:
@@ -724,20 +773,74 @@ class NotificationService:
         return True
     
     @classmethod
-    def bulk_create_notifications(cls, recipients, notification_type, **kwargs):
-        """Create notifications for multiple recipients efficiently"""
-        notifications = []
-        
-        for recipient in recipients:
-            notification = cls.create_notification(
-                recipient=recipient,
-                notification_type=notification_type,
-                **kwargs
-            )
-            notifications.append(notification)
-        
+    def bulk_create_notifications(cls, recipients, notification_type, related_objects=None, **kwargs):
+        """
+        Create notifications for multiple recipients with one insert and dispatch them in bulk.
+        `related_objects` optionally gives a per-recipient related object (same order as recipients).
+        """
+        recipients = list(recipients)
+        if related_objects is not None:
+            kwargs.pop('related_object', None)
+            notifications = [
+                cls.build_notification(recipient, notification_type, related_object=related_object, **kwargs)
+                for recipient, related_object in zip(recipients, related_objects)
+            ]
+        else:
+            notifications = [
+                cls.build_notification(recipient, notification_type, **kwargs)
+                for recipient in recipients
+            ]
+        
+        notifications = Notification.objects.bulk_create(notifications)
+        cls.dispatch_bulk(notifications)
         return notifications
     
+    @classmethod
+    def dispatch_bulk(cls, notifications):
+        """
+        Deliver already-saved notifications: preferences and device tokens are loaded once,
+        push messages share Expo requests and emails share one SMTP connection
+        """
+        from django.core.mail import send_mass_mail
+        
+        if not notifications:
+            return
+        
+        recipients = {notification.recipient_id: notification.recipient for notification in notifications}
+        preferences = {
+            prefs.user_id: prefs
+            for prefs in NotificationPreference.objects.filter(user_id__in=list(recipients))
+        }
+        
+        push_items, emails = [], []
+        for notification in notifications:
+            prefs = preferences.get(notification.recipient_id, DEFAULT_PREFERENCES)
+            try:
+                cls.send_realtime_notification(notification, preferences=prefs)
+            except Exception as e:
+                print(f"❌ Error sending realtime notification: {e}")
+            
+            push_items.append(cls._push_kwargs(notification, prefs))
+            
+            try:
+                email = cls.build_email_message(notification, preferences=prefs)
+            except Exception as e:
+                print(f"❌ Error preparing email notification: {e}")
+                email = None
+            if email is not None:
+                emails.append(email)
+        
+        try:
+            expo_push_service.send_bulk_messages(push_items)
+        except Exception as e:
+            print(f"❌ Error sending bulk Expo push notifications: {e}")
+        
+        if emails:
+            try:
+                send_mass_mail(emails, fail_silently=True)
+            except Exception as e:
+                print(f"❌ Error sending email notifications: {e}")
+    
     @classmethod
     def create_post_reaction_notification(cls, post, user, reaction_type):
         """Specific method for post reaction notifications"""
@@ -209,22 +209,9 @@ def handle_workout_log_creation(sender, instance, created, **kwargs):
     
     user = instance.user
     
-    # 1. Workout milestone notifications
-    workout_count = WorkoutLog.objects.filter(user=user).count()
-    milestones = [10, 25, 50, 100, 200, 500, 1000]
+    # Workout and streak milestones are fired by workouts.streaks.StreakTracker
     
-    if workout_count in milestones:
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type='workout_milestone',
-            related_object=instance,
-            translation_params={
-                'workout_count': workout_count,
-                'milestone': workout_count,
-            }
-        )
-    
-    # 2. Program usage notification (notify program creator when someone uses their program)
+    # 1. Program usage notification (notify program creator when someone uses their program)
     if instance.program and instance.program.creator != user:
         NotificationService.create_notification(
             recipient=instance.program.creator,
@@ -237,7 +224,7 @@ def handle_workout_log_creation(sender, instance, created, **kwargs):
             }
         )
     
-    # 3. Template usage notification (notify template creator when someone uses their template)
+    # 2. Template usage notification (notify template creator when someone uses their template)
     if instance.based_on_instance and hasattr(instance.based_on_instance, 'based_on_template'):
         template = instance.based_on_instance.based_on_template
         if template and template.creator != user:
@@ -252,7 +239,7 @@ def handle_workout_log_creation(sender, instance, created, **kwargs):
                 }
             )
     
-    # 4. Workout partner notifications
+    # 3. Workout partner notifications
     for partner in instance.workout_partners.all():
         if partner != user:
             NotificationService.create_notification(
@@ -266,48 +253,9 @@ def handle_workout_log_creation(sender, instance, created, **kwargs):
                 }
             )
     
-    # 5. Streak milestone detection
-    _check_workout_streak(user, instance)
-    
-    # 6. Personal record detection
+    # 4. Personal record detection
     _check_personal_records(user, instance)
 
-def _check_workout_streak(user, workout_log):
-    """Check for workout streak milestones"""
-    # Get workout logs from the last 30 days
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_logs = WorkoutLog.objects.filter(
-        user=user,
-        date__gte=thirty_days_ago,
-        completed=True
-    ).order_by('-date')
-    
-    # Calculate current streak
-    current_streak = 0
-    current_date = timezone.now().date()
-    
-    for log in recent_logs:
-        log_date = log.date.date()
-        
-        # Check if this log is from today or yesterday (allowing for consecutive days)
-        if (current_date - log_date).days <= current_streak + 1:
-            current_streak += 1
-            current_date = log_date
-        else:
-            break
-    
-    # Check for streak milestones
-    streak_milestones = [3, 7, 14, 30, 60, 100]
-    if current_streak in streak_milestones:
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type='streak_milestone',
-            related_object=workout_log,
-            translation_params={
-                'streak_days': current_streak,
-            }
-        )
-
 def _check_personal_records(user, workout_log):
     """Check for personal records in the workout"""
     from django.db import models
@@ -440,16 +388,9 @@ def handle_workout_vote(sender, instance, created, **kwargs):
 def handle_group_workout_message(sender, instance, created, **kwargs):
     """Handle new messages in group workout chats"""
     if created:
-        # Get all participants except the sender
-        participants = instance.group_workout.participants.filter(
-            status='joined'
-        ).exclude(user=instance.user)
-        
-        # Create notifications for all other participants
-        NotificationService.create_group_workout_message_notification(
-            message=instance,
-            participants=participants
-        )
+        # Participants connected to the chat socket already received the message
+        from workouts.chat import GroupWorkoutChat
+        GroupWorkoutChat.notify_offline(instance)
 
 @receiver(post_save, sender=GroupWorkout)
 def handle_group_workout_updates(sender, instance, created, **kwargs):
@@ -458,32 +399,34 @@ def handle_group_workout_updates(sender, instance, created, **kwargs):
         # Check if status changed to cancelled
         if hasattr(instance, '_previous_status') and instance._previous_status != 'cancelled' and instance.status == 'cancelled':
             # Notify all participants
-            participants = instance.participants.filter(status__in=['invited', 'joined']).exclude(user=instance.creator)
-            for participant in participants:
-                NotificationService.create_notification(
-                    recipient=participant.user,
-                    notification_type='workout_cancelled',
-                    sender=instance.creator,
-                    related_object=instance,
-                    translation_params={
-                        'workout_title': instance.title,
-                    }
-                )
+            participants = instance.participants.filter(status__in=['invited', 'joined']).exclude(
+                user=instance.creator
+            ).select_related('user')
+            NotificationService.bulk_create_notifications(
+                recipients=[participant.user for participant in participants],
+                notification_type='workout_cancelled',
+                sender=instance.creator,
+                related_object=instance,
+                translation_params={
+                    'workout_title': instance.title,
+                }
+            )
         
         # Check if status changed to completed
         elif hasattr(instance, '_previous_status') and instance._previous_status != 'completed' and instance.status == 'completed':
             # Notify all participants
-            participants = instance.participants.filter(status='joined').exclude(user=instance.creator)
-            for participant in participants:
-                NotificationService.create_notification(
-                    recipient=participant.user,
-                    notification_type='workout_completed',
-                    sender=instance.creator,
-                    related_object=instance,
-                    translation_params={
-                        'workout_title': instance.title,
-                    }
-                )
+            participants = instance.participants.filter(status='joined').exclude(
+                user=instance.creator
+            ).select_related('user')
+            NotificationService.bulk_create_notifications(
+                recipients=[participant.user for participant in participants],
+                notification_type='workout_completed',
+                sender=instance.creator,
+                related_object=instance,
+                translation_params={
+                    'workout_title': instance.title,
+                }
+            )
 
 @receiver(pre_save, sender=GroupWorkout)
 def track_group_workout_status_change(sender, instance, **kwargs):
@@ -6,6 +6,7 @@ from rest_framework.views import APIView
 from django.db.models import Q, Count
 from django.utils import timezone
 from datetime import timedelta
+from config.db_router import read_from_replica
 
 from .models import Notification, NotificationPreference, DeviceToken, NotificationGroup
 from .serializers import NotificationSerializer, NotificationPreferenceSerializer, DeviceTokenSerializer
@@ -25,6 +26,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             recipient=self.request.user
         ).select_related('sender').prefetch_related('related_object')
     
+    @read_from_replica
     def list(self, request, *args, **kwargs):
         """Enhanced list with filtering and pagination"""
         queryset = self.filter_queryset(self.get_queryset())
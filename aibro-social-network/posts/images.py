@@ -0,0 +1,154 @@
+# posts/images.py
+import hashlib
+import io
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .storage import BlobReferences, blob_names
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels of each variant, per kind of image; images are never upscaled
+VARIANT_SIZES = {
+    'avatar': {'thumbnail': 96, 'feed': 256, 'full': 512},
+    'post': {'thumbnail': 320, 'feed': 1080, 'full': 2048},
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'variants'
+
+# Which field holds the original and which JSON field its variants, per kind
+SOURCES = {
+    'avatar': ('users.User', 'avatar', 'avatar_variants'),
+    'post': ('posts.Post', 'image', 'image_variants'),
+}
+
+# Resizing is CPU bound; two workers keep it off the request path without starving requests
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-pipeline')
+
+
+def render_variants(data: bytes, kind: str) -> Dict[str, Dict]:
+    """
+    Resize and recompress an image into every variant and format. Returns
+    {variant: {'width', 'height', format: (storage name, bytes)}}; names
+    are derived from the content, so identical uploads share their files.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    with Image.open(io.BytesIO(data)) as original:
+        # Phone photos are stored sideways with an EXIF rotation flag
+        image = ImageOps.exif_transpose(original)
+        if image.mode != 'RGB':
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+
+    rendered = {}
+    for variant, size in VARIANT_SIZES[kind].items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        entry = {'width': resized.width, 'height': resized.height}
+        for extension, (pil_format, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+            name = f"{VARIANTS_DIR}/{digest[:2]}/{digest[:32]}_{variant}.{extension}"
+            entry[extension] = (name, buffer.getvalue())
+        rendered[variant] = entry
+    return rendered
+
+
+def variant_urls(variants: Optional[Dict], request=None) -> Optional[Dict]:
+    """Stored variants as {variant: {'width', 'height', 'webp': url, 'jpeg': url}}"""
+    if not variants or not variants.get('variants'):
+        return None
+    urls = {}
+    for variant, entry in variants['variants'].items():
+        urls[variant] = {'width': entry['width'], 'height': entry['height']}
+        for extension in FORMATS:
+            url = default_storage.url(entry[extension])
+            urls[variant][extension] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+class ImagePipeline:
+    """
+    Produces resized WebP and JPEG variants of avatars and post images.
+    Variants are stored next to the original, which is kept untouched, and
+    recorded in the model's variants field together with the original's name
+    so a replaced upload is detected and reprocessed.
+    """
+
+    @classmethod
+    def needs_processing(cls, instance, kind: str) -> bool:
+        _, field_name, variants_field = SOURCES[kind]
+        source = getattr(instance, field_name)
+        variants = getattr(instance, variants_field) or {}
+        return bool(source) and variants.get('source') != source.name
+
+    @classmethod
+    def process_later(cls, kind: str, pk):
+        """Queue processing once the upload is committed"""
+        transaction.on_commit(lambda: _executor.submit(cls._run, kind, pk))
+
+    @classmethod
+    def _run(cls, kind: str, pk):
+        try:
+            cls.process(kind, pk)
+        except Exception as e:
+            logger.error(f"Error processing {kind} image {pk}: {e}")
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def process(cls, kind: str, pk, force: bool = False) -> bool:
+        """Render and store the variants of one image; returns whether anything was written"""
+        model_label, field_name, variants_field = SOURCES[kind]
+        model = apps.get_model(model_label)
+        instance = model.objects.filter(pk=pk).only('pk', field_name, variants_field).first()
+        if instance is None or not (force or cls.needs_processing(instance, kind)):
+            return False
+
+        source = getattr(instance, field_name)
+        with source.open('rb') as f:
+            data = f.read()
+
+        stored = {}
+        for variant, entry in render_variants(data, kind).items():
+            stored[variant] = {'width': entry['width'], 'height': entry['height']}
+            for extension in FORMATS:
+                name, content = entry[extension]
+                if not default_storage.exists(name):
+                    name = default_storage.save(name, ContentFile(content))
+                stored[variant][extension] = name
+
+        # Only if the original was not replaced meanwhile; update() sends no signals
+        variants = {'source': source.name, 'variants': stored}
+        updated = model.objects.filter(pk=pk, **{field_name: source.name}).update(**{variants_field: variants})
+        if updated:
+            BlobReferences.changed(BlobReferences.names(instance, [variants_field]), Counter(blob_names(variants)))
+            cls._invalidate(kind, pk)
+        return bool(updated)
+
+    @classmethod
+    def _invalidate(cls, kind: str, pk):
+        from users.profile import ProfileService
+        from users.references import UserReferenceHydrator
+        from users.social_graph import SocialGraph
+
+        if kind == 'avatar':
+            # Friends' profiles show the avatar in their friends preview
+            UserReferenceHydrator.invalidate(pk)
+            ProfileService.bump(pk, *SocialGraph.friend_ids(pk))
+        else:
+            from .models import Post
+            ProfileService.bump(Post.objects.filter(pk=pk).values_list('user_id', flat=True).first())
@@ -0,0 +1,132 @@
+# posts/management/commands/audit_query_plans.py
+import json
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from gyms.models import Gym
+from posts.models import Comment, Post
+from workouts.group_workouts import GroupWorkout, GroupWorkoutParticipant
+from workouts.models import ExerciseLog, WorkoutLog
+
+# Hot query shapes, built through the ORM so the SQL matches the current schema and backend
+QUERY_SHAPES = {
+    'posts_of_user': lambda now: Post.objects.filter(user_id=1).order_by('-created_at')[:10],
+    'trending_window': lambda now: Post.objects.filter(created_at__gte=now - timedelta(days=7)),
+    'post_comments': lambda now: Comment.objects.filter(post_id=1, parent__isnull=True).order_by('-created_at'),
+    'comment_replies': lambda now: Comment.objects.filter(post_id=1, parent_id=1).order_by('-created_at'),
+    'workout_logs_of_user': lambda now: WorkoutLog.objects.filter(user_id=1).order_by('-date')[:20],
+    'exercise_history': lambda now: ExerciseLog.objects.filter(workout_id=1, name='Squat'),
+    'due_group_workouts': lambda now: GroupWorkout.objects.filter(
+        status='scheduled', scheduled_time__lte=now
+    ).order_by('scheduled_time'),
+    'user_participations': lambda now: GroupWorkoutParticipant.objects.filter(user_id=1, status='joined'),
+    'gym_by_external_id': lambda now: Gym.objects.filter(source='osm', external_id='node/1'),
+}
+
+# Plan lines reading a whole table: SQLite "SCAN t" without an index, PostgreSQL "Seq Scan on t"
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?!.*\bUSING (?:COVERING )?INDEX\b)(?!CONSTANT ROW)(\S+)'),
+    'postgresql': re.compile(r'Seq Scan on (\S+)'),
+}
+SORT_PATTERN = re.compile(r'USE TEMP B-TREE FOR ORDER BY|Sort Key', re.IGNORECASE)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN on the hot query shapes (and optionally recorded ones) and '
+        'fail when any of them reads a whole table'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shapes',
+            help='JSON file of recorded query shapes: [{"name": ..., "sql": ..., "params": [...]}]',
+        )
+        parser.add_argument(
+            '--builtin',
+            action='store_true',
+            help='Also audit the built-in shapes when --shapes is given',
+        )
+        parser.add_argument(
+            '--allow',
+            default='',
+            help='Comma separated tables whose full scans are expected (e.g. small lookup tables)',
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias to explain against',
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print every plan, not only flagged ones',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'Query plans of {connection.vendor} are not supported')
+        allowed = {table.strip() for table in options['allow'].split(',') if table.strip()}
+
+        shapes = []
+        if options['shapes']:
+            shapes.extend(self._recorded_shapes(options['shapes']))
+        if options['builtin'] or not options['shapes']:
+            now = timezone.now()
+            shapes.extend(
+                (name, None, None, build(now).using(options['database']))
+                for name, build in QUERY_SHAPES.items()
+            )
+
+        flagged = 0
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Empty or small tables make any plan a sequential scan; this
+                # reports a seq scan only where no usable index exists
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                for name, sql, params, queryset in shapes:
+                    plan = self._explain(connection, cursor, sql, params, queryset)
+                    scans = [table.strip('"') for table in pattern.findall(plan)]
+                    scans = [table for table in scans if table not in allowed]
+                    sorts = bool(SORT_PATTERN.search(plan))
+
+                    if scans:
+                        flagged += 1
+                        self.stdout.write(self.style.ERROR(f'{name}: full scan of {", ".join(scans)}'))
+                    elif sorts:
+                        self.stdout.write(self.style.WARNING(f'{name}: sorts without an index'))
+                    else:
+                        self.stdout.write(f'{name}: ok')
+                    if scans or options['verbose_plans']:
+                        self.stdout.write(f'  {plan}'.replace('\n', '\n  '))
+            finally:
+                if connection.vendor == 'postgresql':
+                    cursor.execute('RESET enable_seqscan')
+
+        if flagged:
+            raise CommandError(f'{flagged} of {len(shapes)} query shapes read a whole table')
+        self.stdout.write(self.style.SUCCESS(f'All {len(shapes)} query shapes use indexes'))
+
+    def _recorded_shapes(self, path):
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read query shapes from {path}: {e}')
+        return [
+            (entry.get('name') or f'shape {index}', entry['sql'], entry.get('params') or [], None)
+            for index, entry in enumerate(entries, 1)
+        ]
+
+    def _explain(self, connection, cursor, sql, params, queryset):
+        if queryset is not None:
+            return queryset.explain()
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
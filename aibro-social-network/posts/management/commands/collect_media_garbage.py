@@ -0,0 +1,52 @@
+# posts/management/commands/collect_media_garbage.py
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.storage import GC_GRACE, BlobReferences, ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed media blobs that no post, avatar or workout log references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=GC_GRACE.total_seconds() / 3600,
+            help='Keep unreferenced blobs uploaded more recently than this',
+        )
+        parser.add_argument(
+            '--skip-recount',
+            action='store_true',
+            help='Trust the stored reference counts instead of recounting them from the tables first',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of blobs read per query',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError('The default storage is not ContentAddressedStorage')
+
+        if not options['skip_recount'] and not options['dry_run']:
+            drifted = BlobReferences.recount(options['batch_size'])
+            self.stdout.write(f'Corrected {drifted} reference counts')
+
+        deleted, freed = BlobReferences.collect_garbage(
+            default_storage,
+            grace=timedelta(hours=options['grace_hours']),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {deleted} blobs ({freed / 1024 / 1024:.1f} MiB)'))
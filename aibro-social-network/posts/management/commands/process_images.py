@@ -0,0 +1,99 @@
+# posts/management/commands/process_images.py
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+
+from posts.images import SOURCES, ImagePipeline
+
+
+def _init_worker():
+    # Each worker process opens its own database connections
+    django.setup()
+    connections.close_all()
+
+
+def _process_batch(kind, pks, force):
+    processed = 0
+    failed = []
+    for pk in pks:
+        try:
+            processed += ImagePipeline.process(kind, pk, force=force)
+        except Exception as e:
+            failed.append((f'{kind} {pk}', str(e)))
+    connections.close_all()
+    return processed, failed
+
+
+class Command(BaseCommand):
+    help = 'Generate resized variants of existing avatars and post images in parallel worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=[*SOURCES, 'all'],
+            default='all',
+            help='Which images to process',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of worker processes',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of images handed to a worker at a time',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants of images that already have them',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the images that would be processed',
+        )
+
+    def handle(self, *args, **options):
+        kinds = list(SOURCES) if options['kind'] == 'all' else [options['kind']]
+        batch_size = options['batch_size']
+
+        batches = []
+        for kind in kinds:
+            model_label, field_name, variants_field = SOURCES[kind]
+            queryset = apps.get_model(model_label).objects.exclude(
+                Q(**{f'{field_name}__isnull': True}) | Q(**{field_name: ''})
+            )
+            if options['force']:
+                pks = list(queryset.values_list('pk', flat=True))
+            else:
+                # Unprocessed, or processed from an original that was replaced since
+                pks = [
+                    pk for pk, source, variants in queryset.values_list('pk', field_name, variants_field).iterator()
+                    if (variants or {}).get('source') != source
+                ]
+            self.stdout.write(f'{len(pks)} {kind} images to process')
+            batches.extend((kind, pks[start:start + batch_size]) for start in range(0, len(pks), batch_size))
+
+        if options['dry_run'] or not batches:
+            return
+
+        # Forked workers must not share the parent's open connections
+        connections.close_all()
+        processed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as executor:
+            futures = [executor.submit(_process_batch, kind, pks, options['force']) for kind, pks in batches]
+            for future in as_completed(futures):
+                batch_processed, failed = future.result()
+                processed += batch_processed
+                for image, error in failed:
+                    self.stderr.write(f'Failed to process {image}: {error}')
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} images'))
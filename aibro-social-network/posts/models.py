@@ -1,5 +1,6 @@
 # posts/models.py
 from django.db import models
+from django.utils import timezone
 
 class Post(models.Model):
     POST_TYPES = [
@@ -14,6 +15,8 @@ class Post(models.Model):
     user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='posts')
     content = models.TextField(blank=True)
     image = models.ImageField(upload_to='post_images/', blank=True, null=True)
+    # Resized copies of image, filled in by posts.images.ImagePipeline
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     post_type = models.CharField(max_length=20, choices=POST_TYPES, default='regular')
@@ -39,6 +42,10 @@ class Post(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),  # Profile and feed pages
+            models.Index(fields=['-created_at']),  # Trending window
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s {self.post_type} post - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -77,6 +84,9 @@ class Comment(models.Model):
     
     class Meta:
         ordering = ['-created_at']  # Changed to show newest first
+        indexes = [
+            models.Index(fields=['post', 'parent', '-created_at']),  # Top-level comments and replies
+        ]
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.post}"
@@ -112,4 +122,22 @@ class Like(models.Model):
         unique_together = ['post', 'user']
 
     def __str__(self):
-        return f"Like by {self.user.username} on {self.post}"
\ No newline at end of file
+        return f"Like by {self.user.username} on {self.post}"
+
+
+class MediaBlob(models.Model):
+    """A content-addressed media file, shared by every upload with the same bytes"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    # Model fields currently pointing at the blob, see posts.storage.BlobReferences
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Refreshed whenever the same content is uploaded again, so garbage
+    # collection never deletes a blob an in-flight save is about to reference
+    last_saved_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['ref_count', 'last_saved_at'])]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
@@ -1,5 +1,6 @@
 # posts/serializers.py
 from rest_framework import serializers
+from .images import variant_urls
 from .models import Post, Comment, Like, CommentReaction, PostReaction
 
 
@@ -124,17 +125,21 @@ class OriginalPostSerializer(serializers.ModelSerializer):
     reactions = serializers.SerializerMethodField()
     reactions_count = serializers.SerializerMethodField()
     user_reaction = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
         fields = [
-            'id', 'content', 'image', 'created_at', 'post_type',
+            'id', 'content', 'image', 'image_variants', 'created_at', 'post_type',
             'user_username','user_id', 'user_profile_picture', 'comments',
             'likes_count', 'comments_count', 'workout_log_details', 'program_details',
             'workout_invite_details', 'invited_users_details','group_workout_details',
             'reactions', 'reactions_count', 'user_reaction',
         ]
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image_variants, self.context.get('request'))
+
     def get_reactions(self, obj):
         return PostReactionSerializer(obj.reactions.all(), many=True).data
     
@@ -184,8 +189,8 @@ class OriginalPostSerializer(serializers.ModelSerializer):
 
 
     def get_invited_users_details(self, obj):
-        from users.serializers import UserSerializer
-        return UserSerializer(obj.invited_users.all(), many=True).data
+        from users.references import UserReferenceHydrator
+        return UserReferenceHydrator.hydrate(user.id for user in obj.invited_users.all())
         
 class PostSerializer(serializers.ModelSerializer):
 
@@ -202,6 +207,7 @@ class PostSerializer(serializers.ModelSerializer):
     reactions = serializers.SerializerMethodField()
     reactions_count = serializers.SerializerMethodField()
     user_reaction = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     
     # Additional fields for different post types
     workout_log_details = serializers.SerializerMethodField()
@@ -241,7 +247,7 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = [
-            'id', 'content', 'image', 'created_at', 'post_type',
+            'id', 'content', 'image', 'image_variants', 'created_at', 'post_type',
             'workout_log', 'program',
             'updated_at', 'user_username', 'user_id','user_profile_picture',
             'comments', 'likes_count','comments_count', 'is_liked',
@@ -252,6 +258,9 @@ class PostSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image_variants, self.context.get('request'))
+
     def get_shared_by(self, obj):
         if obj.is_share:
             from users.serializers import UserSerializer
@@ -289,8 +298,8 @@ class PostSerializer(serializers.ModelSerializer):
             return GroupWorkoutSerializer(obj.group_workout, context=self.context).data
         return None
     def get_invited_users_details(self, obj):
-        from users.serializers import UserSerializer
-        return UserSerializer(obj.invited_users.all(), many=True).data
+        from users.references import UserReferenceHydrator
+        return UserReferenceHydrator.hydrate(user.id for user in obj.invited_users.all())
 
 
     def get_likes_count(self, obj):
@@ -302,6 +311,42 @@ class PostSerializer(serializers.ModelSerializer):
             return obj.likes.filter(user=request.user).exists()
         return False
 
+class PostSummarySerializer(serializers.ModelSerializer):
+    """Lightweight post representation for profile lists: no comments, reactions or nested details"""
+    likes_count = serializers.SerializerMethodField()
+    comments_count = serializers.SerializerMethodField()
+    reactions_count = serializers.SerializerMethodField()
+    shares_count = serializers.IntegerField(source='share_count', read_only=True)
+    image_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = [
+            'id', 'content', 'image', 'image_variants', 'created_at', 'post_type',
+            'workout_log', 'program', 'group_workout', 'is_share', 'original_post',
+            'likes_count', 'comments_count', 'reactions_count', 'shares_count',
+        ]
+        read_only_fields = fields
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image_variants, self.context.get('request'))
+
+    # Counts are annotated by list queries; fall back to a query per post otherwise
+    def get_likes_count(self, obj):
+        if hasattr(obj, 'likes_total'):
+            return obj.likes_total
+        return obj.likes.count()
+
+    def get_comments_count(self, obj):
+        if hasattr(obj, 'comments_total'):
+            return obj.comments_total
+        return obj.comments.count()
+
+    def get_reactions_count(self, obj):
+        if hasattr(obj, 'reactions_total'):
+            return obj.reactions_total
+        return obj.reactions.count()
+
 class PostCreateSerializer(serializers.ModelSerializer):
     program_id = serializers.IntegerField(required=False, write_only=True)
     workout_log_id = serializers.IntegerField(required=False, write_only=True)
@@ -0,0 +1,50 @@
+# posts/signals.py
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from users.models import User
+from workouts.models import WorkoutLog
+from .images import ImagePipeline
+from .models import Post
+from .storage import MEDIA_REFERENCES, BlobReferences
+
+UNTRACKED = object()
+
+
+@receiver(post_save, sender=Post)
+def process_post_image(sender, instance, **kwargs):
+    if ImagePipeline.needs_processing(instance, 'post'):
+        ImagePipeline.process_later('post', instance.pk)
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=WorkoutLog)
+def store_previous_blobs(sender, instance, **kwargs):
+    """Remember the blobs a row referenced so reference counts move as a delta"""
+    fields = MEDIA_REFERENCES[sender._meta.label]
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(fields) & set(update_fields):
+        instance._previous_blobs = UNTRACKED
+        return
+    previous = sender.objects.filter(pk=instance.pk).only('pk', *fields).first() if instance.pk else None
+    instance._previous_blobs = BlobReferences.names(previous, fields) if previous else Counter()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=WorkoutLog)
+def count_blob_references(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_blobs', UNTRACKED)
+    if previous is UNTRACKED:
+        return
+    BlobReferences.changed(previous, BlobReferences.names(instance, MEDIA_REFERENCES[sender._meta.label]))
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=WorkoutLog)
+def release_blob_references(sender, instance, **kwargs):
+    BlobReferences.changed(BlobReferences.names(instance, MEDIA_REFERENCES[sender._meta.label]), Counter())
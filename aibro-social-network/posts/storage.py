@@ -0,0 +1,204 @@
+# posts/storage.py
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, Iterable, Tuple
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = 'blobs'
+CHUNK_SIZE = 64 * 1024
+BLOB_NAME_RE = re.compile(r'blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(?:\.[a-z0-9]{1,10})?')
+GC_GRACE = timedelta(hours=24)
+
+# Fields that may hold blob names: file fields, and JSON fields holding names or URLs
+MEDIA_REFERENCES = {
+    'users.User': ['avatar', 'avatar_variants'],
+    'posts.Post': ['image', 'image_variants'],
+    'workouts.WorkoutLog': ['media'],
+}
+
+
+def blob_names(value) -> list:
+    """Blob names found in a file field value or anywhere in a JSON value"""
+    if not value:
+        return []
+    if isinstance(value, FieldFile):
+        value = value.name or ''
+    if not isinstance(value, str):
+        value = json.dumps(value)
+    return BLOB_NAME_RE.findall(value)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every upload under the SHA-256 of its bytes, so identical uploads
+    share one file. Content is streamed to a temporary file in chunks while
+    hashing and only moved into place if no blob with that hash exists yet.
+
+    Blobs are shared, so deleting one through a field is a no-op; blobs no
+    field references any more are removed by collect_media_garbage. Files
+    stored before this backend keep their names and are served as before.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content is hashed in _save
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r'\.[a-z0-9]{1,10}', extension):
+            extension = ''
+
+        temp_dir = self.path(os.path.join(BLOB_DIR, 'tmp'))
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp:
+            try:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+            except Exception:
+                os.unlink(temp.name)
+                raise
+
+        hexdigest = digest.hexdigest()
+        blob_name = f"{BLOB_DIR}/{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{extension}"
+        full_path = self.path(blob_name)
+        if os.path.exists(full_path):
+            os.unlink(temp.name)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(temp.name, full_path)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+
+        BlobReferences.register(blob_name, size)
+        return blob_name
+
+    def delete(self, name):
+        if name and BLOB_NAME_RE.fullmatch(name):
+            return
+        super().delete(name)
+
+
+class BlobReferences:
+    """
+    Reference counts of blobs. Saves and deletes of the models in
+    MEDIA_REFERENCES move counts by deltas after commit; recount() rebuilds
+    them from the tables for drift left by queryset updates or bulk writes.
+    """
+
+    @classmethod
+    def register(cls, name, size):
+        from .models import MediaBlob
+        # An upsert, so concurrent uploads of the same content cannot collide
+        MediaBlob.objects.bulk_create(
+            [MediaBlob(name=name, size=size, last_saved_at=timezone.now())],
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['size', 'last_saved_at'],
+        )
+
+    @classmethod
+    def names(cls, instance, fields: Iterable[str]) -> Counter:
+        return Counter(name for field in fields for name in blob_names(getattr(instance, field)))
+
+    @classmethod
+    def adjust(cls, deltas: Dict[str, int]):
+        """Apply reference count deltas once the current transaction commits"""
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if deltas:
+            transaction.on_commit(lambda: cls._apply(deltas))
+
+    @classmethod
+    def _apply(cls, deltas: Dict[str, int]):
+        from .models import MediaBlob
+
+        by_delta = {}
+        for name, delta in deltas.items():
+            by_delta.setdefault(delta, []).append(name)
+        for delta, names in by_delta.items():
+            MediaBlob.objects.filter(name__in=names).update(ref_count=F('ref_count') + delta)
+
+    @classmethod
+    def changed(cls, previous: Counter, current: Counter):
+        """Move counts from the names a row referenced to the names it references now"""
+        deltas = Counter(current)
+        deltas.subtract(previous)
+        cls.adjust(dict(deltas))
+
+    @classmethod
+    def count(cls) -> Counter:
+        """References of every blob, straight from the referencing tables"""
+        counts = Counter()
+        for model_label, fields in MEDIA_REFERENCES.items():
+            model = apps.get_model(model_label)
+            for values in model.objects.values_list(*fields).iterator():
+                for value in values:
+                    counts.update(blob_names(value))
+        return counts
+
+    @classmethod
+    def recount(cls, batch_size: int = 1000) -> int:
+        """Rewrite every stored count from the tables; returns how many were wrong"""
+        from .models import MediaBlob
+
+        counts = cls.count()
+        drifted = []
+        for blob in MediaBlob.objects.only('id', 'name', 'ref_count').iterator(chunk_size=batch_size):
+            actual = counts.get(blob.name, 0)
+            if blob.ref_count != actual:
+                blob.ref_count = actual
+                drifted.append(blob)
+        MediaBlob.objects.bulk_update(drifted, ['ref_count'], batch_size=batch_size)
+        return len(drifted)
+
+    @classmethod
+    def collect_garbage(cls, storage, grace: timedelta = GC_GRACE, batch_size: int = 1000,
+                        dry_run: bool = False) -> Tuple[int, int]:
+        """
+        Delete unreferenced blobs not saved again within the grace period.
+        Returns (blobs deleted, bytes freed).
+        """
+        from .models import MediaBlob
+
+        garbage = MediaBlob.objects.filter(ref_count__lte=0, last_saved_at__lt=timezone.now() - grace)
+        if dry_run:
+            totals = garbage.aggregate(blobs=Count('id'), size=Sum('size'))
+            return totals['blobs'], totals['size'] or 0
+
+        deleted = freed = 0
+        last_id = 0
+        while True:
+            batch = list(garbage.filter(id__gt=last_id).order_by('id').values_list('id', 'name', 'size')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            for blob_id, name, size in batch:
+                # Conditional delete: skips a blob referenced or uploaded again since it was read
+                if not garbage.filter(id=blob_id).delete()[0]:
+                    continue
+                try:
+                    os.remove(storage.path(name))
+                except FileNotFoundError:
+                    pass
+                deleted += 1
+                freed += size
+        return deleted, freed
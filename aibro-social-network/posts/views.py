@@ -6,6 +6,8 @@ from django.db.models import Count, Q
 from .models import Post, Comment, Like, CommentReaction, PostReaction
 from .serializers import PostSerializer, CommentSerializer, PostCreateSerializer, CommentReactionSerializer, PostReactionSerializer
 from .permissions import IsAuthorOrReadOnly
+from users.counters import UserCounterService
+from config.db_router import read_from_replica
 
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -224,12 +226,10 @@ class PostViewSet(viewsets.ModelViewSet):
     def likers(self, request, pk=None):
         """Get users who liked the post"""
         post = self.get_object()
-        likes = post.likes.all().select_related('user')
-        users = [like.user for like in likes]
+        liker_ids = post.likes.order_by('created_at').values_list('user_id', flat=True)
         
-        from users.serializers import UserSerializer
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+        from users.references import UserReferenceHydrator
+        return Response(UserReferenceHydrator.hydrate(liker_ids))
 
     @action(detail=True, methods=['GET'])
     def reactions(self, request, pk=None):
@@ -411,6 +411,7 @@ class PostViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False)
+    @read_from_replica
     def feed(self, request):
         """Get user's personalized feed"""
         queryset = self.get_queryset()
@@ -426,27 +427,17 @@ class PostViewSet(viewsets.ModelViewSet):
 @permission_classes([IsAuthenticated])
 def get_posts_count(request):
     """Get the count of posts for the current user"""
-    # Use direct query to avoid related_name issues
-    from posts.models import Post
-    count = Post.objects.filter(
-        user=request.user
-    ).count()
-    print(count)
+    count = UserCounterService.get(request.user.id)['posts_count']
     return Response({"count": count})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_posts_count(request, user_id):
     """Get the count of posts for a specific user"""
-    try:
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        user = User.objects.get(id=user_id)
-        count = Post.objects.filter(user=user).count()
-        return Response({"count": count})
-    except User.DoesNotExist:
+    counts = UserCounterService.get_many([user_id]).get(user_id)
+    if counts is None:
         return Response(
             {"detail": "User not found"},
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+    return Response({"count": counts['posts_count']})
@@ -0,0 +1,130 @@
+# users/counters.py
+import logging
+from typing import Dict, Iterable
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import User, UserCounters
+from .social_graph import SocialGraph
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ['friends_count', 'posts_count', 'workouts_count', 'programs_count', 'program_followers_count']
+MAX_BATCH_USERS = 100
+
+
+class UserCounterService:
+    """
+    Per-user profile counts. Changes are applied as F() deltas after commit;
+    a user without a counters row yet is fully recounted instead.
+    """
+
+    @classmethod
+    def adjust(cls, user_id, **deltas):
+        """Apply counter deltas once the current transaction commits"""
+        if user_id is None:
+            return
+        transaction.on_commit(lambda: cls._apply(user_id, deltas))
+
+    @classmethod
+    def _apply(cls, user_id, deltas):
+        updated = UserCounters.objects.filter(user_id=user_id).update(
+            **{field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()}
+        )
+        if not updated:
+            cls.recount([user_id])
+
+    @classmethod
+    def recount_later(cls, *user_ids):
+        transaction.on_commit(lambda: cls.recount(user_ids))
+
+    @classmethod
+    def refresh_friends(cls, *user_ids):
+        """Friend counts follow the social graph, which dedupes both Friendship directions"""
+        def refresh():
+            friend_ids = SocialGraph.load(user_ids)
+            for user_id in user_ids:
+                if not UserCounters.objects.filter(user_id=user_id).update(
+                    friends_count=len(friend_ids[user_id])
+                ):
+                    cls.recount([user_id])
+        transaction.on_commit(refresh)
+
+    @classmethod
+    def compute(cls, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        """Counts of existing users straight from the source tables"""
+        from posts.models import Post
+        from workouts.models import Program, WorkoutLog
+
+        user_ids = set(User.objects.filter(id__in=set(user_ids)).values_list('id', flat=True))
+        counts = {user_id: dict.fromkeys(COUNTER_FIELDS, 0) for user_id in user_ids}
+        if not user_ids:
+            return counts
+
+        for user_id, friend_ids in SocialGraph.load(user_ids).items():
+            counts[user_id]['friends_count'] = len(friend_ids)
+
+        grouped = [
+            ('posts_count', Post.objects.filter(user_id__in=user_ids), 'user_id'),
+            ('workouts_count', WorkoutLog.objects.filter(user_id__in=user_ids), 'user_id'),
+            ('programs_count', Program.objects.filter(creator_id__in=user_ids), 'creator_id'),
+            (
+                'program_followers_count',
+                User.objects.filter(current_program__creator_id__in=user_ids).exclude(
+                    current_program__creator_id=F('id')
+                ),
+                'current_program__creator_id',
+            ),
+        ]
+        for field, queryset, owner in grouped:
+            for user_id, total in queryset.values(owner).annotate(total=Count('pk')).values_list(owner, 'total'):
+                counts[user_id][field] = total
+        return counts
+
+    @classmethod
+    def recount(cls, user_ids: Iterable[int]) -> int:
+        """
+        Rewrite the counters of the given users from the source tables.
+        Returns how many stored rows were missing or wrong.
+        """
+        counts = cls.compute(user_ids)
+        if not counts:
+            return 0
+        stored = {
+            row['user_id']: row
+            for row in UserCounters.objects.filter(user_id__in=counts).values('user_id', *COUNTER_FIELDS)
+        }
+        drifted = sum(
+            1 for user_id, values in counts.items()
+            if user_id not in stored or any(stored[user_id][field] != value for field, value in values.items())
+        )
+        UserCounters.objects.bulk_create(
+            [UserCounters(user_id=user_id, **values) for user_id, values in counts.items()],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=[*COUNTER_FIELDS, 'updated_at'],
+        )
+        return drifted
+
+    @classmethod
+    def get_many(cls, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        """Counts keyed by user id; users never counted before are counted now"""
+        user_ids = set(user_ids)
+        counts = {
+            row.pop('user_id'): row
+            for row in UserCounters.objects.filter(user_id__in=user_ids).values('user_id', *COUNTER_FIELDS)
+        }
+        missing = user_ids - counts.keys()
+        if missing:
+            cls.recount(missing)
+            counts.update({
+                row.pop('user_id'): row
+                for row in UserCounters.objects.filter(user_id__in=missing).values('user_id', *COUNTER_FIELDS)
+            })
+        return counts
+
+    @classmethod
+    def get(cls, user_id) -> Dict[str, int]:
+        return cls.get_many([user_id]).get(user_id, dict.fromkeys(COUNTER_FIELDS, 0))
@@ -0,0 +1,38 @@
+# users/management/commands/compute_friend_suggestions.py
+from django.core.management.base import BaseCommand
+from users.suggestions import FriendSuggestionEngine, TOP_K
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed friend suggestions of every user (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=TOP_K,
+            help='Number of suggestions kept per user',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users whose suggestions are replaced in each transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compute suggestions without storing them',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            users = total = 0
+            for _, suggestions in FriendSuggestionEngine.compute(options['top_k']):
+                users += 1
+                total += len(suggestions)
+            self.stdout.write(f'Would store {total} suggestions for {users} users')
+            return
+
+        written = FriendSuggestionEngine.rebuild(options['top_k'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} friend suggestions'))
@@ -0,0 +1,11 @@
+# users/management/commands/rebuild_username_index.py
+from django.core.management.base import BaseCommand
+from users.username_index import UsernameIndex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the username prefix index used by user search and @mention autocomplete'
+
+    def handle(self, *args, **options):
+        indexed = UsernameIndex.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} usernames'))
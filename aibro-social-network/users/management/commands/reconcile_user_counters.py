@@ -0,0 +1,33 @@
+# users/management/commands/reconcile_user_counters.py
+from django.core.management.base import BaseCommand
+from users.counters import UserCounterService
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Recount the stored profile counters of every user and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of users recounted per batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id, users, drifted = 0, 0, 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            drifted += UserCounterService.recount(user_ids)
+            users += len(user_ids)
+            last_id = user_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled counters of {users} users ({drifted} missing or out of date)'
+        ))
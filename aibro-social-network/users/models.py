@@ -35,6 +35,8 @@ class User(AbstractUser):
                                       null=True, related_name='active_users')
     bio = models.TextField(blank=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    # Resized copies of avatar, filled in by posts.images.ImagePipeline
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     email_verified = models.BooleanField(default=True) # set to False in the future
     verification_token = models.CharField(max_length=100, blank=True, null=True)
@@ -84,4 +86,34 @@ class FriendRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ['from_user', 'to_user']
\ No newline at end of file
+        unique_together = ['from_user', 'to_user']
+
+class FriendSuggestion(models.Model):
+    """Precomputed "people you may know" entry, rebuilt nightly by compute_friend_suggestions"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='friend_suggestions')
+    suggested_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    # Signal strengths behind the score, e.g. {"mutual_friends": 3, "same_gym": 1}
+    reasons = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'suggested_user']
+        indexes = [
+            models.Index(fields=['user', '-score']),
+        ]
+
+
+class UserCounters(models.Model):
+    """
+    Stored profile counts, kept current by signals (see UserCounterService)
+    and periodically reconciled by reconcile_user_counters
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='counters')
+    friends_count = models.PositiveIntegerField(default=0)
+    posts_count = models.PositiveIntegerField(default=0)
+    workouts_count = models.PositiveIntegerField(default=0)
+    programs_count = models.PositiveIntegerField(default=0)
+    # Other users whose current program is one of this user's programs
+    program_followers_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,200 @@
+# users/profile.py
+import hashlib
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from config.db_router import primary_reads
+from posts.images import variant_urls
+from posts.models import Comment, Like, Post, PostReaction
+from posts.serializers import PostSummarySerializer
+from workouts.catalog import count_subquery
+from workouts.models import Program, WorkoutInstance, WorkoutLog
+from workouts.serializers import ProgramSummarySerializer, WorkoutLogSerializer
+from .counters import UserCounterService
+from .models import User
+from .references import UserReferenceHydrator
+from .serializers import UserSerializer
+from .social_graph import SocialGraph
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TTL = 3600
+VERSION_TTL = 7 * 24 * 3600
+PROGRAMS_LIMIT = 5
+WORKOUT_LOGS_LIMIT = 5
+FRIENDS_LIMIT = 10
+POSTS_LIMIT = 10
+
+# What a viewer may see only depends on how they relate to the profile owner
+VIEWER_SELF = 'self'
+VIEWER_FRIEND = 'friend'
+VIEWER_OTHER = 'other'
+
+USER_FIELDS = [
+    'id', 'username', 'avatar', 'bio', 'training_level', 'personality_type',
+    'fitness_goals', 'preferred_gym',
+]
+PROGRAM_FIELDS = [
+    'id', 'name', 'focus', 'sessions_per_week', 'difficulty_level', 'recommended_level',
+    'estimated_completion_weeks', 'is_public', 'workouts_count', 'likes_count', 'created_at',
+]
+WORKOUT_LOG_FIELDS = ['id', 'name', 'date', 'duration', 'completed', 'program_name', 'gym_name']
+
+
+class ProfileService:
+    """
+    Composite profile payloads, cached per owner and viewer class under a
+    version stamp. Writes that change a profile bump the owner's stamp, which
+    makes every cached payload and ETag of that profile stale at once.
+
+    Programs shared with one specific viewer are the only per-viewer part:
+    they are left out of the cached payload and merged in on request.
+    """
+
+    @classmethod
+    def _version_key(cls, user_id) -> str:
+        return f"profile:version:{user_id}"
+
+    @classmethod
+    def _payload_key(cls, user_id, viewer_class, version) -> str:
+        return f"profile:{user_id}:{viewer_class}:{version}"
+
+    @classmethod
+    def _new_version(cls) -> str:
+        # Time based, so a stamp evicted from the cache never comes back with an old value
+        return format(time.time_ns(), 'x')
+
+    @classmethod
+    def version(cls, user_id) -> str:
+        key = cls._version_key(user_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, cls._new_version(), VERSION_TTL)
+            version = cache.get(key)
+        return version
+
+    @classmethod
+    def bump(cls, *user_ids):
+        """New stamps now and again after commit, so no reader caches pre-commit rows under the new one"""
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return
+
+        def apply():
+            version = cls._new_version()
+            cache.set_many({cls._version_key(user_id): version for user_id in user_ids}, VERSION_TTL)
+
+        apply()
+        transaction.on_commit(apply)
+
+    @classmethod
+    def viewer_class(cls, user_id, viewer_id) -> str:
+        if user_id == viewer_id:
+            return VIEWER_SELF
+        if SocialGraph.is_friend(viewer_id, user_id):
+            return VIEWER_FRIEND
+        return VIEWER_OTHER
+
+    @classmethod
+    def _shared_program_ids(cls, user_id, viewer_id) -> List[int]:
+        return sorted(
+            Program.objects.filter(creator_id=user_id, shares__shared_with_id=viewer_id)
+            .values_list('id', flat=True).distinct()
+        )
+
+    @classmethod
+    def resolve(cls, user_id, viewer_id) -> Tuple[str, str, List[int], str]:
+        """
+        (viewer class, version, ids of programs shared with the viewer, ETag)
+        of a profile, without building it
+        """
+        viewer_class = cls.viewer_class(user_id, viewer_id)
+        version = cls.version(user_id)
+        shared_ids = [] if viewer_class == VIEWER_SELF else cls._shared_program_ids(user_id, viewer_id)
+        tag = f"{user_id}:{viewer_class}:{version}:{','.join(map(str, shared_ids))}"
+        etag = '"%s"' % hashlib.md5(tag.encode()).hexdigest()
+        return viewer_class, version, shared_ids, etag
+
+    @classmethod
+    def _programs(cls, user_id, visible: Q, context) -> List[Dict]:
+        programs = (
+            Program.objects.filter(Q(creator_id=user_id) & visible)
+            .annotate(workouts_count=count_subquery(WorkoutInstance.objects.all(), 'program'))
+            .distinct().order_by('-created_at')[:PROGRAMS_LIMIT]
+        )
+        return ProgramSummarySerializer(programs, many=True, fields=PROGRAM_FIELDS, context=context).data
+
+    @classmethod
+    def _class_visibility(cls, viewer_class) -> Q:
+        if viewer_class == VIEWER_SELF:
+            return Q()
+        if viewer_class == VIEWER_FRIEND:
+            # Friends also see programs the owner shared in posts
+            return Q(is_public=True) | Q(posts__isnull=False)
+        return Q(is_public=True)
+
+    @classmethod
+    def build(cls, user_id, viewer_class, context=None) -> Optional[Dict]:
+        """The viewer class payload of a profile, or None if the user does not exist"""
+        user = User.objects.select_related('current_program').filter(id=user_id).first()
+        if user is None:
+            return None
+
+        user_data = UserSerializer(user, fields=USER_FIELDS, context=context).data
+        user_data['avatar_variants'] = variant_urls(user.avatar_variants, (context or {}).get('request'))
+        user_data['current_program'] = (
+            ProgramSummarySerializer(user.current_program, fields=['id', 'name', 'focus'], context=context).data
+            if user.current_program else None
+        )
+
+        # Only logs the owner shared in posts are shown
+        shared_logs = (
+            WorkoutLog.objects.filter(user_id=user_id, posts__isnull=False)
+            .select_related('program', 'gym').distinct().order_by('-date')[:WORKOUT_LOGS_LIMIT]
+        )
+
+        friends = UserReferenceHydrator.hydrate(sorted(SocialGraph.friend_ids(user_id))[:FRIENDS_LIMIT])
+
+        # Subqueries, so likes, comments and reactions are not joined into one row product
+        posts = (
+            Post.objects.filter(user_id=user_id)
+            .annotate(
+                likes_total=count_subquery(Like.objects.all(), 'post'),
+                comments_total=count_subquery(Comment.objects.all(), 'post'),
+                reactions_total=count_subquery(PostReaction.objects.all(), 'post'),
+            )
+            .order_by('-created_at')[:POSTS_LIMIT]
+        )
+
+        return {
+            'user': user_data,
+            'relationship': viewer_class,
+            'counts': UserCounterService.get(user_id),
+            'programs': cls._programs(user_id, cls._class_visibility(viewer_class), context),
+            'workout_logs': WorkoutLogSerializer(shared_logs, many=True, fields=WORKOUT_LOG_FIELDS).data,
+            'friends': friends,
+            'posts': PostSummarySerializer(posts, many=True, context=context).data,
+        }
+
+    @classmethod
+    def get(cls, user_id, viewer_id, viewer_class, version, shared_ids: Iterable[int], context=None) -> Optional[Dict]:
+        """The profile as seen by one viewer, from the cache where possible"""
+        key = cls._payload_key(user_id, viewer_class, version)
+        payload = cache.get(key)
+        if payload is None:
+            with primary_reads():
+                payload = cls.build(user_id, viewer_class, context)
+            if payload is None:
+                return None
+            cache.set(key, payload, PROFILE_TTL)
+
+        if shared_ids:
+            # Per-viewer shares are never cached; recompute the program list for this viewer
+            visible = cls._class_visibility(viewer_class) | Q(shares__shared_with_id=viewer_id)
+            payload = {**payload, 'programs': cls._programs(user_id, visible, context)}
+        return payload
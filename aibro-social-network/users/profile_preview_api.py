@@ -7,7 +7,13 @@ from workouts.serializers import ProgramSerializer, WorkoutLogSerializer
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Q
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from config.db_router import read_from_replica
+from users.profile import ProfileService
+from users.references import UserReferenceHydrator
 from users.serializers import UserSerializer, FriendshipSerializer
+from users.social_graph import SocialGraph
 from posts.models import Post
 from posts.serializers import PostSerializer
 
@@ -15,6 +21,7 @@ User = get_user_model()
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@read_from_replica
 def get_user_profile_preview(request, user_id):
     """
     Endpoint to get a user's profile data for preview purposes.
@@ -26,12 +33,7 @@ def get_user_profile_preview(request, user_id):
         user_data = UserSerializer(target_user).data
         
         # Check if the current user is a friend of the target user
-        from django.db.models import Q
-        from users.models import Friendship
-        is_friend = Friendship.objects.filter(
-            (Q(from_user=target_user) & Q(to_user=request.user)) |
-            (Q(from_user=request.user) & Q(to_user=target_user))
-        ).exists()
+        is_friend = SocialGraph.is_friend(request.user.id, target_user.id)
         
         # Get programs
         if is_friend:
@@ -90,6 +92,40 @@ def get_user_profile_preview(request, user_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@read_from_replica
+def get_user_profile(request, user_id):
+    """
+    Everything a profile screen shows in one response: slim user data, counts,
+    visible programs, shared workout logs, a friends preview and recent posts.
+    Supports conditional requests through ETag / If-None-Match.
+    """
+    try:
+        viewer_class, version, shared_ids, etag = ProfileService.resolve(user_id, request.user.id)
+        
+        # The ETag is known before building anything, so revalidation costs no queries on the profile
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = ProfileService.get(
+                user_id, request.user.id, viewer_class, version, shared_ids,
+                context={'request': request}
+            )
+            if data is None:
+                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+            response = Response(data)
+        
+        response['ETag'] = etag
+        # Depends on who is asking, so shared caches must not reuse it
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+        
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@read_from_replica
 def get_user_friends(request, user_id):
     """
     Get a list of a user's friends for display in the profile preview.
@@ -97,40 +133,19 @@ def get_user_friends(request, user_id):
     try:
         target_user = User.objects.get(id=user_id)
         
-        # Get ALL user's friendships (both initiated and received)
-        from users.models import Friendship
-        from_friendships = target_user.friendships_initiated.all().select_related('to_user')
-        to_friendships = target_user.friendships_received.all().select_related('from_user')
-        
-        # Extract the friend user objects from both directions
-        friends = []
-        
-        # Process initiated friendships (where target_user is the from_user)
-        for friendship in from_friendships:
-            friend_user = friendship.to_user
-            friends.append({
+        # First 10 friends
+        friend_ids = sorted(SocialGraph.friend_ids(target_user.id))[:10]
+        friend_users = User.objects.filter(id__in=friend_ids).order_by('id')
+        friends = [
+            {
                 'id': friend_user.id,
                 'username': friend_user.username,
                 'avatar': friend_user.avatar.url if friend_user.avatar else None,
                 'training_level': friend_user.training_level,
                 'personality_type': friend_user.personality_type
-            })
-        
-        # Process received friendships (where target_user is the to_user)
-        for friendship in to_friendships:
-            friend_user = friendship.from_user
-            # Avoid duplicates (in case there are reciprocal friendships)
-            if not any(f['id'] == friend_user.id for f in friends):
-                friends.append({
-                    'id': friend_user.id,
-                    'username': friend_user.username,
-                    'avatar': friend_user.avatar.url if friend_user.avatar else None,
-                    'training_level': friend_user.training_level,
-                    'personality_type': friend_user.personality_type
-                })
-        
-        # Limit to first 10 friends
-        friends = friends[:10]
+            }
+            for friend_user in friend_users
+        ]
         
         return Response(friends)
         
@@ -141,6 +156,29 @@ def get_user_friends(request, user_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@read_from_replica
+def get_mutual_friends(request, user_id):
+    """
+    Friends the current user shares with another user, for the profile preview.
+    """
+    try:
+        target_user = User.objects.get(id=user_id)
+        
+        mutual_ids = SocialGraph.mutual_friend_ids(request.user.id, target_user.id)
+        
+        return Response({
+            'count': len(mutual_ids),
+            'results': UserReferenceHydrator.hydrate(sorted(mutual_ids)[:10])
+        })
+        
+    except ObjectDoesNotExist:
+        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@read_from_replica
 def get_user_posts(request, user_id):
     """
     Get a user's public posts for display in their profile preview.
@@ -184,16 +222,7 @@ def get_program_details(request, program_id):
         has_posts = program.posts.exists()
         
         # Check if the current user is a friend of the program creator
-        from django.db.models import Q
-        from users.models import Friendship
-        is_friend = Friendship.objects.filter(
-            from_user=request.user,
-            to_user=program.creator
-        ).exists() or Friendship.objects.filter(
-            from_user=program.creator,
-            to_user=request.user
-        ).exists()
-        
+        is_friend = SocialGraph.is_friend(request.user.id, program.creator_id)
         
         # Check permissions
         # Allow access if:
@@ -0,0 +1,66 @@
+# users/references.py
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+from config.db_router import primary_reads
+from .models import User
+from .serializers import UserReferenceSerializer
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_TTL = 24 * 3600
+
+# User fields a rendered reference depends on
+REFERENCE_FIELDS = {'username', 'avatar', 'avatar_variants', 'training_level'}
+
+
+class UserReferenceHydrator:
+    """
+    Renders user ids into compact references for a whole response at once:
+    one cache round trip, then one query for the ids not cached yet.
+    References are rendered without a request, so avatar URLs stay relative
+    and the cached value is the same for every caller.
+    """
+
+    @classmethod
+    def _key(cls, user_id) -> str:
+        return f"user_ref:{user_id}"
+
+    @classmethod
+    def get_many(cls, user_ids: Iterable[int]) -> Dict[int, Dict]:
+        """References keyed by user id; ids of missing users are left out"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        keys = {cls._key(user_id): user_id for user_id in user_ids}
+        result = {keys[key]: reference for key, reference in cache.get_many(list(keys)).items()}
+
+        missing = [user_id for user_id in user_ids if user_id not in result]
+        if missing:
+            with primary_reads():
+                users = User.objects.filter(id__in=missing).only('id', *UserReferenceSerializer.Meta.fields)
+                rendered = {reference['id']: reference for reference in UserReferenceSerializer(users, many=True).data}
+            cache.set_many({cls._key(user_id): reference for user_id, reference in rendered.items()}, REFERENCE_TTL)
+            result.update(rendered)
+        return result
+
+    @classmethod
+    def get(cls, user_id) -> Optional[Dict]:
+        return cls.get_many([user_id]).get(user_id)
+
+    @classmethod
+    def hydrate(cls, user_ids: Iterable[int]) -> List[Dict]:
+        """References in the order of user_ids"""
+        user_ids = list(user_ids)
+        references = cls.get_many(user_ids)
+        return [references[user_id] for user_id in user_ids if user_id in references]
+
+    @classmethod
+    def invalidate(cls, *user_ids):
+        """Drop cached references now and again after commit, like SocialGraph.invalidate"""
+        keys = [cls._key(user_id) for user_id in user_ids]
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -24,8 +24,8 @@ class UserSerializer(serializers.ModelSerializer):
                 
     def get_current_program(self, obj):
         if obj.current_program:
-            from workouts.serializers import ProgramSerializer
-            return ProgramSerializer(obj.current_program).data
+            from workouts.serializers import ProgramSummarySerializer
+            return ProgramSummarySerializer(obj.current_program, context=self.context).data
         return None
     
     class Meta:
@@ -110,8 +110,21 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+class UserReferenceSerializer(serializers.ModelSerializer):
+    """Compact user representation for nesting in lists; see UserReferenceHydrator for id lists"""
+    avatar_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'avatar', 'avatar_variants', 'training_level']
+        read_only_fields = fields
+
+    def get_avatar_variants(self, obj):
+        from posts.images import variant_urls
+        return variant_urls(obj.avatar_variants, self.context.get('request'))
+
 class FriendshipSerializer(serializers.ModelSerializer):
-    friend = UserSerializer(source='to_user')
+    friend = UserReferenceSerializer(source='to_user', read_only=True)
     
     class Meta:
         model = Friendship
@@ -119,8 +132,8 @@ class FriendshipSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 class FriendRequestSerializer(serializers.ModelSerializer):
-    from_user = UserSerializer(read_only=True)
-    to_user = UserSerializer(read_only=True)
+    from_user = UserReferenceSerializer(read_only=True)
+    to_user = UserReferenceSerializer(read_only=True)
     
     class Meta:
         model = FriendRequest
@@ -0,0 +1,172 @@
+# users/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from posts.images import ImagePipeline
+from posts.models import Comment, Like, Post, PostReaction
+from workouts.models import Program, WorkoutLog
+from .counters import UserCounterService
+from .models import Friendship, User
+from .profile import ProfileService
+from .references import REFERENCE_FIELDS, UserReferenceHydrator
+from .social_graph import SocialGraph
+from .username_index import UsernameIndex
+
+UNTRACKED = object()
+
+# User fields shown on profiles, their own or in friends previews
+PROFILE_FIELDS = {
+    'username', 'avatar', 'bio', 'training_level', 'personality_type',
+    'fitness_goals', 'preferred_gym', 'current_program',
+}
+
+
+@receiver([post_save, post_delete], sender=Friendship)
+def invalidate_friend_ids(sender, instance, **kwargs):
+    """Friendships changed outside SocialGraph (admin, user deletion cascades)"""
+    SocialGraph.invalidate(instance.from_user_id, instance.to_user_id)
+    UserCounterService.refresh_friends(instance.from_user_id, instance.to_user_id)
+    ProfileService.bump(instance.from_user_id, instance.to_user_id)
+
+
+# Profile version bumps come after counter adjustments, so on commit the
+# counters are updated before readers can cache them under the new version
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, **kwargs):
+    if created:
+        UserCounterService.adjust(instance.user_id, posts_count=1)
+    ProfileService.bump(instance.user_id)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    UserCounterService.adjust(instance.user_id, posts_count=-1)
+    ProfileService.bump(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Like)
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=PostReaction)
+def bump_post_owner_profile(sender, instance, **kwargs):
+    """Engagement counts are shown on the owner's profile posts"""
+    owner_id = Post.objects.filter(pk=instance.post_id).values_list('user_id', flat=True).first()
+    ProfileService.bump(owner_id)
+
+
+@receiver(post_save, sender=WorkoutLog)
+def count_created_workout_log(sender, instance, created, **kwargs):
+    if created:
+        UserCounterService.adjust(instance.user_id, workouts_count=1)
+    ProfileService.bump(instance.user_id)
+
+
+@receiver(post_delete, sender=WorkoutLog)
+def count_deleted_workout_log(sender, instance, **kwargs):
+    UserCounterService.adjust(instance.user_id, workouts_count=-1)
+    ProfileService.bump(instance.user_id)
+
+
+@receiver(post_save, sender=Program)
+def count_created_program(sender, instance, created, **kwargs):
+    if created:
+        UserCounterService.adjust(instance.creator_id, programs_count=1)
+    ProfileService.bump(instance.creator_id)
+
+
+@receiver(post_delete, sender=Program)
+def count_deleted_program(sender, instance, **kwargs):
+    # Followers lost their current program through SET_NULL, which sends no signals
+    UserCounterService.recount_later(instance.creator_id)
+    ProfileService.bump(instance.creator_id)
+
+
+@receiver(pre_save, sender=User)
+def store_previous_current_program(sender, instance, **kwargs):
+    """Remember which program the user followed so follower counts move as a delta"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'current_program' not in update_fields:
+        instance._previous_current_program = UNTRACKED
+        return
+    instance._previous_current_program = (None, None)
+    if instance.pk:
+        instance._previous_current_program = User.objects.filter(pk=instance.pk).values_list(
+            'current_program_id', 'current_program__creator_id'
+        ).first() or (None, None)
+
+
+@receiver(post_save, sender=User)
+def count_program_followers(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_current_program', UNTRACKED)
+    if previous is UNTRACKED or previous[0] == instance.current_program_id:
+        return
+    previous_creator_id = previous[1]
+    current_creator_id = None
+    if instance.current_program_id:
+        current_creator_id = Program.objects.filter(pk=instance.current_program_id).values_list(
+            'creator_id', flat=True
+        ).first()
+    if previous_creator_id == current_creator_id:
+        return
+    # Following your own program does not count
+    if previous_creator_id and previous_creator_id != instance.pk:
+        UserCounterService.adjust(previous_creator_id, program_followers_count=-1)
+    if current_creator_id and current_creator_id != instance.pk:
+        UserCounterService.adjust(current_creator_id, program_followers_count=1)
+    # Their profiles show program_followers_count
+    ProfileService.bump(previous_creator_id, current_creator_id)
+
+
+@receiver(post_save, sender=User)
+def bump_user_profiles(sender, instance, **kwargs):
+    """The user's own profile and the friends previews on their friends' profiles"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not PROFILE_FIELDS & set(update_fields):
+        return
+    ProfileService.bump(instance.pk, *SocialGraph.friend_ids(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def bump_deleted_user_profile(sender, instance, **kwargs):
+    ProfileService.bump(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_reference(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not REFERENCE_FIELDS & set(update_fields):
+        return
+    UserReferenceHydrator.invalidate(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def store_previous_username(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not {'username', 'is_active'} & set(update_fields):
+        instance._previous_username = UNTRACKED
+        return
+    instance._previous_username = None
+    if instance.pk:
+        instance._previous_username = User.objects.filter(pk=instance.pk).values_list(
+            'username', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=User)
+def index_username(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_username', UNTRACKED)
+    if previous is UNTRACKED:
+        return
+    UsernameIndex.update(instance.pk, instance.username, instance.is_active, previous_username=previous)
+
+
+@receiver(post_delete, sender=User)
+def unindex_username(sender, instance, **kwargs):
+    UsernameIndex.remove(instance.pk, instance.username)
+
+
+@receiver(post_save, sender=User)
+def process_avatar(sender, instance, **kwargs):
+    if ImagePipeline.needs_processing(instance, 'avatar'):
+        ImagePipeline.process_later('avatar', instance.pk)
@@ -0,0 +1,130 @@
+# users/social_graph.py
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from config.db_router import primary_reads
+from .models import Friendship
+
+logger = logging.getLogger(__name__)
+
+FRIEND_IDS_TTL = 24 * 3600
+
+
+class SocialGraph:
+    """
+    Friendships as cached friend id sets. A pair of users is friends when a
+    Friendship row exists in either direction; every check goes through here
+    so they all agree, and set operations replace per-pair queries.
+    """
+
+    @classmethod
+    def _key(cls, user_id) -> str:
+        return f"social_graph:friends:{user_id}"
+
+    @classmethod
+    def load(cls, user_ids: Optional[Iterable[int]] = None) -> Dict[int, FrozenSet[int]]:
+        """
+        Friend id sets straight from the database, bypassing the cache. Without
+        user_ids every friendship is read, for batch jobs over all users.
+        """
+        rows = Friendship.objects.values_list('from_user_id', 'to_user_id')
+        if user_ids is not None:
+            user_ids = set(user_ids)
+            rows = rows.filter(Q(from_user_id__in=user_ids) | Q(to_user_id__in=user_ids))
+
+        friends = defaultdict(set)
+        for from_id, to_id in rows.iterator():
+            friends[from_id].add(to_id)
+            friends[to_id].add(from_id)
+        wanted = user_ids if user_ids is not None else friends.keys()
+        return {user_id: frozenset(friends.get(user_id, set()) - {user_id}) for user_id in wanted}
+
+    @classmethod
+    def friend_ids(cls, user_id) -> FrozenSet[int]:
+        return cls.friend_ids_many([user_id])[user_id]
+
+    @classmethod
+    def friend_ids_many(cls, user_ids: Iterable[int]) -> Dict[int, FrozenSet[int]]:
+        """Friend id sets of several users with one cache round trip and at most one query"""
+        user_ids = list(dict.fromkeys(user_ids))
+        keys = {cls._key(user_id): user_id for user_id in user_ids}
+        cached = cache.get_many(list(keys))
+        result = {keys[key]: friend_ids for key, friend_ids in cached.items()}
+
+        missing = [user_id for user_id in user_ids if user_id not in result]
+        if missing:
+            with primary_reads():
+                loaded = cls.load(missing)
+            cache.set_many({cls._key(user_id): ids for user_id, ids in loaded.items()}, FRIEND_IDS_TTL)
+            result.update(loaded)
+        return result
+
+    @classmethod
+    def is_friend(cls, user_id, other_id) -> bool:
+        return other_id in cls.friend_ids(user_id)
+
+    @classmethod
+    def mutual_friend_ids(cls, user_id, other_id) -> FrozenSet[int]:
+        friend_ids = cls.friend_ids_many([user_id, other_id])
+        return friend_ids[user_id] & friend_ids[other_id]
+
+    @classmethod
+    def mutual_counts(cls, user_id, other_ids: Iterable[int]) -> Dict[int, int]:
+        """Number of friends user_id shares with each of other_ids"""
+        other_ids = list(other_ids)
+        friend_ids = cls.friend_ids_many([user_id, *other_ids])
+        mine = friend_ids[user_id]
+        return {other_id: len(mine & friend_ids[other_id]) for other_id in other_ids}
+
+    @classmethod
+    def friends_of_friends(cls, user_id, limit: int = 20) -> List[Tuple[int, int]]:
+        """
+        (user id, mutual friend count) of users two hops away who are not
+        friends yet, most mutual friends first
+        """
+        mine = cls.friend_ids(user_id)
+        counts = Counter()
+        for friend_ids in cls.friend_ids_many(mine).values():
+            counts.update(friend_ids)
+        for excluded in (*mine, user_id):
+            counts.pop(excluded, None)
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    @classmethod
+    def add_friendship(cls, user_id, other_id):
+        """Store the friendship in both directions"""
+        with transaction.atomic():
+            Friendship.objects.bulk_create(
+                [
+                    Friendship(from_user_id=user_id, to_user_id=other_id),
+                    Friendship(from_user_id=other_id, to_user_id=user_id),
+                ],
+                ignore_conflicts=True,
+            )
+            cls.invalidate(user_id, other_id)
+            # bulk_create sends no signals
+            from .counters import UserCounterService
+            UserCounterService.refresh_friends(user_id, other_id)
+            from .profile import ProfileService
+            ProfileService.bump(user_id, other_id)
+
+    @classmethod
+    def remove_friendship(cls, user_id, other_id):
+        with transaction.atomic():
+            Friendship.objects.filter(
+                Q(from_user_id=user_id, to_user_id=other_id) |
+                Q(from_user_id=other_id, to_user_id=user_id)
+            ).delete()
+            cls.invalidate(user_id, other_id)
+
+    @classmethod
+    def invalidate(cls, *user_ids):
+        """Drop cached sets now and again after commit, so no reader re-caches pre-commit rows"""
+        keys = [cls._key(user_id) for user_id in user_ids]
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
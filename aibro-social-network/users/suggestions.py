@@ -0,0 +1,226 @@
+# users/suggestions.py
+import logging
+import math
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from workouts.group_workouts import GroupWorkout, GroupWorkoutParticipant
+from workouts.models import Program, WorkoutLog
+from .models import FriendRequest, FriendSuggestion, User
+from .social_graph import SocialGraph
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 20
+MAX_GROUP_SIZE = 500  # larger groups (a big gym) would add n² pairs for a weak signal
+
+WEIGHTS = {
+    'mutual_friends': 3.0,
+    'workout_partner': 5.0,
+    'group_workouts': 2.0,
+    'shared_programs': 2.0,
+    'same_gym': 4.0,
+}
+
+
+class FriendSuggestionEngine:
+    """
+    Scores non-friends by weighted shared signals. Each signal is a sparse
+    user-by-item incidence (friends, gyms, program lineages, group workouts)
+    kept both ways, user to items and item to members. Co-occurrence counts
+    are computed one user at a time, i.e. one row of A·Aᵀ, cut to the top K
+    and dropped, so memory never holds more than a single row.
+    """
+
+    @classmethod
+    def _incidence(cls, groups: Iterable[Set[int]], weighted: bool = False):
+        """(items as (members, weight), item indexes of each user) of one signal"""
+        items, memberships = [], defaultdict(list)
+        for members in groups:
+            if len(members) < 2 or len(members) > MAX_GROUP_SIZE:
+                continue
+            # Sharing a small group says more than sharing a large one
+            weight = 1 / math.log2(len(members) + 1) if weighted else 1
+            for user_id in members:
+                memberships[user_id].append(len(items))
+            items.append((members, weight))
+        return items, memberships
+
+    @classmethod
+    def _row(cls, incidence, user_id) -> Counter:
+        """How often (or, weighted, how specifically) one user shares an item with each other user"""
+        items, memberships = incidence
+        row = Counter()
+        for index in memberships.get(user_id, ()):
+            members, weight = items[index]
+            for other_id in members:
+                if other_id != user_id:
+                    row[other_id] += weight
+        return row
+
+    @classmethod
+    def _friend_groups(cls, friend_ids: Dict[int, frozenset]) -> List[Set[int]]:
+        # Friends of one user all share that user as a mutual friend
+        return [set(ids) for ids in friend_ids.values()]
+
+    @classmethod
+    def _gym_groups(cls) -> List[Set[int]]:
+        groups = defaultdict(set)
+        for user_id, gym_id in User.objects.filter(
+            is_active=True, preferred_gym__isnull=False
+        ).values_list('id', 'preferred_gym_id'):
+            groups[gym_id].add(user_id)
+        return list(groups.values())
+
+    @classmethod
+    def _program_groups(cls) -> List[Set[int]]:
+        """Creators and current followers of each program lineage (a program and its forks)"""
+        parents = dict(Program.objects.values_list('id', 'forked_from_id'))
+
+        def root(program_id):
+            seen = set()
+            while parents.get(program_id) and program_id not in seen:
+                seen.add(program_id)
+                program_id = parents[program_id]
+            return program_id
+
+        groups = defaultdict(set)
+        for program_id, creator_id in Program.objects.values_list('id', 'creator_id'):
+            groups[root(program_id)].add(creator_id)
+        for user_id, program_id in User.objects.filter(
+            is_active=True, current_program__isnull=False
+        ).values_list('id', 'current_program_id'):
+            groups[root(program_id)].add(user_id)
+        return list(groups.values())
+
+    @classmethod
+    def _group_workout_groups(cls) -> List[Set[int]]:
+        groups = defaultdict(set)
+        for group_workout_id, creator_id in GroupWorkout.objects.values_list('id', 'creator_id'):
+            groups[group_workout_id].add(creator_id)
+        for group_workout_id, user_id in GroupWorkoutParticipant.objects.filter(
+            status='joined'
+        ).values_list('group_workout_id', 'user_id'):
+            groups[group_workout_id].add(user_id)
+        return list(groups.values())
+
+    @classmethod
+    def _partner_counts(cls) -> Dict[int, Counter]:
+        counts: Dict[int, Counter] = defaultdict(Counter)
+        for user_id, partner_id in WorkoutLog.workout_partners.through.objects.values_list(
+            'workoutlog__user_id', 'user_id'
+        ):
+            if user_id != partner_id:
+                counts[user_id][partner_id] += 1
+                counts[partner_id][user_id] += 1
+        return counts
+
+    @classmethod
+    def _excluded(cls) -> Dict[int, Set[int]]:
+        """Pairs never suggested: any friend request, whatever its status"""
+        excluded = defaultdict(set)
+        for from_id, to_id in FriendRequest.objects.values_list('from_user_id', 'to_user_id'):
+            excluded[from_id].add(to_id)
+            excluded[to_id].add(from_id)
+        return excluded
+
+    @classmethod
+    def compute(cls, top_k: int = TOP_K) -> Iterator[Tuple[int, List[FriendSuggestion]]]:
+        """Top-K unsaved suggestions of each active user, one user at a time"""
+        user_ids = list(User.objects.filter(is_active=True).values_list('id', flat=True))
+        active = set(user_ids)
+        friend_ids = SocialGraph.load()
+
+        incidences = {
+            'mutual_friends': cls._incidence(cls._friend_groups(friend_ids)),
+            'group_workouts': cls._incidence(cls._group_workout_groups()),
+            'shared_programs': cls._incidence(cls._program_groups()),
+            'same_gym': cls._incidence(cls._gym_groups(), weighted=True),
+        }
+        partner_counts = cls._partner_counts()
+        excluded = cls._excluded()
+
+        for user_id in user_ids:
+            rows = {name: cls._row(incidence, user_id) for name, incidence in incidences.items()}
+            rows['workout_partner'] = partner_counts.get(user_id, Counter())
+            scores = Counter()
+            for name, row in rows.items():
+                for other_id, value in row.items():
+                    scores[other_id] += WEIGHTS[name] * value
+
+            skip = friend_ids.get(user_id, frozenset()) | excluded.get(user_id, set()) | {user_id}
+            top = [
+                (other_id, score) for other_id, score in scores.most_common()
+                if other_id in active and other_id not in skip
+            ][:top_k]
+            yield user_id, [
+                FriendSuggestion(
+                    user_id=user_id,
+                    suggested_user_id=other_id,
+                    score=round(score, 4),
+                    reasons={
+                        name: round(row[other_id], 4)
+                        for name, row in rows.items()
+                        if row.get(other_id)
+                    },
+                )
+                for other_id, score in top
+            ]
+
+    @classmethod
+    def rebuild(cls, top_k: int = TOP_K, batch_size: int = 1000) -> int:
+        """Replace the stored suggestions of every user; returns the number of rows written"""
+        user_ids, written = [], 0
+        batch_ids, rows = [], []
+        for user_id, suggestions in cls.compute(top_k):
+            user_ids.append(user_id)
+            batch_ids.append(user_id)
+            rows.extend(suggestions)
+            if len(batch_ids) >= batch_size:
+                written += cls._replace(batch_ids, rows, batch_size)
+                batch_ids, rows = [], []
+        written += cls._replace(batch_ids, rows, batch_size)
+        # Users deactivated since the last run
+        FriendSuggestion.objects.exclude(user_id__in=user_ids).delete()
+        return written
+
+    @classmethod
+    def _replace(cls, user_ids, rows, batch_size) -> int:
+        with transaction.atomic():
+            FriendSuggestion.objects.filter(user_id__in=user_ids).delete()
+            FriendSuggestion.objects.bulk_create(rows, batch_size=batch_size)
+        return len(rows)
+
+    @classmethod
+    def for_user(cls, user, limit: int = TOP_K) -> List[Dict]:
+        """
+        Stored suggestions minus anyone befriended or requested since the last
+        run; users without any yet get friends of friends from the social graph.
+        """
+        friend_ids = SocialGraph.friend_ids(user.id)
+        requested = {
+            other_id
+            for pair in FriendRequest.objects.filter(
+                Q(from_user=user) | Q(to_user=user)
+            ).values_list('from_user_id', 'to_user_id')
+            for other_id in pair
+        } - {user.id}
+
+        stored = list(
+            FriendSuggestion.objects.filter(user=user).order_by('-score')
+            .values_list('suggested_user_id', 'score', 'reasons')
+        )
+        if not stored:
+            stored = [
+                (other_id, WEIGHTS['mutual_friends'] * mutual, {'mutual_friends': mutual})
+                for other_id, mutual in SocialGraph.friends_of_friends(user.id, limit=limit + len(requested))
+            ]
+
+        return [
+            {'user_id': other_id, 'score': score, 'reasons': reasons}
+            for other_id, score, reasons in stored
+            if other_id not in friend_ids and other_id not in requested
+        ][:limit]
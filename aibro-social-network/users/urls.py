@@ -13,11 +13,14 @@ from .views import (
     get_friends_count,
     get_user_all_counts,
     get_user_friends_count,
+    get_users_counts,
     check_friendship_status,
 )   
 from .profile_preview_api import (
+    get_user_profile,
     get_user_profile_preview, 
     get_user_friends, 
+    get_mutual_friends,
     get_user_posts,
 )
 
@@ -35,10 +38,13 @@ urlpatterns = [
     path('social-auth/', views.social_auth_callback, name='social-auth'),
     path('update-language/', update_language_preference, name='update-language-preference'),
     path('<int:user_id>/friendship-status/', check_friendship_status, name='friendship-status'),
+    path('<int:user_id>/profile/', get_user_profile, name='user-profile'),
     path('<int:user_id>/profile-preview/', get_user_profile_preview, name='user-profile-preview'),
     path('<int:user_id>/friends/', get_user_friends, name='user-friends'),
+    path('<int:user_id>/mutual-friends/', get_mutual_friends, name='user-mutual-friends'),
     path('<int:user_id>/posts/', get_user_posts, name='user-posts'),
     path('<int:user_id>/reset-current-program/', reset_user_current_program, name='reset-user-current-program'),
+    path('counts/', get_users_counts, name='users-counts'),
     path('', include(router.urls)),
     path('friends/count/', get_friends_count, name='friends-count'),
     path('me/counts/', get_all_counts, name='all-counts'),
@@ -0,0 +1,218 @@
+# users/username_index.py
+import bisect
+import logging
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import User
+from .references import UserReferenceHydrator
+from .social_graph import SocialGraph
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY = 'username_index'
+SEPARATOR = '\x00'
+# Prefix matches read before ranking
+CANDIDATES = 200
+# Viewers with at most this many friends also get friends past a full candidate window
+FRIEND_SCAN_LIMIT = 500
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def normalize_username(username: str) -> str:
+    """Case and accent insensitive form, so 'al' completes 'Ålbin'"""
+    decomposed = unicodedata.normalize('NFKD', username or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def _member(username, user_id) -> str:
+    # The id suffix keeps equal normalized names apart and is read back on lookup
+    return f"{normalize_username(username)}{SEPARATOR}{user_id}"
+
+
+def _member_user_id(member: str) -> int:
+    return int(member.rsplit(SEPARATOR, 1)[1])
+
+
+class _RedisStore:
+    """Members of one sorted set, all with score 0, so ZRANGEBYLEX walks them in name order"""
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self.client = get_redis_connection('default')
+
+    def exists(self) -> bool:
+        return bool(self.client.exists(INDEX_KEY))
+
+    def add(self, members: List[str]):
+        if members:
+            self.client.zadd(INDEX_KEY, {member: 0 for member in members})
+
+    def remove(self, members: List[str]):
+        if members:
+            self.client.zrem(INDEX_KEY, *members)
+
+    def replace(self, members: List[str]):
+        pipe = self.client.pipeline()
+        pipe.delete(INDEX_KEY)
+        for start in range(0, len(members), 10000):
+            pipe.zadd(INDEX_KEY, {member: 0 for member in members[start:start + 10000]})
+        pipe.execute()
+
+    def prefix(self, prefix: str, limit: int) -> List[str]:
+        # \xff sorts after every character a normalized name can hold in UTF-8
+        members = self.client.zrangebylex(
+            INDEX_KEY, b'[' + prefix.encode(), b'[' + prefix.encode() + b'\xff', start=0, num=limit
+        )
+        return [member.decode() for member in members]
+
+
+class _LocalStore:
+    """Sorted list in this process, for caches without Redis (development, tests)"""
+    members: List[str] = []
+    built = False
+    lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return _LocalStore.built
+
+    def add(self, members: List[str]):
+        with self.lock:
+            for member in members:
+                position = bisect.bisect_left(_LocalStore.members, member)
+                if position == len(_LocalStore.members) or _LocalStore.members[position] != member:
+                    _LocalStore.members.insert(position, member)
+
+    def remove(self, members: List[str]):
+        with self.lock:
+            for member in members:
+                position = bisect.bisect_left(_LocalStore.members, member)
+                if position < len(_LocalStore.members) and _LocalStore.members[position] == member:
+                    del _LocalStore.members[position]
+
+    def replace(self, members: List[str]):
+        with self.lock:
+            _LocalStore.members = sorted(set(members))
+            _LocalStore.built = True
+
+    def prefix(self, prefix: str, limit: int) -> List[str]:
+        start = bisect.bisect_left(_LocalStore.members, prefix)
+        matches = []
+        for member in _LocalStore.members[start:start + limit]:
+            if not member.startswith(prefix):
+                break
+            matches.append(member)
+        return matches
+
+
+class UsernameIndex:
+    """
+    Prefix index over normalized usernames of active users, for @mention
+    autocomplete and user search. Lookups are a range read over sorted
+    members, so their cost depends on the prefix and result size, not on
+    the number of users. Results are ranked friends first, then users of
+    the same gym, then everyone else.
+    """
+
+    @classmethod
+    def _store(cls):
+        if settings.CACHES['default']['BACKEND'].startswith('django_redis'):
+            return _RedisStore()
+        return _LocalStore()
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Replace the whole index from the users table; returns the number of users indexed"""
+        members = [
+            _member(username, user_id)
+            for user_id, username in User.objects.filter(is_active=True).values_list('id', 'username').iterator()
+        ]
+        cls._store().replace(members)
+        return len(members)
+
+    @classmethod
+    def update(cls, user_id, username, is_active=True, previous_username: Optional[str] = None):
+        """Index a created or changed user once committed, dropping the entry of their previous name"""
+        transaction.on_commit(lambda: cls._update(user_id, username, is_active, previous_username))
+
+    @classmethod
+    def _update(cls, user_id, username, is_active, previous_username):
+        store = cls._store()
+        if not store.exists():
+            # Built from the table on the first lookup, which will include this user
+            return
+        if previous_username is not None and previous_username != username:
+            store.remove([_member(previous_username, user_id)])
+        if is_active:
+            store.add([_member(username, user_id)])
+        else:
+            store.remove([_member(username, user_id)])
+
+    @classmethod
+    def remove(cls, user_id, username):
+        def apply():
+            store = cls._store()
+            if store.exists():
+                store.remove([_member(username, user_id)])
+        transaction.on_commit(apply)
+
+    @classmethod
+    def _prefix_members(cls, prefix: str, limit: int) -> List[str]:
+        store = cls._store()
+        if not store.exists():
+            cls.rebuild()
+        return store.prefix(prefix, limit)
+
+    @classmethod
+    def lookup(cls, query: str, viewer, limit: int = DEFAULT_LIMIT, exclude: Iterable[int] = ()) -> List[Dict]:
+        """User references whose username starts with query, ranked by proximity to the viewer"""
+        prefix = normalize_username(query.lstrip('@'))
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        excluded = set(exclude)
+
+        # One range read, split into friends and others by the friend set
+        members = cls._prefix_members(prefix, CANDIDATES)
+        friend_ids = SocialGraph.friend_ids(viewer.id)
+        friend_members, candidate_ids = [], []
+        for member in members:
+            user_id = _member_user_id(member)
+            if user_id in excluded:
+                continue
+            if user_id in friend_ids:
+                friend_members.append(member)
+            else:
+                candidate_ids.append(user_id)
+
+        if len(friend_members) < limit and len(members) >= CANDIDATES and len(friend_ids) <= FRIEND_SCAN_LIMIT:
+            # A common prefix holds more names than the window read; friends past it come from a bounded scan
+            seen = {_member_user_id(member) for member in friend_members}
+            friend_members.extend(
+                _member(username, user_id)
+                for user_id, username in User.objects.filter(
+                    id__in=friend_ids - seen - excluded, is_active=True
+                ).values_list('id', 'username')
+                if normalize_username(username).startswith(prefix)
+            )
+            friend_members.sort()
+
+        friends = UserReferenceHydrator.hydrate([_member_user_id(member) for member in friend_members[:limit]])
+        if len(friends) >= limit:
+            return friends
+
+        if viewer.preferred_gym_id and candidate_ids:
+            same_gym = set(
+                User.objects.filter(id__in=candidate_ids, preferred_gym_id=viewer.preferred_gym_id)
+                .values_list('id', flat=True)
+            )
+            # Stable sort keeps name order within each group
+            candidate_ids.sort(key=lambda user_id: user_id not in same_gym)
+
+        others = UserReferenceHydrator.hydrate(candidate_ids[:limit - len(friends)])
+        return friends + others
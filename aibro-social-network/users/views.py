@@ -9,6 +9,10 @@ from rest_framework.views import APIView
 from .models import User, Friendship, FriendRequest
 from .serializers import (UserSerializer, FriendshipSerializer,
                         FriendRequestSerializer)
+from .social_graph import SocialGraph
+from .suggestions import FriendSuggestionEngine, TOP_K
+from .counters import UserCounterService, MAX_BATCH_USERS
+from .username_index import UsernameIndex, DEFAULT_LIMIT as AUTOCOMPLETE_LIMIT, MAX_LIMIT as AUTOCOMPLETE_MAX
                         
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -436,8 +440,8 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def search(self, request):
         """
-        Search for users by username or email
-        Returns a list of users matching the search query
+        Search for users by username prefix
+        Returns a list of users matching the search query, friends first
         """
         query = request.query_params.get('q', '')
         if len(query) < 2:
@@ -447,13 +451,50 @@ class UserViewSet(viewsets.ModelViewSet):
             )
         
         # Exclude the current user from results
-        users = User.objects.filter(
-            Q(username__icontains=query) | 
-            Q(email__icontains=query)
-        ).exclude(id=request.user.id)[:10]  # Limit to 10 results
+        return Response(UsernameIndex.lookup(query, request.user, limit=10, exclude=[request.user.id]))
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Username completions for @mentions, friends first, then users of the same gym
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT)), 1), AUTOCOMPLETE_MAX)
+        except ValueError:
+            return Response(
+                {"detail": "limit must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        serializer = UserSerializer(users, many=True, fields=['id', 'username', 'avatar'])
-        return Response(serializer.data)
+        query = request.query_params.get('q', '')
+        return Response(UsernameIndex.lookup(query, request.user, limit=limit, exclude=[request.user.id]))
+    
+    @action(detail=False, methods=['get'])
+    def suggestions(self, request):
+        """
+        People the current user may know, from the nightly precomputed table
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', TOP_K)), 1), TOP_K)
+        except ValueError:
+            return Response(
+                {"detail": "limit must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        entries = FriendSuggestionEngine.for_user(request.user, limit=limit)
+        users = User.objects.in_bulk([entry['user_id'] for entry in entries])
+        results = []
+        for entry in entries:
+            user = users.get(entry['user_id'])
+            if user is None or not user.is_active:
+                continue
+            results.append({
+                'user': UserSerializer(user, fields=['id', 'username', 'avatar', 'training_level']).data,
+                'score': entry['score'],
+                'reasons': entry['reasons'],
+            })
+        return Response(results)
     
     @action(detail=True, methods=['post'])
     def send_friend_request(self, request, pk=None):
@@ -489,15 +530,7 @@ class UserViewSet(viewsets.ModelViewSet):
             friend_request.status = 'accepted'
             friend_request.save()
             
-            # Create friendship
-            Friendship.objects.create(
-                from_user=friend_request.from_user,
-                to_user=friend_request.to_user
-            )
-            Friendship.objects.create(
-                from_user=friend_request.to_user,
-                to_user=friend_request.from_user
-            )
+            SocialGraph.add_friendship(friend_request.from_user_id, friend_request.to_user_id)
         elif response == 'reject':
             friend_request.status = 'rejected'
             friend_request.save()
@@ -523,10 +556,7 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def remove_friend(self, request, pk=None):
         friend = self.get_object()
-        Friendship.objects.filter(
-            Q(from_user=request.user, to_user=friend) |
-            Q(from_user=friend, to_user=request.user)
-        ).delete()
+        SocialGraph.remove_friendship(request.user.id, friend.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -563,63 +593,59 @@ from rest_framework import status
 @permission_classes([IsAuthenticated])
 def get_friends_count(request):
     """Get the count of friends for the current user"""
-    count = request.user.friends.count()
+    count = UserCounterService.get(request.user.id)['friends_count']
     return Response({"count": count})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_all_counts(request):
     """Get all counts in a single request (more efficient)"""
-    user = request.user
-    
-    # Get counts
-    friends_count = user.friends.count()
-    posts_count = user.posts.count()
-    workouts_count = user.workout_logs.count()
-    
-    return Response({
-        "friends_count": friends_count,
-        "posts_count": posts_count,
-        "workouts_count": workouts_count
-    })
+    return Response(UserCounterService.get(request.user.id))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_friends_count(request, user_id):
     """Get the count of friends for a specific user"""
-    try:
-        user = User.objects.get(id=user_id)
-        count = user.friends.count()
-        return Response({"count": count})
-    except User.DoesNotExist:
+    if not User.objects.filter(id=user_id).exists():
         return Response(
             {"detail": "User not found"},
             status=status.HTTP_404_NOT_FOUND
         )
+    count = UserCounterService.get(user_id)['friends_count']
+    return Response({"count": count})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_all_counts(request, user_id):
     """Get all counts for a specific user in a single request"""
-    try:
-        from posts.models import Post
-        from workouts.models import WorkoutLog
-        
-        user = User.objects.get(id=user_id)
-        friends_count = user.friends.count()
-        posts_count = Post.objects.filter(user=user).count()
-        workouts_count = WorkoutLog.objects.filter(user=user).count()
-        
-        return Response({
-            "friends_count": friends_count,
-            "posts_count": posts_count,
-            "workouts_count": workouts_count
-        })
-    except User.DoesNotExist:
+    counts = UserCounterService.get_many([user_id]).get(user_id)
+    if counts is None:
         return Response(
             {"detail": "User not found"},
             status=status.HTTP_404_NOT_FOUND
         )
+    return Response(counts)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_users_counts(request):
+    """
+    Counts of several users at once: ?ids=1,2,3
+    Returns {user_id: counts}; unknown ids are left out.
+    """
+    try:
+        user_ids = {int(user_id) for user_id in request.query_params.get('ids', '').split(',') if user_id.strip()}
+    except ValueError:
+        return Response(
+            {"detail": "ids must be a comma-separated list of user ids"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(user_ids) > MAX_BATCH_USERS:
+        return Response(
+            {"detail": f"At most {MAX_BATCH_USERS} user ids per request"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(UserCounterService.get_many(user_ids))
 
 # Add this to your views.py file
 from django.db.models import Q
@@ -653,12 +679,7 @@ def check_friendship_status(request, user_id):
             )
         
         # Check if they are friends
-        friend_relation = Friendship.objects.filter(
-            (Q(from_user=current_user) & Q(to_user=target_user)) |
-            (Q(from_user=target_user) & Q(to_user=current_user))
-        ).exists()
-        
-        if friend_relation:
+        if SocialGraph.is_friend(current_user.id, target_user.id):
             return Response({"status": "friends"})
             
         # Check for pending friend requests
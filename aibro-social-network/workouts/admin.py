@@ -47,11 +47,11 @@ class ProgramAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related(
             'creator', 'forked_from'
         ).prefetch_related(
-            'workout_instances', 'likes', 'forks'
+            'workout_instances', 'forks'
         )
     
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        return obj.likes_count
     get_likes_count.short_description = 'Likes'
     
     def get_workouts_count(self, obj):
@@ -62,10 +62,6 @@ class ProgramAdmin(admin.ModelAdmin):
         return obj.workout_instances.count()
     workouts_count.short_description = 'Total Workouts'
     
-    def likes_count(self, obj):
-        return obj.likes.count()
-    likes_count.short_description = 'Total Likes'
-    
     def forks_count(self, obj):
         return obj.forks.count()
     forks_count.short_description = 'Total Forks'
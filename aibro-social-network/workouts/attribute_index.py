@@ -0,0 +1,138 @@
+# workouts/attribute_index.py
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from rest_framework.filters import BaseFilterBackend
+
+from .models import WorkoutTemplate, Program, WorkoutInstance, WorkoutAttributeIndex
+
+# JSON list fields indexed for each model, by index kind
+INDEXED_FIELDS = {
+    WorkoutTemplate: {'tag': 'tags', 'equipment': 'equipment_required'},
+    Program: {'tag': 'tags', 'equipment': 'required_equipment'},
+    WorkoutInstance: {'tag': 'tags', 'equipment': 'equipment_required'},
+}
+
+
+def normalize_attribute_value(value):
+    """Tags and equipment are matched case-insensitively and without surrounding spaces"""
+    return str(value).strip().lower()[:100]
+
+
+def parse_values(params, name):
+    """Accept both ?tag=a&tag=b and ?tag=a,b"""
+    values = set()
+    for raw in params.getlist(name):
+        values.update(normalize_attribute_value(v) for v in raw.split(',') if v.strip())
+    return values
+
+
+class AttributeIndex:
+    """Maintains and queries WorkoutAttributeIndex rows"""
+
+    @classmethod
+    def values_for(cls, instance):
+        """The set of (kind, value) pairs an instance should be indexed under"""
+        pairs = set()
+        for kind, field in INDEXED_FIELDS[type(instance)].items():
+            for value in getattr(instance, field) or []:
+                if isinstance(value, (str, int)):
+                    value = normalize_attribute_value(value)
+                    if value:
+                        pairs.add((kind, value))
+        return pairs
+
+    @classmethod
+    def sync(cls, instance):
+        """Bring an instance's index rows in line with its JSON fields"""
+        content_type = ContentType.objects.get_for_model(instance)
+        desired = cls.values_for(instance)
+        row_ids = {
+            (kind, value): row_id
+            for row_id, kind, value in WorkoutAttributeIndex.objects.filter(
+                content_type=content_type, object_id=instance.pk
+            ).values_list('id', 'kind', 'value')
+        }
+        existing = set(row_ids)
+        if desired == existing:
+            return
+
+        with transaction.atomic():
+            stale = existing - desired
+            if stale:
+                WorkoutAttributeIndex.objects.filter(id__in=[row_ids[pair] for pair in stale]).delete()
+            WorkoutAttributeIndex.objects.bulk_create([
+                WorkoutAttributeIndex(content_type=content_type, object_id=instance.pk, kind=kind, value=value)
+                for kind, value in desired - existing
+            ], ignore_conflicts=True)
+
+    @classmethod
+    def remove(cls, instance):
+        WorkoutAttributeIndex.objects.filter(
+            content_type=ContentType.objects.get_for_model(instance),
+            object_id=instance.pk
+        ).delete()
+
+    @classmethod
+    def rebuild(cls, model, batch_size=1000):
+        """Rebuild all index rows for one model; returns the number of rows written"""
+        content_type = ContentType.objects.get_for_model(model)
+        fields = ['pk'] + list(INDEXED_FIELDS[model].values())
+        written = 0
+
+        with transaction.atomic():
+            WorkoutAttributeIndex.objects.filter(content_type=content_type).delete()
+            batch = []
+            for instance in model.objects.only(*fields).iterator(chunk_size=batch_size):
+                batch.extend(
+                    WorkoutAttributeIndex(content_type=content_type, object_id=instance.pk, kind=kind, value=value)
+                    for kind, value in cls.values_for(instance)
+                )
+                if len(batch) >= batch_size:
+                    WorkoutAttributeIndex.objects.bulk_create(batch, ignore_conflicts=True)
+                    written += len(batch)
+                    batch = []
+            WorkoutAttributeIndex.objects.bulk_create(batch, ignore_conflicts=True)
+            written += len(batch)
+        return written
+
+    @classmethod
+    def _ids(cls, content_type, kind, values=None, exclude_values=None):
+        rows = WorkoutAttributeIndex.objects.filter(content_type=content_type, kind=kind)
+        if values is not None:
+            rows = rows.filter(value__in=values)
+        if exclude_values is not None:
+            rows = rows.exclude(value__in=exclude_values)
+        return rows.values('object_id')
+
+    @classmethod
+    def filter_queryset(cls, queryset, params):
+        """
+        Apply index-backed filters from query params:
+        - tag / equipment: must have every listed value
+        - any_tag: must have at least one listed tag
+        - equipment_only: must not require anything outside the listed equipment
+        """
+        content_type = ContentType.objects.get_for_model(queryset.model)
+
+        for kind in ('tag', 'equipment'):
+            for value in parse_values(params, kind):
+                queryset = queryset.filter(pk__in=cls._ids(content_type, kind, values=[value]))
+
+        any_tags = parse_values(params, 'any_tag')
+        if any_tags:
+            queryset = queryset.filter(pk__in=cls._ids(content_type, 'tag', values=any_tags))
+
+        if 'equipment_only' in params:
+            allowed = parse_values(params, 'equipment_only')
+            queryset = queryset.exclude(pk__in=cls._ids(content_type, 'equipment', exclude_values=allowed))
+
+        return queryset
+
+
+class AttributeIndexFilter(BaseFilterBackend):
+    """DRF filter backend exposing ?tag=, ?any_tag=, ?equipment= and ?equipment_only= on list views"""
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'action', None) != 'list':
+            return queryset
+        return AttributeIndex.filter_queryset(queryset, request.query_params)
@@ -0,0 +1,163 @@
+# workouts/catalog.py
+import hashlib
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Program, WorkoutInstance, ProgramCatalogEntry, ProgramCatalogFacet
+from .attribute_index import normalize_attribute_value
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = 'program_catalog:version'
+CATALOG_PAGE_TTL = 900  # 15 minutes; pages are also invalidated by every refresh
+
+# Popularity weights: an active user signals more than a fork, a fork more than a like
+LIKE_WEIGHT = 1.0
+FORK_WEIGHT = 3.0
+ACTIVE_USER_WEIGHT = 5.0
+
+ORDERINGS = {
+    'popular': ['-popularity', '-program_created_at'],
+    'recent': ['-program_created_at'],
+    'likes': ['-likes_count', '-program_created_at'],
+    'forks': ['-forks_count', '-program_created_at'],
+    'active': ['-active_users_count', '-program_created_at'],
+}
+
+FACET_FILTERS = ('focus', 'difficulty_level', 'sessions_per_week', 'tag', 'equipment', 'ordering', 'page', 'page_size')
+
+
+def count_subquery(queryset, field):
+    """Rows of queryset pointing at the outer row through field, without joining them into the outer query"""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+class ProgramCatalog:
+    """Builds and queries the public program discovery catalog"""
+
+    @classmethod
+    def refresh(cls, batch_size=500):
+        """Rebuild catalog rows for all public programs; returns (upserted, removed)"""
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+
+        programs = Program.objects.filter(is_public=True).select_related('creator').annotate(
+            catalog_forks=count_subquery(Program.objects.all(), 'forked_from'),
+            catalog_workouts=count_subquery(WorkoutInstance.objects.all(), 'program'),
+            catalog_active_users=count_subquery(User.objects.all(), 'current_program'),
+        )
+
+        entries, facets = [], []
+        for program in programs.iterator(chunk_size=batch_size):
+            popularity = (
+                program.likes_count * LIKE_WEIGHT
+                + program.catalog_forks * FORK_WEIGHT
+                + program.catalog_active_users * ACTIVE_USER_WEIGHT
+            )
+            entries.append(ProgramCatalogEntry(
+                program_id=program.pk,
+                creator_id=program.creator_id,
+                creator_username=program.creator.username,
+                name=program.name,
+                description=program.description,
+                focus=program.focus,
+                difficulty_level=program.difficulty_level,
+                recommended_level=program.recommended_level,
+                sessions_per_week=program.sessions_per_week,
+                estimated_completion_weeks=program.estimated_completion_weeks,
+                tags=program.tags or [],
+                required_equipment=program.required_equipment or [],
+                workouts_count=program.catalog_workouts,
+                likes_count=program.likes_count,
+                forks_count=program.catalog_forks,
+                active_users_count=program.catalog_active_users,
+                popularity=popularity,
+                program_created_at=program.created_at,
+            ))
+            facets.extend(cls._facets_for(program))
+
+        update_fields = [
+            field.name for field in ProgramCatalogEntry._meta.concrete_fields
+            if not field.primary_key
+        ]
+        with transaction.atomic():
+            ProgramCatalogEntry.objects.bulk_create(
+                entries,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['program'],
+                update_fields=update_fields,
+            )
+            _, deleted = ProgramCatalogEntry.objects.exclude(
+                program__is_public=True
+            ).delete()
+            removed = deleted.get(ProgramCatalogEntry._meta.label, 0)
+            ProgramCatalogFacet.objects.all().delete()
+            ProgramCatalogFacet.objects.bulk_create(facets, batch_size=batch_size)
+
+        cls.invalidate()
+        logger.info(f"Program catalog refreshed: {len(entries)} entries, {removed} removed")
+        return len(entries), removed
+
+    @classmethod
+    def _facets_for(cls, program):
+        seen = set()
+        for kind, values in (('tag', program.tags), ('equipment', program.required_equipment)):
+            for value in values or []:
+                if not isinstance(value, (str, int)):
+                    continue
+                value = normalize_attribute_value(value)
+                if value and (kind, value) not in seen:
+                    seen.add((kind, value))
+                    yield ProgramCatalogFacet(entry_id=program.pk, kind=kind, value=value)
+
+    @classmethod
+    def invalidate(cls):
+        """Drop every cached page by moving to a new cache version"""
+        cache.set(CATALOG_VERSION_KEY, timezone.now().timestamp(), None)
+
+    @classmethod
+    def page_cache_key(cls, params):
+        version = cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            version = timezone.now().timestamp()
+            cache.add(CATALOG_VERSION_KEY, version, None)
+            version = cache.get(CATALOG_VERSION_KEY, version)
+        normalized = '&'.join(
+            f"{key}={','.join(sorted(params.getlist(key)))}"
+            for key in sorted(FACET_FILTERS) if key in params
+        )
+        digest = hashlib.md5(normalized.encode()).hexdigest()
+        return f"program_catalog:{version}:{digest}"
+
+    @classmethod
+    def filter_entries(cls, params):
+        """Apply facet filters and ranking from query params"""
+        queryset = ProgramCatalogEntry.objects.all()
+
+        if params.get('focus'):
+            queryset = queryset.filter(focus=params['focus'])
+        if params.get('difficulty_level'):
+            queryset = queryset.filter(difficulty_level=params['difficulty_level'])
+        if params.get('sessions_per_week'):
+            queryset = queryset.filter(sessions_per_week=int(params['sessions_per_week']))
+
+        # Each requested tag/equipment value must be present (AND semantics)
+        for kind, param in (('tag', 'tag'), ('equipment', 'equipment')):
+            for value in params.getlist(param):
+                queryset = queryset.filter(
+                    pk__in=ProgramCatalogFacet.objects.filter(
+                        kind=kind, value=normalize_attribute_value(value)
+                    ).values('entry_id')
+                )
+
+        ordering = ORDERINGS.get(params.get('ordering', 'popular'), ORDERINGS['popular'])
+        return queryset.order_by(*ordering)
@@ -0,0 +1,165 @@
+# workouts/chat.py
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db.models import Q
+
+from .group_workouts import GroupWorkout, GroupWorkoutParticipant, GroupWorkoutMessage
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_TTL = 3600  # Stale presence expires if a socket dies without disconnecting
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+MAX_MESSAGE_LENGTH = 2000
+
+
+class GroupWorkoutChat:
+    """Presence, history, persistence and fan-out for group workout chat"""
+
+    @classmethod
+    def group_name(cls, group_workout_id):
+        return f"group_workout_chat_{group_workout_id}"
+
+    @classmethod
+    def _presence_key(cls, group_workout_id, user_id):
+        return f"group_workout_chat:{group_workout_id}:online:{user_id}"
+
+    @classmethod
+    def can_chat(cls, user, group_workout_id):
+        """Joined participants and the creator can read and post"""
+        return GroupWorkout.objects.filter(
+            Q(creator=user) | Q(participants__user=user, participants__status='joined'),
+            pk=group_workout_id
+        ).exists()
+
+    @classmethod
+    def mark_online(cls, group_workout_id, user_id):
+        """Count open sockets per user so multiple devices are handled"""
+        key = cls._presence_key(group_workout_id, user_id)
+        cache.add(key, 0, PRESENCE_TTL)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, PRESENCE_TTL)
+        cache.touch(key, PRESENCE_TTL)
+
+    @classmethod
+    def touch(cls, group_workout_id, user_id):
+        cache.touch(cls._presence_key(group_workout_id, user_id), PRESENCE_TTL)
+
+    @classmethod
+    def mark_offline(cls, group_workout_id, user_id):
+        key = cls._presence_key(group_workout_id, user_id)
+        try:
+            if cache.decr(key) <= 0:
+                cache.delete(key)
+        except ValueError:
+            pass
+
+    @classmethod
+    def online_user_ids(cls, group_workout_id, user_ids):
+        keys = {cls._presence_key(group_workout_id, user_id): user_id for user_id in user_ids}
+        return {keys[key] for key, count in cache.get_many(list(keys)).items() if count and count > 0}
+
+    @classmethod
+    def history(cls, group_workout_id, before=None, limit=HISTORY_PAGE_SIZE):
+        """
+        Keyset page of messages older than the `before` message id.
+        Returns (messages oldest-first, cursor for the next older page or None).
+        """
+        limit = max(1, min(int(limit), MAX_HISTORY_PAGE_SIZE))
+        queryset = GroupWorkoutMessage.objects.filter(
+            group_workout_id=group_workout_id
+        ).select_related('user').order_by('-id')
+        if before:
+            queryset = queryset.filter(id__lt=before)
+
+        rows = list(queryset[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_before = rows[-1].id if has_more and rows else None
+        rows.reverse()
+        return rows, next_before
+
+    @classmethod
+    def persist(cls, pending):
+        """
+        Store a batch of broadcast messages with one insert and notify
+        participants who were not connected when the batch was written
+        """
+        messages = GroupWorkoutMessage.objects.bulk_create([
+            GroupWorkoutMessage(
+                group_workout_id=item['group_workout_id'],
+                user_id=item['user_id'],
+                content=item['content'],
+            )
+            for item in pending
+        ])
+
+        # One notification per recipient per workout for the whole batch
+        latest = {}
+        for message in messages:
+            latest[message.group_workout_id] = message
+        for message in latest.values():
+            senders = {m.user_id for m in messages if m.group_workout_id == message.group_workout_id}
+            cls.notify_offline(message, exclude_user_ids=senders)
+        return messages
+
+    @classmethod
+    def offline_recipients(cls, message, exclude_user_ids=None):
+        """Joined participants, the creator included as one, who are not connected to the chat"""
+        exclude_user_ids = set(exclude_user_ids or ()) | {message.user_id}
+        participants = [
+            participant for participant in GroupWorkoutParticipant.objects.filter(
+                group_workout_id=message.group_workout_id, status='joined'
+            ).select_related('user')
+            if participant.user_id not in exclude_user_ids
+        ]
+        online = cls.online_user_ids(message.group_workout_id, [p.user_id for p in participants])
+        return [participant for participant in participants if participant.user_id not in online]
+
+    @classmethod
+    def notify_offline(cls, message, exclude_user_ids=None):
+        from notifications.services import NotificationService
+
+        recipients = cls.offline_recipients(message, exclude_user_ids)
+        if recipients:
+            try:
+                NotificationService.create_group_workout_message_notification(
+                    message=message,
+                    participants=recipients
+                )
+            except Exception as e:
+                logger.error(f"Error notifying chat participants for message {message.id}: {e}")
+
+    @classmethod
+    def serialize(cls, message, user_details=None):
+        return {
+            'id': message.id,
+            'group_workout': message.group_workout_id,
+            'user': message.user_id,
+            'user_details': user_details or {
+                'id': message.user_id,
+                'username': message.user.username,
+                'avatar': message.user.avatar.url if message.user.avatar else None,
+            },
+            'content': message.content,
+            'created_at': message.created_at.isoformat() if message.created_at else None,
+        }
+
+    @classmethod
+    def broadcast(cls, group_workout_id, payload):
+        """Push a message to connected chat sockets from synchronous code"""
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            async_to_sync(channel_layer.group_send)(
+                cls.group_name(group_workout_id),
+                {'type': 'chat_message', 'message': payload}
+            )
+        except Exception as e:
+            logger.error(f"Error broadcasting chat message for group workout {group_workout_id}: {e}")
@@ -0,0 +1,148 @@
+# workouts/consumers.py
+import asyncio
+import json
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.utils import timezone
+
+from .chat import GroupWorkoutChat, HISTORY_PAGE_SIZE, MAX_MESSAGE_LENGTH
+
+
+class GroupWorkoutChatConsumer(AsyncWebsocketConsumer):
+    """
+    Chat room for one group workout. Messages are broadcast to the room
+    immediately and written to the database in small batches.
+    """
+    FLUSH_SIZE = 20
+    FLUSH_INTERVAL = 1.0  # seconds
+
+    async def connect(self):
+        self.user = self.scope["user"]
+        self.pending = []
+        self.flush_task = None
+
+        if not self.user.is_authenticated:
+            await self.close(code=4003)
+            return
+
+        self.group_workout_id = int(self.scope['url_route']['kwargs']['group_workout_id'])
+        if not await database_sync_to_async(GroupWorkoutChat.can_chat)(self.user, self.group_workout_id):
+            await self.close(code=4003)
+            return
+
+        self.room_group_name = GroupWorkoutChat.group_name(self.group_workout_id)
+        self.user_details = {
+            'id': self.user.id,
+            'username': self.user.username,
+            'avatar': self.user.avatar.url if self.user.avatar else None,
+        }
+
+        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        await self.accept()
+        await database_sync_to_async(GroupWorkoutChat.mark_online)(self.group_workout_id, self.user.id)
+        await self.send_history()
+
+    async def disconnect(self, close_code):
+        if not hasattr(self, 'room_group_name'):
+            return
+        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        if self.flush_task:
+            self.flush_task.cancel()
+        await self.flush()
+        await database_sync_to_async(GroupWorkoutChat.mark_offline)(self.group_workout_id, self.user.id)
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            await self.send_error("Invalid JSON")
+            return
+
+        message_type = data.get('type')
+        if message_type == 'message':
+            await self.handle_message(data)
+        elif message_type == 'history':
+            await self.send_history(before=data.get('before'), limit=data.get('limit', HISTORY_PAGE_SIZE))
+        elif message_type == 'ping':
+            await database_sync_to_async(GroupWorkoutChat.touch)(self.group_workout_id, self.user.id)
+            await self.send(text_data=json.dumps({'type': 'pong'}))
+
+    async def handle_message(self, data):
+        content = (data.get('content') or '').strip()
+        if not content:
+            await self.send_error("Message content is required.")
+            return
+        if len(content) > MAX_MESSAGE_LENGTH:
+            await self.send_error(f"Messages are limited to {MAX_MESSAGE_LENGTH} characters.")
+            return
+
+        # The id is assigned when the batch is persisted; clients match their own echo by client_id
+        await self.channel_layer.group_send(self.room_group_name, {
+            'type': 'chat_message',
+            'message': {
+                'id': None,
+                'client_id': data.get('client_id'),
+                'group_workout': self.group_workout_id,
+                'user': self.user.id,
+                'user_details': self.user_details,
+                'content': content,
+                'created_at': timezone.now().isoformat(),
+            }
+        })
+
+        self.pending.append({
+            'group_workout_id': self.group_workout_id,
+            'user_id': self.user.id,
+            'content': content,
+        })
+        if len(self.pending) >= self.FLUSH_SIZE:
+            await self.flush()
+        elif self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.ensure_future(self.delayed_flush())
+
+    async def delayed_flush(self):
+        await asyncio.sleep(self.FLUSH_INTERVAL)
+        await self.flush()
+
+    async def flush(self):
+        batch, self.pending = self.pending, []
+        if batch:
+            await database_sync_to_async(GroupWorkoutChat.persist)(batch)
+
+    async def send_history(self, before=None, limit=HISTORY_PAGE_SIZE):
+        # Make sure this socket's own unsaved messages show up in its history
+        await self.flush()
+        try:
+            messages, next_before = await database_sync_to_async(self.load_history)(before, limit)
+        except (TypeError, ValueError):
+            await self.send_error("Invalid history cursor.")
+            return
+        await self.send(text_data=json.dumps({
+            'type': 'history',
+            'messages': messages,
+            'next_before': next_before,
+        }))
+
+    def load_history(self, before, limit):
+        messages, next_before = GroupWorkoutChat.history(
+            self.group_workout_id, before=int(before) if before else None, limit=limit
+        )
+        return [GroupWorkoutChat.serialize(message) for message in messages], next_before
+
+    async def send_error(self, detail):
+        await self.send(text_data=json.dumps({'type': 'error', 'detail': detail}))
+
+    # Handle message broadcast to the room group
+    async def chat_message(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'chat_message',
+            'message': event['message'],
+        }))
+
+    # Handle proposal vote tallies pushed by ProposalVoteService
+    async def proposal_tally(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'proposal_tally',
+            'tally': event['tally'],
+        }))
@@ -0,0 +1,171 @@
+# workouts/group_workout_completion.py
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .group_workouts import GroupWorkout, GroupWorkoutParticipant
+from .models import WorkoutLog, ExerciseLog, SetLog, ExerciseTemplate
+from .streaks import StreakTracker
+from users.counters import UserCounterService
+from users.profile import ProfileService
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('scheduled', 'in_progress')
+AUTO_COMPLETE_AFTER = timedelta(hours=24)
+
+EXERCISE_FIELDS = ('name', 'equipment', 'notes', 'order', 'effort_type', 'superset_with', 'is_superset')
+SET_FIELDS = ('reps', 'weight', 'weight_unit', 'duration', 'distance', 'rest_time', 'order')
+
+
+class GroupWorkoutCompletionService:
+    """
+    Completes group workouts: one workout log per joined participant (with the
+    template's exercises and sets), written and notified in bulk
+    """
+
+    @classmethod
+    def complete(cls, group_workout, sender=None, auto=False):
+        """
+        Mark a group workout as completed and log it for every joined participant.
+        Returns the created workout logs, or None if the workout was no longer open.
+        """
+        with transaction.atomic():
+            # Lock the row so the sweeper and the creator cannot complete it twice
+            locked = GroupWorkout.objects.select_for_update().filter(
+                pk=group_workout.pk, status__in=OPEN_STATUSES
+            ).first()
+            if locked is None:
+                return None
+
+            GroupWorkout.objects.filter(pk=locked.pk).update(status='completed', updated_at=timezone.now())
+            group_workout.status = 'completed'
+            logs = cls._create_logs(locked, auto=auto)
+
+        if logs:
+            transaction.on_commit(lambda: cls._notify(locked, logs, sender, auto))
+        return logs
+
+    @classmethod
+    def _create_logs(cls, group_workout, auto=False):
+        participants = list(
+            GroupWorkoutParticipant.objects.filter(
+                group_workout=group_workout, status='joined', workout_log__isnull=True
+            ).select_related('user')
+        )
+        if not participants:
+            return []
+
+        notes = (
+            f"Auto-completed from group workout: {group_workout.title}" if auto
+            else f"Completed as part of group workout: {group_workout.title}"
+        )
+        logs = WorkoutLog.objects.bulk_create([
+            WorkoutLog(
+                user=participant.user,
+                name=group_workout.title,
+                date=group_workout.scheduled_time,
+                gym_id=group_workout.gym_id,
+                notes=notes,
+                completed=True,
+            )
+            for participant in participants
+        ])
+
+        if group_workout.workout_template_id:
+            cls._copy_template_exercises(group_workout.workout_template_id, logs)
+
+        for participant, log in zip(participants, logs):
+            participant.workout_log = log
+        GroupWorkoutParticipant.objects.bulk_update(participants, ['workout_log'])
+
+        # bulk_create skips post_save, so streaks, counters and profiles are updated explicitly
+        for log in logs:
+            StreakTracker.record_workout(log)
+            UserCounterService.adjust(log.user_id, workouts_count=1)
+        ProfileService.bump(*(log.user_id for log in logs))
+        return logs
+
+    @classmethod
+    def _copy_template_exercises(cls, template_id, logs):
+        """Copy the template's exercises and sets into every log with two inserts"""
+        exercises = list(
+            ExerciseTemplate.objects.filter(workout_id=template_id).prefetch_related('sets').order_by('order')
+        )
+        if not exercises:
+            return
+
+        exercise_logs, sources = [], []
+        for log in logs:
+            for exercise in exercises:
+                exercise_logs.append(ExerciseLog(
+                    workout=log,
+                    **{field: getattr(exercise, field) for field in EXERCISE_FIELDS}
+                ))
+                sources.append(exercise)
+        exercise_logs = ExerciseLog.objects.bulk_create(exercise_logs)
+
+        SetLog.objects.bulk_create([
+            SetLog(exercise=exercise_log, **{field: getattr(set_template, field) for field in SET_FIELDS})
+            for exercise_log, exercise in zip(exercise_logs, sources)
+            for set_template in exercise.sets.all()
+        ])
+
+    @classmethod
+    def _notify(cls, group_workout, logs, sender, auto):
+        from notifications.services import NotificationService
+
+        content = (
+            f"Group workout {group_workout.title} has been automatically marked as completed" if auto
+            else f"Group workout {group_workout.title} has been marked as completed"
+        )
+        try:
+            NotificationService.bulk_create_notifications(
+                recipients=[log.user for log in logs],
+                notification_type='workout_completed',
+                related_objects=logs,
+                sender=sender,
+                content=content,
+            )
+        except Exception as e:
+            logger.error(f"Error sending completion notifications for group workout {group_workout.id}: {e}")
+
+    @classmethod
+    def overdue(cls, now=None, grace=AUTO_COMPLETE_AFTER):
+        """Open group workouts scheduled more than `grace` ago"""
+        now = now or timezone.now()
+        return GroupWorkout.objects.filter(
+            status__in=OPEN_STATUSES, scheduled_time__lt=now - grace
+        ).order_by('pk')
+
+    @classmethod
+    def complete_overdue(cls, batch_size=100, now=None, grace=AUTO_COMPLETE_AFTER):
+        """
+        Sweep overdue group workouts in batches; each workout commits on its own
+        so one failure does not roll back the rest. Returns (workouts, logs) counts.
+        """
+        completed_workouts = created_logs = 0
+        last_pk = None
+        while True:
+            batch = cls.overdue(now, grace)
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+
+            for group_workout in batch:
+                try:
+                    logs = cls.complete(group_workout, auto=True)
+                except Exception as e:
+                    logger.error(f"Error auto-completing group workout {group_workout.id}: {e}")
+                    continue
+                if logs is not None:
+                    completed_workouts += 1
+                    created_logs += len(logs)
+            last_pk = batch[-1].pk
+
+        logger.info(f"Auto-completed {completed_workouts} group workouts, {created_logs} workout logs created")
+        return completed_workouts, created_logs
@@ -0,0 +1,97 @@
+# workouts/group_workout_index.py
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .group_workouts import (
+    GroupWorkout,
+    GroupWorkoutParticipant,
+    GroupWorkoutJoinRequest,
+    GroupWorkoutAccess,
+)
+
+
+class GroupWorkoutIndex:
+    """Maintains the group workout visibility index and stored participant counts"""
+
+    @classmethod
+    def accessible_ids(cls, user):
+        """Subquery of group workout ids the user created or has a participant record for"""
+        return GroupWorkoutAccess.objects.filter(user=user).values('group_workout_id')
+
+    @classmethod
+    def participating_ids(cls, user, status):
+        return GroupWorkoutParticipant.objects.filter(user=user, status=status).values('group_workout_id')
+
+    @classmethod
+    def visible_filter(cls, user):
+        """Public workouts plus the user's own, without joining participants"""
+        return Q(privacy='public') | Q(id__in=cls.accessible_ids(user))
+
+    @classmethod
+    def grant(cls, user_id, group_workout_id):
+        GroupWorkoutAccess.objects.get_or_create(user_id=user_id, group_workout_id=group_workout_id)
+
+    @classmethod
+    def revoke(cls, user_id, group_workout_id):
+        """Drop access unless the user still created the workout"""
+        if GroupWorkout.objects.filter(pk=group_workout_id, creator_id=user_id).exists():
+            return
+        GroupWorkoutAccess.objects.filter(user_id=user_id, group_workout_id=group_workout_id).delete()
+
+    @classmethod
+    def adjust_participants_count(cls, group_workout_id, delta):
+        if delta > 0:
+            GroupWorkout.objects.filter(pk=group_workout_id).update(
+                participants_count=F('participants_count') + delta
+            )
+        elif delta < 0:
+            GroupWorkout.objects.filter(pk=group_workout_id, participants_count__gte=-delta).update(
+                participants_count=F('participants_count') + delta
+            )
+
+    @classmethod
+    def viewer_statuses(cls, user, group_workouts):
+        """current_user_status for a page of workouts in two queries"""
+        if not user or not user.is_authenticated:
+            return {}
+        ids = [workout.pk for workout in group_workouts]
+        statuses = {
+            group_workout_id: f"request_{status}"
+            for group_workout_id, status in GroupWorkoutJoinRequest.objects.filter(
+                user=user, group_workout_id__in=ids
+            ).values_list('group_workout_id', 'status')
+        }
+        # Participant status takes precedence over join requests
+        statuses.update(
+            GroupWorkoutParticipant.objects.filter(
+                user=user, group_workout_id__in=ids
+            ).values_list('group_workout_id', 'status')
+        )
+        return {group_workout_id: statuses.get(group_workout_id, 'not_participating') for group_workout_id in ids}
+
+    @classmethod
+    def rebuild(cls, batch_size=5000):
+        """Recompute access rows and participant counts from source tables; returns access row count"""
+        with transaction.atomic():
+            GroupWorkoutAccess.objects.all().delete()
+            pairs = GroupWorkout.objects.order_by().values_list('creator_id', 'id').union(
+                GroupWorkoutParticipant.objects.order_by().values_list('user_id', 'group_workout_id')
+            )
+            batch, written = [], 0
+            for user_id, group_workout_id in pairs.iterator(chunk_size=batch_size):
+                batch.append(GroupWorkoutAccess(user_id=user_id, group_workout_id=group_workout_id))
+                if len(batch) >= batch_size:
+                    GroupWorkoutAccess.objects.bulk_create(batch, ignore_conflicts=True)
+                    written += len(batch)
+                    batch = []
+            GroupWorkoutAccess.objects.bulk_create(batch, ignore_conflicts=True)
+            written += len(batch)
+
+            joined = GroupWorkoutParticipant.objects.filter(
+                group_workout_id=OuterRef('pk'), status='joined'
+            ).order_by().values('group_workout_id').annotate(total=Count('id')).values('total')
+            GroupWorkout.objects.update(
+                participants_count=Coalesce(Subquery(joined, output_field=IntegerField()), Value(0))
+            )
+        return written
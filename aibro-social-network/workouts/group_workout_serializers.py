@@ -1,6 +1,5 @@
 # workouts/group_workout_serializers.py
 from rest_framework import serializers
-from django.db.models import Count
 
 from .group_workouts import (
     GroupWorkout, 
@@ -10,12 +9,13 @@ from .group_workouts import (
     GroupWorkoutProposal,
     GroupWorkoutVote,
 )
-from users.serializers import UserSerializer
+from users.serializers import UserReferenceSerializer
 from gyms.serializers import GymSerializer
 from .serializers import WorkoutTemplateSerializer
+from .proposal_votes import ProposalVoteService
 
 class GroupWorkoutMessageSerializer(serializers.ModelSerializer):
-    user_details = UserSerializer(source='user', read_only=True, fields=['id', 'username', 'avatar'])
+    user_details = UserReferenceSerializer(source='user', read_only=True)
     
     class Meta:
         model = GroupWorkoutMessage
@@ -27,7 +27,7 @@ class GroupWorkoutMessageSerializer(serializers.ModelSerializer):
         }
 
 class GroupWorkoutJoinRequestSerializer(serializers.ModelSerializer):
-    user_details = UserSerializer(source='user', read_only=True, fields=['id', 'username', 'avatar'])
+    user_details = UserReferenceSerializer(source='user', read_only=True)
     
     class Meta:
         model = GroupWorkoutJoinRequest
@@ -39,7 +39,7 @@ class GroupWorkoutJoinRequestSerializer(serializers.ModelSerializer):
         }
 
 class GroupWorkoutParticipantSerializer(serializers.ModelSerializer):
-    user_details = UserSerializer(source='user', read_only=True, fields=['id', 'username', 'avatar'])
+    user_details = UserReferenceSerializer(source='user', read_only=True)
     
     class Meta:
         model = GroupWorkoutParticipant
@@ -51,8 +51,7 @@ class GroupWorkoutParticipantSerializer(serializers.ModelSerializer):
         }
 
 class GroupWorkoutSerializer(serializers.ModelSerializer):
-    participants_count = serializers.SerializerMethodField()
-    creator_details = UserSerializer(source='creator', read_only=True, fields=['id', 'username', 'avatar'])
+    creator_details = UserReferenceSerializer(source='creator', read_only=True)
     gym_details = GymSerializer(source='gym', read_only=True)
     workout_template_details = WorkoutTemplateSerializer(source='workout_template', read_only=True)
     is_creator = serializers.SerializerMethodField()
@@ -69,10 +68,7 @@ class GroupWorkoutSerializer(serializers.ModelSerializer):
             'participants_count', 'is_creator', 'current_user_status',
             'is_full', 'is_active'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'is_active']
-    
-    def get_participants_count(self, obj):
-        return obj.participants.filter(status='joined').count()
+        read_only_fields = ['id', 'created_at', 'updated_at', 'is_active', 'participants_count']
     
     def get_is_creator(self, obj):
         request = self.context.get('request')
@@ -81,6 +77,10 @@ class GroupWorkoutSerializer(serializers.ModelSerializer):
         return False
     
     def get_current_user_status(self, obj):
+        # List views resolve the whole page at once (see GroupWorkoutIndex.viewer_statuses)
+        viewer_statuses = self.context.get('viewer_statuses')
+        if viewer_statuses is not None and obj.pk in viewer_statuses:
+            return viewer_statuses[obj.pk]
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             try:
@@ -97,7 +97,14 @@ class GroupWorkoutSerializer(serializers.ModelSerializer):
     def get_is_full(self, obj):
         if obj.max_participants == 0:  # Unlimited
             return False
-        return obj.participants.filter(status='joined').count() >= obj.max_participants
+        return obj.participants_count >= obj.max_participants
+
+class GroupWorkoutListSerializer(GroupWorkoutSerializer):
+    """List representation: participants are included, messages and proposals are not"""
+    participants = GroupWorkoutParticipantSerializer(many=True, read_only=True)
+    
+    class Meta(GroupWorkoutSerializer.Meta):
+        fields = GroupWorkoutSerializer.Meta.fields + ['participants']
 
 class GroupWorkoutDetailSerializer(GroupWorkoutSerializer):
     participants = serializers.SerializerMethodField()
@@ -121,9 +128,7 @@ class GroupWorkoutDetailSerializer(GroupWorkoutSerializer):
         return []
     
     def get_most_voted_proposal(self, obj):
-        most_voted = obj.proposals.annotate(
-            votes_count=Count('votes')
-        ).order_by('-votes_count').first()
+        most_voted = ProposalVoteService.leader(obj.id)
         
         if most_voted:
             return GroupWorkoutProposalSerializer(most_voted, context=self.context).data
@@ -131,8 +136,8 @@ class GroupWorkoutDetailSerializer(GroupWorkoutSerializer):
 
 class GroupWorkoutProposalSerializer(serializers.ModelSerializer):
     workout_template_details = WorkoutTemplateSerializer(source='workout_template', read_only=True)
-    proposed_by_details = UserSerializer(source='proposed_by', read_only=True, fields=['id', 'username', 'avatar'])
-    vote_count = serializers.SerializerMethodField()
+    proposed_by_details = UserReferenceSerializer(source='proposed_by', read_only=True)
+    vote_count = serializers.IntegerField(source='votes_count', read_only=True)
     has_voted = serializers.SerializerMethodField()
     
     class Meta:
@@ -147,17 +152,18 @@ class GroupWorkoutProposalSerializer(serializers.ModelSerializer):
             'group_workout': {'write_only': True},
         }
     
-    def get_vote_count(self, obj):
-        return obj.votes.count()
-    
     def get_has_voted(self, obj):
+        # Use the batched lookup when the view provided one
+        voted_ids = self.context.get('voted_proposal_ids')
+        if voted_ids is not None:
+            return obj.pk in voted_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.votes.filter(user=request.user).exists()
         return False
 
 class GroupWorkoutVoteSerializer(serializers.ModelSerializer):
-    user_details = UserSerializer(source='user', read_only=True, fields=['id', 'username', 'avatar'])
+    user_details = UserReferenceSerializer(source='user', read_only=True)
     
     class Meta:
         model = GroupWorkoutVote
@@ -3,7 +3,6 @@ from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import transaction
-from django.db.models import Count 
 from django.utils import timezone
 from django.db.models import Q
 
@@ -12,11 +11,11 @@ from .group_workouts import (
     GroupWorkoutParticipant, 
     GroupWorkoutJoinRequest, 
     GroupWorkoutMessage,
-    GroupWorkoutVote,
     GroupWorkoutProposal
 )
 from .group_workout_serializers import (
     GroupWorkoutSerializer,
+    GroupWorkoutListSerializer,
     GroupWorkoutDetailSerializer,
     GroupWorkoutParticipantSerializer,
     GroupWorkoutJoinRequestSerializer,
@@ -24,9 +23,15 @@ from .group_workout_serializers import (
     GroupWorkoutProposalSerializer,
     GroupWorkoutVoteSerializer
 )
-from .models import WorkoutLog
+from .group_workout_completion import GroupWorkoutCompletionService
+from .proposal_votes import ProposalVoteService
+from .nearby import NearbyGroupWorkouts, DEFAULT_RADIUS_KM, DEFAULT_DAYS_AHEAD, MAX_RADIUS_KM, MAX_DAYS_AHEAD
+from gyms.geo import parse_point
+from .group_workout_index import GroupWorkoutIndex
+from .chat import GroupWorkoutChat, HISTORY_PAGE_SIZE
 from notifications.services import NotificationService
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
@@ -39,16 +44,34 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
     ordering = ['-scheduled_time']
     
     def get_serializer_class(self):
+        if self.action == 'list':
+            return GroupWorkoutListSerializer
         return GroupWorkoutDetailSerializer
-       
+    
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.viewer_statuses = GroupWorkoutIndex.viewer_statuses(self.request.user, page)
+        return page
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        viewer_statuses = getattr(self, 'viewer_statuses', None)
+        if viewer_statuses is not None:
+            context['viewer_statuses'] = viewer_statuses
+        return context
     
     def get_queryset(self):
         user = self.request.user
         queryset = GroupWorkout.objects.select_related(
             'creator', 'gym', 'workout_template'
-        ).prefetch_related(
-            'participants', 'join_requests', 'messages'
         )
+        if self.action == 'list':
+            queryset = queryset.prefetch_related('participants__user')
+        else:
+            queryset = queryset.prefetch_related(
+                'participants__user', 'join_requests__user', 'messages__user'
+            )
         
         # Check if a specific user_id is requested
         user_id = self.request.query_params.get('user_id')
@@ -84,30 +107,24 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
         elif participation == 'joined':
             # Workouts the target user has joined
             queryset = queryset.filter(
-                participants__user=target_user,
-                participants__status='joined'
+                id__in=GroupWorkoutIndex.participating_ids(target_user, 'joined')
             )
         elif participation == 'invited':
             # Workouts the target user has been invited to
             queryset = queryset.filter(
-                participants__user=target_user,
-                participants__status='invited'
+                id__in=GroupWorkoutIndex.participating_ids(target_user, 'invited')
             )
         else:
             # Default behavior depends on whether user_id was specified
             if user_id and target_user != user:
                 # If viewing another user's workouts, only show public ones they're part of
                 queryset = queryset.filter(
-                    Q(privacy='public') & 
-                    (Q(creator=target_user) | Q(participants__user=target_user))
-                ).distinct()
+                    privacy='public',
+                    id__in=GroupWorkoutIndex.accessible_ids(target_user)
+                )
             else:
                 # Default: Show public workouts and those the user is part of
-                queryset = queryset.filter(
-                    Q(privacy='public') | 
-                    Q(creator=user) |
-                    Q(participants__user=user)
-                ).distinct()
+                queryset = queryset.filter(GroupWorkoutIndex.visible_filter(user))
         
         # Filter by gym
         gym_id = self.request.query_params.get('gym_id')
@@ -128,6 +145,8 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
                 status='joined',
                 joined_at=timezone.now()
             )
+        # The creator's join moved the stored count after the instance was saved
+        group_workout.refresh_from_db(fields=['participants_count'])
     
     @action(detail=True, methods=['post'])
     def invite(self, request, pk=None):
@@ -229,8 +248,7 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
         
         # Check if the workout is full
         if group_workout.max_participants > 0:
-            current_participants = group_workout.participants.filter(status='joined').count()
-            if current_participants >= group_workout.max_participants:
+            if group_workout.participants_count >= group_workout.max_participants:
                 return Response(
                     {"detail": "This group workout is full."},
                     status=status.HTTP_400_BAD_REQUEST
@@ -602,6 +620,9 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
             content=content
         )
         
+        # Deliver to sockets connected to the chat room
+        GroupWorkoutChat.broadcast(group_workout.id, GroupWorkoutChat.serialize(message))
+        
         # Return the message
         serializer = GroupWorkoutMessageSerializer(message)
         return Response(serializer.data)
@@ -625,8 +646,26 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        # Keyset paging: ?before=<message id>&limit=N returns the next older page
+        if 'before' in request.query_params or 'limit' in request.query_params:
+            try:
+                messages, next_before = GroupWorkoutChat.history(
+                    group_workout.id,
+                    before=int(request.query_params['before']) if request.query_params.get('before') else None,
+                    limit=request.query_params.get('limit', HISTORY_PAGE_SIZE)
+                )
+            except ValueError:
+                return Response(
+                    {"detail": "before and limit must be integers."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response({
+                'results': GroupWorkoutMessageSerializer(messages, many=True).data,
+                'next_before': next_before,
+            })
+        
         # Get messages with pagination
-        messages = group_workout.messages.all()
+        messages = group_workout.messages.select_related('user')
         page = self.paginate_queryset(messages)
         
         if page is not None:
@@ -672,55 +711,21 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        with transaction.atomic():
-            # Update status to completed
-            group_workout.status = 'completed'
-            group_workout.save()
-            
-            # Create workout logs for all participants
-            participants = GroupWorkoutParticipant.objects.filter(
-                group_workout=group_workout,
-                status='joined'
-            ).select_related('user')
-            
-            created_logs = []
-            for participant in participants:
-                # Create workout log for this participant
-                if group_workout.workout_template:
-                    workout_log = WorkoutLog.objects.create(
-                        user=participant.user,
-                        based_on_instance=group_workout.workout_template,
-                        program=group_workout.workout_template.program if group_workout.workout_template.program else None,
-                        name=group_workout.title,
-                        date=group_workout.scheduled_time,
-                        gym=group_workout.gym,
-                        notes=f"Completed as part of group workout: {group_workout.title}",
-                        completed=True
-                    )
-                    
-                    # Update participant record with workout log reference
-                    participant.workout_log = workout_log
-                    participant.save()
-                    
-                    created_logs.append({
-                        'user': participant.user.username,
-                        'workout_log_id': workout_log.id
-                    })
-                    
-                    # Send notification
-                    NotificationService.create_notification(
-                        recipient=participant.user,
-                        notification_type='workout_completed',
-                        sender=request.user,
-                        content=f"Group workout {group_workout.title} has been marked as completed",
-                        related_object=workout_log
-                    )
-            
-            return Response({
-                "success": True,
-                "message": "Group workout marked as completed and workout logs created.",
-                "created_logs": created_logs
-            })
+        logs = GroupWorkoutCompletionService.complete(group_workout, sender=request.user)
+        if logs is None:
+            return Response(
+                {"detail": "This group workout is no longer open."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            "success": True,
+            "message": "Group workout marked as completed and workout logs created.",
+            "created_logs": [
+                {'user': log.user.username, 'workout_log_id': log.id}
+                for log in logs
+            ]
+        })
 
     @action(detail=True, methods=['post'])
     def propose(self, request, pk=None):
@@ -777,10 +782,8 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
         )
         
         # Auto-vote for your own proposal
-        GroupWorkoutVote.objects.create(
-            proposal=proposal,
-            user=user
-        )
+        ProposalVoteService.vote(proposal, user)
+        proposal.refresh_from_db(fields=['votes_count'])
         
         serializer = GroupWorkoutProposalSerializer(proposal, context={'request': request})
         return Response(serializer.data)
@@ -803,12 +806,17 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Get proposals with vote counts
-        proposals = group_workout.proposals.annotate(
-            votes_count=Count('votes')
-        ).order_by('-votes_count', 'created_at')
+        # Stored tallies, highest first; has_voted is resolved for the whole list at once
+        proposals = list(
+            ProposalVoteService.ranked(group_workout.id).select_related(
+                'workout_template', 'proposed_by'
+            ).prefetch_related('workout_template__exercises__sets')
+        )
         
-        serializer = GroupWorkoutProposalSerializer(proposals, many=True, context={'request': request})
+        serializer = GroupWorkoutProposalSerializer(proposals, many=True, context={
+            'request': request,
+            'voted_proposal_ids': ProposalVoteService.voted_proposal_ids(request.user, proposals),
+        })
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -851,17 +859,13 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
             )
         
         # Create vote if not already voted
-        vote, created = GroupWorkoutVote.objects.get_or_create(
-            proposal=proposal,
-            user=user
-        )
-        
-        if not created:
+        if not ProposalVoteService.vote(proposal, user):
             return Response(
                 {"detail": "You have already voted for this proposal."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        proposal.refresh_from_db(fields=['votes_count'])
         serializer = GroupWorkoutProposalSerializer(proposal, context={'request': request})
         return Response(serializer.data)
 
@@ -890,17 +894,13 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
             )
         
         # Delete vote if exists
-        deleted, _ = GroupWorkoutVote.objects.filter(
-            proposal=proposal,
-            user=user
-        ).delete()
-        
-        if not deleted:
+        if not ProposalVoteService.remove_vote(proposal, user):
             return Response(
                 {"detail": "You haven't voted for this proposal."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        proposal.refresh_from_db(fields=['votes_count'])
         serializer = GroupWorkoutProposalSerializer(proposal, context={'request': request})
         return Response(serializer.data)
 
@@ -909,9 +909,7 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
         """Get the most voted proposal"""
         group_workout = self.get_object()
         
-        most_voted = group_workout.proposals.annotate(
-            votes_count=Count('votes')
-        ).order_by('-votes_count').first()
+        most_voted = ProposalVoteService.leader(group_workout.id)
         
         if not most_voted:
             return Response(
@@ -938,8 +936,6 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
         # Base queryset
         queryset = GroupWorkout.objects.select_related(
             'creator', 'gym', 'workout_template'
-        ).prefetch_related(
-            'participants', 'join_requests', 'messages'
         )
         
         # Get participation filter
@@ -949,20 +945,15 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(creator=target_user)
         elif participation == 'joined':
             queryset = queryset.filter(
-                participants__user=target_user,
-                participants__status='joined'
+                id__in=GroupWorkoutIndex.participating_ids(target_user, 'joined')
             )
         elif participation == 'invited':
             queryset = queryset.filter(
-                participants__user=target_user,
-                participants__status='invited'
+                id__in=GroupWorkoutIndex.participating_ids(target_user, 'invited')
             )
         else:
             # All workouts user is involved in (created or participating)
-            queryset = queryset.filter(
-                Q(creator=target_user) | 
-                Q(participants__user=target_user)
-            ).distinct()
+            queryset = queryset.filter(id__in=GroupWorkoutIndex.accessible_ids(target_user))
         
         # Apply status filter
         status_filter = request.query_params.get('status')
@@ -987,17 +978,57 @@ class GroupWorkoutViewSet(viewsets.ModelViewSet):
         
         # Privacy check: if requesting another user's workouts, filter by visibility
         if target_user != request.user:
-            queryset = queryset.filter(
-                Q(privacy='public') |
-                Q(creator=request.user) |
-                Q(participants__user=request.user)
-            ).distinct()
+            queryset = queryset.filter(GroupWorkoutIndex.visible_filter(request.user))
         
         # Paginate
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = GroupWorkoutSerializer(page, many=True, context={'request': request})
+            serializer = GroupWorkoutSerializer(page, many=True, context=self.get_serializer_context())
             return self.get_paginated_response(serializer.data)
         
         serializer = GroupWorkoutSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        Upcoming public group workouts near a point, nearest first.
+        Query params: location ("lat,lng") or lat & lng, radius (km), days, ordering (distance|time)
+        """
+        point = parse_point(request.query_params.get('location'))
+        if point is None and 'lat' in request.query_params:
+            point = parse_point(f"{request.query_params.get('lat')},{request.query_params.get('lng')}")
+        if point is None:
+            return Response(
+                {"detail": "A location as 'lat,lng' (or lat and lng parameters) is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            radius = float(request.query_params.get('radius', DEFAULT_RADIUS_KM))
+            days = int(request.query_params.get('days', DEFAULT_DAYS_AHEAD))
+            if not math.isfinite(radius):
+                raise ValueError(radius)
+        except ValueError:
+            return Response(
+                {"detail": "radius and days must be numbers."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        radius = min(max(radius, 0.1), MAX_RADIUS_KM)
+        days = min(max(days, 1), MAX_DAYS_AHEAD)
+        
+        workouts = NearbyGroupWorkouts.search(
+            point[0], point[1],
+            radius_km=radius,
+            days=days,
+            order=request.query_params.get('ordering', 'distance'),
+            queryset=GroupWorkout.objects.select_related(
+                'creator', 'gym', 'workout_template'
+            ).prefetch_related('participants__user'),
+        )
+        
+        page = self.paginate_queryset(workouts)
+        data = GroupWorkoutListSerializer(page, many=True, context=self.get_serializer_context()).data
+        for item, workout in zip(data, page):
+            item['distance_km'] = workout.distance_km
+        return self.get_paginated_response(data)
@@ -32,9 +32,15 @@ class GroupWorkout(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     max_participants = models.PositiveIntegerField(default=0, help_text="0 means unlimited")
+    participants_count = models.PositiveIntegerField(default=0, editable=False,
+                                                     help_text="Stored count of joined participants")
     
     class Meta:
         ordering = ['-scheduled_time']
+        indexes = [
+            models.Index(fields=['privacy', '-scheduled_time']),
+            models.Index(fields=['status', 'scheduled_time']),  # Upcoming and overdue sessions
+        ]
     
     @property
     def is_active(self):
@@ -43,6 +49,16 @@ class GroupWorkout(models.Model):
     def __str__(self):
         return f"{self.title} at {self.gym} on {self.scheduled_time.strftime('%Y-%m-%d %H:%M')}"
 
+    def save(self, *args, **kwargs):
+        # participants_count moves by F() deltas as people join and leave; a full
+        # save would write back the possibly stale value this instance loaded
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'participants_count'
+            ]
+        super().save(*args, **kwargs)
+
 class GroupWorkoutParticipant(models.Model):
     """
     Tracks user participation in group workouts
@@ -63,10 +79,27 @@ class GroupWorkoutParticipant(models.Model):
     
     class Meta:
         unique_together = ['group_workout', 'user']
+        indexes = [
+            models.Index(fields=['user', 'status']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.group_workout.title} ({self.get_status_display()})"
 
+class GroupWorkoutAccess(models.Model):
+    """
+    Visibility index: one row per user who can see a non-public group workout
+    because they created it or have a participant record
+    """
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='group_workout_access')
+    group_workout = models.ForeignKey(GroupWorkout, on_delete=models.CASCADE, related_name='access')
+    
+    class Meta:
+        unique_together = ['user', 'group_workout']
+    
+    def __str__(self):
+        return f"{self.user_id} -> {self.group_workout_id}"
+
 class GroupWorkoutJoinRequest(models.Model):
     """
     Track and manage join requests for 'upon-request' privacy group workouts
@@ -101,6 +134,9 @@ class GroupWorkoutMessage(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['group_workout', '-id']),  # Keyset history paging
+        ]
     
     def __str__(self):
         return f"{self.user.username}: {self.content[:50]}..."
@@ -113,10 +149,15 @@ class GroupWorkoutProposal(models.Model):
     workout_template = models.ForeignKey('workouts.WorkoutTemplate', on_delete=models.CASCADE, related_name='proposed_for_groups')
     proposed_by = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='workout_proposals')
     created_at = models.DateTimeField(auto_now_add=True)
+    votes_count = models.PositiveIntegerField(default=0, editable=False,
+                                              help_text="Stored number of votes for this proposal")
     
     class Meta:
         unique_together = ['group_workout', 'workout_template']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['group_workout', '-votes_count', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.workout_template.name} proposed for {self.group_workout.title}"
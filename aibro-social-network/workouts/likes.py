@@ -0,0 +1,92 @@
+# workouts/likes.py
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed
+
+from .models import Program
+
+ProgramLike = Program.likes.through
+
+
+class ProgramLikeService:
+    """
+    Program likes backed by the M2M through table (unique on program/user) and a
+    stored Program.likes_count, so checks and toggles never load the liker list.
+    """
+
+    @classmethod
+    def is_liked(cls, program_id, user_id):
+        return ProgramLike.objects.filter(program_id=program_id, user_id=user_id).exists()
+
+    @classmethod
+    def liked_program_ids(cls, user, programs):
+        """Resolve is_liked for a whole page of programs with a single query"""
+        if not user or not user.is_authenticated:
+            return set()
+        program_ids = [getattr(program, 'pk', program) for program in programs]
+        if not program_ids:
+            return set()
+        return set(
+            ProgramLike.objects.filter(
+                user_id=user.id, program_id__in=program_ids
+            ).values_list('program_id', flat=True)
+        )
+
+    @classmethod
+    def _bump_creator_profile(cls, program):
+        # likes_count is shown on the creator's profile; update() sends no signal to bump it
+        from users.profile import ProfileService
+        ProfileService.bump(program.creator_id)
+
+    @classmethod
+    def like(cls, program, user):
+        """Idempotently like a program; returns True if a like was added"""
+        with transaction.atomic():
+            _, created = ProgramLike.objects.get_or_create(program_id=program.pk, user_id=user.pk)
+            if created:
+                Program.objects.filter(pk=program.pk).update(likes_count=F('likes_count') + 1)
+                cls._bump_creator_profile(program)
+
+        if created:
+            # Same signal Program.likes.add() sends, so like notifications keep working
+            m2m_changed.send(
+                sender=ProgramLike, instance=program, action='post_add',
+                reverse=False, model=get_user_model(), pk_set={user.pk},
+                using=ProgramLike.objects.db
+            )
+        return created
+
+    @classmethod
+    def unlike(cls, program, user):
+        """Idempotently remove a like; returns True if a like was removed"""
+        with transaction.atomic():
+            deleted, _ = ProgramLike.objects.filter(program_id=program.pk, user_id=user.pk).delete()
+            if deleted:
+                Program.objects.filter(pk=program.pk, likes_count__gt=0).update(
+                    likes_count=F('likes_count') - 1
+                )
+                cls._bump_creator_profile(program)
+        return bool(deleted)
+
+    @classmethod
+    def toggle(cls, program, user):
+        """Flip the like state; returns the new state"""
+        if cls.unlike(program, user):
+            return False
+        cls.like(program, user)
+        return True
+
+    @classmethod
+    def get_likes_count(cls, program_id):
+        return Program.objects.filter(pk=program_id).values_list('likes_count', flat=True).first() or 0
+
+    @classmethod
+    def recount(cls, queryset=None):
+        """Recompute stored counters from the through table; returns the number of programs updated"""
+        queryset = Program.objects.all() if queryset is None else queryset
+        counts = ProgramLike.objects.filter(
+            program_id=OuterRef('pk')
+        ).order_by().values('program_id').annotate(total=Count('id')).values('total')
+        return queryset.update(likes_count=Coalesce(Subquery(counts), Value(0)))
@@ -0,0 +1,22 @@
+# workouts/management/commands/backfill_attribute_index.py
+from django.core.management.base import BaseCommand
+from workouts.attribute_index import AttributeIndex, INDEXED_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the tag/equipment index for workout templates, programs and program workouts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of index rows to write in each batch',
+        )
+
+    def handle(self, *args, **options):
+        for model in INDEXED_FIELDS:
+            written = AttributeIndex.rebuild(model, batch_size=options['batch_size'])
+            self.stdout.write(f"Indexed {written} values for {model._meta.verbose_name_plural}")
+
+        self.stdout.write(self.style.SUCCESS('Attribute index backfill completed'))
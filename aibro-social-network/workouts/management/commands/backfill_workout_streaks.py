@@ -0,0 +1,80 @@
+# workouts/management/commands/backfill_workout_streaks.py
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from workouts.models import WorkoutLog, WorkoutStreak
+from workouts.streaks import StreakState, get_zone, to_local_date
+
+STREAK_FIELDS = ['current_streak', 'longest_streak', 'last_workout_date', 'total_completed']
+
+
+class Command(BaseCommand):
+    help = 'Rebuild WorkoutStreak counters from completed workout logs in a single ordered pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Preview changes without applying them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of streak records to write in each batch',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Starting workout streak backfill {'(DRY RUN)' if dry_run else ''}"
+            )
+        )
+
+        existing = {streak.user_id: streak for streak in WorkoutStreak.objects.all()}
+        logs = WorkoutLog.objects.filter(completed=True).order_by(
+            'user_id', 'date'
+        ).values_list('user_id', 'date')
+
+        to_create, to_update = [], []
+        seen_users = set()
+
+        for user_id, rows in groupby(logs.iterator(chunk_size=batch_size), key=lambda row: row[0]):
+            seen_users.add(user_id)
+            streak = existing.get(user_id) or WorkoutStreak(user_id=user_id)
+            tz = get_zone(streak.timezone)
+
+            state = StreakState()
+            for _, date in rows:
+                state.add(to_local_date(date, tz))
+            state.apply_to(streak)
+
+            (to_update if streak.pk else to_create).append(streak)
+            if len(to_create) + len(to_update) >= batch_size:
+                self._flush(to_create, to_update, batch_size, dry_run)
+
+        # Users whose completed logs were all removed
+        for user_id, streak in existing.items():
+            if user_id not in seen_users and streak.total_completed:
+                StreakState().apply_to(streak)
+                to_update.append(streak)
+
+        self._flush(to_create, to_update, batch_size, dry_run)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfilled streaks for {len(seen_users)} users {'(DRY RUN)' if dry_run else ''}"
+            )
+        )
+
+    def _flush(self, to_create, to_update, batch_size, dry_run):
+        if not dry_run:
+            with transaction.atomic():
+                WorkoutStreak.objects.bulk_create(to_create, batch_size=batch_size)
+                WorkoutStreak.objects.bulk_update(to_update, STREAK_FIELDS, batch_size=batch_size)
+        to_create.clear()
+        to_update.clear()
@@ -0,0 +1,108 @@
+# workouts/management/commands/benchmark_group_workouts.py
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from workouts.group_workouts import GroupWorkout, GroupWorkoutParticipant
+from workouts.group_workout_index import GroupWorkoutIndex
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the legacy join+DISTINCT group workout listing with the visibility index '
+        'on synthetic data. Everything runs in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workouts', type=int, default=100000, help='Group workouts to generate')
+        parser.add_argument('--users', type=int, default=5000, help='Users to generate')
+        parser.add_argument('--participants', type=int, default=4, help='Participants per workout')
+        parser.add_argument('--samples', type=int, default=50, help='Viewers to time per query')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback()
+        except Rollback:
+            self.stdout.write('Synthetic data rolled back')
+
+    def _run(self, options):
+        User = get_user_model()
+        batch_size = options['batch_size']
+        rng = random.Random(42)
+        now = timezone.now()
+
+        self.stdout.write(f"Generating {options['users']} users and {options['workouts']} group workouts...")
+        User.objects.bulk_create([
+            User(username=f'bench_gw_{i}', email=f'bench_gw_{i}@example.com')
+            for i in range(options['users'])
+        ], batch_size=batch_size)
+        user_ids = list(User.objects.filter(username__startswith='bench_gw_').values_list('id', flat=True))
+
+        privacies = ['public', 'upon-request', 'private']
+        GroupWorkout.objects.bulk_create([
+            GroupWorkout(
+                title=f'Bench workout {i}',
+                creator_id=rng.choice(user_ids),
+                scheduled_time=now + timedelta(hours=rng.randint(-2000, 2000)),
+                privacy=rng.choice(privacies),
+            )
+            for i in range(options['workouts'])
+        ], batch_size=batch_size)
+        workouts = GroupWorkout.objects.filter(title__startswith='Bench workout ').values_list('id', 'creator_id')
+
+        participants = []
+        for workout_id, creator_id in workouts.iterator(chunk_size=batch_size):
+            members = {creator_id} | set(rng.sample(user_ids, options['participants']))
+            participants.extend(
+                GroupWorkoutParticipant(
+                    group_workout_id=workout_id, user_id=user_id,
+                    status='joined' if user_id == creator_id else rng.choice(['joined', 'invited'])
+                )
+                for user_id in members
+            )
+        GroupWorkoutParticipant.objects.bulk_create(participants, batch_size=batch_size, ignore_conflicts=True)
+
+        self.stdout.write('Building visibility index...')
+        GroupWorkoutIndex.rebuild(batch_size=batch_size)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        viewers = User.objects.filter(id__in=rng.sample(user_ids, min(options['samples'], len(user_ids))))
+
+        def legacy(user):
+            return GroupWorkout.objects.filter(
+                Q(privacy='public') | Q(creator=user) | Q(participants__user=user)
+            ).distinct()
+
+        def indexed(user):
+            return GroupWorkout.objects.filter(GroupWorkoutIndex.visible_filter(user))
+
+        for label, build in (('join + DISTINCT', legacy), ('visibility index', indexed)):
+            timings = []
+            for viewer in viewers:
+                queryset = build(viewer).order_by('-scheduled_time')
+                start = time.perf_counter()
+                queryset.count()
+                list(queryset[:10])
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"{label:>18}: mean {sum(timings) / len(timings):.1f} ms, "
+                f"p50 {timings[len(timings) // 2]:.1f} ms, max {timings[-1]:.1f} ms"
+            )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark completed'))
@@ -0,0 +1,43 @@
+# workouts/management/commands/complete_overdue_group_workouts.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from workouts.group_workout_completion import GroupWorkoutCompletionService
+
+
+class Command(BaseCommand):
+    help = 'Complete group workouts that are still open long after their scheduled time (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Complete workouts scheduled more than this many hours ago',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of group workouts to load per batch',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many workouts are overdue',
+        )
+
+    def handle(self, *args, **options):
+        grace = timedelta(hours=options['hours'])
+
+        if options['dry_run']:
+            overdue = GroupWorkoutCompletionService.overdue(grace=grace).count()
+            self.stdout.write(f'{overdue} overdue group workouts would be completed')
+            return
+
+        workouts, logs = GroupWorkoutCompletionService.complete_overdue(
+            batch_size=options['batch_size'], grace=grace
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Completed {workouts} overdue group workouts, created {logs} workout logs')
+        )
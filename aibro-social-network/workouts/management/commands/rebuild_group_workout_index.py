@@ -0,0 +1,21 @@
+# workouts/management/commands/rebuild_group_workout_index.py
+from django.core.management.base import BaseCommand
+from workouts.group_workout_index import GroupWorkoutIndex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the group workout visibility index and stored participant counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of access rows to write in each batch',
+        )
+
+    def handle(self, *args, **options):
+        written = GroupWorkoutIndex.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {written} group workout access rows and recounted participants')
+        )
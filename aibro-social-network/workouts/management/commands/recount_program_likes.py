@@ -0,0 +1,13 @@
+# workouts/management/commands/recount_program_likes.py
+from django.core.management.base import BaseCommand
+from workouts.likes import ProgramLikeService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored Program.likes_count from program likes'
+
+    def handle(self, *args, **options):
+        updated = ProgramLikeService.recount()
+        self.stdout.write(
+            self.style.SUCCESS(f'Recounted likes for {updated} programs')
+        )
@@ -0,0 +1,13 @@
+# workouts/management/commands/recount_proposal_votes.py
+from django.core.management.base import BaseCommand
+from workouts.proposal_votes import ProposalVoteService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored GroupWorkoutProposal.votes_count from votes and reset cached leaders'
+
+    def handle(self, *args, **options):
+        updated = ProposalVoteService.recount()
+        self.stdout.write(
+            self.style.SUCCESS(f'Recounted votes for {updated} proposals')
+        )
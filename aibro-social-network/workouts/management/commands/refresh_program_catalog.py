@@ -0,0 +1,23 @@
+# workouts/management/commands/refresh_program_catalog.py
+from django.core.management.base import BaseCommand
+from workouts.catalog import ProgramCatalog
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the public program discovery catalog (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of catalog rows to write in each batch',
+        )
+
+    def handle(self, *args, **options):
+        upserted, removed = ProgramCatalog.refresh(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Program catalog refreshed: {upserted} programs, {removed} stale entries removed'
+            )
+        )
@@ -1,11 +1,13 @@
 # workouts/models.py
 from django.db import models
+from django.contrib.contenttypes.models import ContentType
 # Add this at the end of workouts/models.py
 from .group_workouts import (
     GroupWorkout, 
     GroupWorkoutParticipant, 
     GroupWorkoutJoinRequest, 
-    GroupWorkoutMessage
+    GroupWorkoutMessage,
+    GroupWorkoutAccess
 )
 
 class BaseExercise(models.Model):
@@ -161,6 +163,8 @@ class Program(models.Model):
     is_active = models.BooleanField(default=True)
     is_public = models.BooleanField(default=False)
     likes = models.ManyToManyField('users.User', related_name='liked_programs', blank=True)
+    likes_count = models.PositiveIntegerField(default=0, editable=False,
+                                              help_text="Stored like counter, maintained by ProgramLikeService")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     difficulty_level = models.CharField(max_length=20)
@@ -247,6 +251,9 @@ class WorkoutLog(models.Model):
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['user', '-date']),
+        ]
 
 class ExerciseLog(BaseExercise):
     """Record of an actual performed exercise"""
@@ -254,6 +261,11 @@ class ExerciseLog(BaseExercise):
     based_on_instance = models.ForeignKey(ExerciseInstance, on_delete=models.SET_NULL, null=True,
                                         help_text="Original instance this exercise was based on")
 
+    class Meta(BaseExercise.Meta):
+        indexes = [
+            models.Index(fields=['workout', 'name']),  # Exercise history by name
+        ]
+
 class SetLog(BaseSet):
     """Record of an actual performed set"""
     exercise = models.ForeignKey(ExerciseLog, on_delete=models.CASCADE, related_name='sets')
@@ -272,4 +284,106 @@ class ProgramShare(models.Model):
         unique_together = ['program', 'shared_with']  # Prevent duplicate shares
 
     def __str__(self):
-        return f"{self.program.name} shared with {self.shared_with.username}"
\ No newline at end of file
+        return f"{self.program.name} shared with {self.shared_with.username}"
+
+
+class WorkoutStreak(models.Model):
+    """Per-user streak and milestone counters, maintained incrementally from WorkoutLog"""
+    user = models.OneToOneField('users.User', on_delete=models.CASCADE, related_name='workout_streak')
+    current_streak = models.PositiveIntegerField(default=0, help_text="Consecutive days ending on last_workout_date")
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_workout_date = models.DateField(null=True, blank=True, help_text="Local date of the most recent completed workout")
+    total_completed = models.PositiveIntegerField(default=0)
+    timezone = models.CharField(max_length=64, default='UTC', help_text="IANA timezone used for day boundaries")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def active_streak(self, today):
+        """Current streak as seen on `today` (a streak survives until the end of the next day)"""
+        if not self.last_workout_date or (today - self.last_workout_date).days > 1:
+            return 0
+        return self.current_streak
+
+    def __str__(self):
+        return f"{self.user.username}: {self.current_streak} day streak ({self.total_completed} workouts)"
+
+
+class ProgramCatalogEntry(models.Model):
+    """Denormalized, periodically refreshed row per public program used by the discovery catalog"""
+    program = models.OneToOneField(Program, on_delete=models.CASCADE, primary_key=True, related_name='catalog_entry')
+    creator = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='+')
+    creator_username = models.CharField(max_length=150)
+    name = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    focus = models.CharField(max_length=20, choices=Program.FOCUS_CHOICES)
+    difficulty_level = models.CharField(max_length=20)
+    recommended_level = models.CharField(max_length=20)
+    sessions_per_week = models.PositiveIntegerField()
+    estimated_completion_weeks = models.PositiveIntegerField()
+    tags = models.JSONField(default=list)
+    required_equipment = models.JSONField(default=list)
+    workouts_count = models.PositiveIntegerField(default=0)
+    likes_count = models.PositiveIntegerField(default=0)
+    forks_count = models.PositiveIntegerField(default=0)
+    active_users_count = models.PositiveIntegerField(default=0)
+    popularity = models.FloatField(default=0, help_text="Weighted likes/forks/active users score used for ranking")
+    program_created_at = models.DateTimeField()
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-popularity', '-program_created_at']
+        indexes = [
+            models.Index(fields=['-popularity', '-program_created_at']),
+            models.Index(fields=['focus', '-popularity']),
+            models.Index(fields=['difficulty_level', '-popularity']),
+            models.Index(fields=['sessions_per_week', '-popularity']),
+            models.Index(fields=['-program_created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.popularity:.1f})"
+
+
+class ProgramCatalogFacet(models.Model):
+    """Tag/equipment facet values of a catalog entry, one row per value"""
+    KIND_CHOICES = [
+        ('tag', 'Tag'),
+        ('equipment', 'Equipment'),
+    ]
+
+    entry = models.ForeignKey(ProgramCatalogEntry, on_delete=models.CASCADE, related_name='facets')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ['entry', 'kind', 'value']
+        indexes = [
+            models.Index(fields=['kind', 'value', 'entry']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.value}"
+
+
+class WorkoutAttributeIndex(models.Model):
+    """
+    Inverted index of the tag/equipment values stored in the JSON fields of
+    templates, programs and program workouts, kept in sync on save
+    """
+    KIND_CHOICES = [
+        ('tag', 'Tag'),
+        ('equipment', 'Equipment'),
+    ]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ['content_type', 'object_id', 'kind', 'value']
+        indexes = [
+            models.Index(fields=['content_type', 'kind', 'value', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type.model}#{self.object_id} {self.kind}:{self.value}"
@@ -0,0 +1,63 @@
+# workouts/nearby.py
+from datetime import timedelta
+
+from django.utils import timezone
+
+from gyms.geo import bounding_box, covering_prefixes, haversine_km, prefix_filter
+from gyms.models import Gym
+from .group_workouts import GroupWorkout
+
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 100
+DEFAULT_DAYS_AHEAD = 14
+MAX_DAYS_AHEAD = 90
+
+
+class NearbyGroupWorkouts:
+    """Upcoming public group workouts at gyms around a point, via the Gym geohash index"""
+
+    @classmethod
+    def gym_distances(cls, latitude, longitude, radius_km):
+        """{gym_id: distance_km} for gyms within the radius"""
+        min_lat, min_lng, max_lat, max_lng = bounding_box(latitude, longitude, radius_km)
+        candidates = Gym.objects.filter(
+            prefix_filter(covering_prefixes(latitude, longitude, radius_km)),
+            latitude__gte=min_lat, latitude__lte=max_lat,
+        ).values_list('id', 'latitude', 'longitude')
+
+        distances = {}
+        for gym_id, lat, lng in candidates:
+            distance = haversine_km(latitude, longitude, float(lat), float(lng))
+            if distance <= radius_km:
+                distances[gym_id] = distance
+        return distances
+
+    @classmethod
+    def search(cls, latitude, longitude, radius_km=DEFAULT_RADIUS_KM, days=DEFAULT_DAYS_AHEAD,
+               order='distance', queryset=None, now=None):
+        """
+        Scheduled public workouts in the next `days` days within `radius_km`.
+        Returns workouts with a `distance_km` attribute, nearest first (or soonest first
+        with order='time').
+        """
+        now = now or timezone.now()
+        distances = cls.gym_distances(latitude, longitude, radius_km)
+        if not distances:
+            return []
+
+        queryset = GroupWorkout.objects.all() if queryset is None else queryset
+        workouts = list(queryset.filter(
+            gym_id__in=list(distances),
+            privacy='public',
+            status='scheduled',
+            scheduled_time__gte=now,
+            scheduled_time__lte=now + timedelta(days=days),
+        ))
+        for workout in workouts:
+            workout.distance_km = round(distances[workout.gym_id], 2)
+
+        if order == 'time':
+            workouts.sort(key=lambda workout: (workout.scheduled_time, workout.distance_km))
+        else:
+            workouts.sort(key=lambda workout: (workout.distance_km, workout.scheduled_time))
+        return workouts
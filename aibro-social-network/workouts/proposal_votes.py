@@ -0,0 +1,154 @@
+# workouts/proposal_votes.py
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .group_workouts import GroupWorkoutProposal, GroupWorkoutVote
+
+logger = logging.getLogger(__name__)
+
+LEADER_TTL = 3600
+NO_LEADER = 0  # Cached when a group workout has no proposals
+
+# Highest tally first; ties go to the earliest proposal
+LEADER_ORDERING = ('-votes_count', 'created_at', 'id')
+
+
+class ProposalVoteService:
+    """
+    Votes on group workout proposals backed by a stored
+    GroupWorkoutProposal.votes_count and a cached leader per group workout
+    """
+
+    @classmethod
+    def _leader_key(cls, group_workout_id):
+        return f"group_workout_proposals:{group_workout_id}:leader"
+
+    @classmethod
+    def vote(cls, proposal, user):
+        """Idempotently vote for a proposal; returns True if a vote was added"""
+        with transaction.atomic():
+            _, created = GroupWorkoutVote.objects.get_or_create(proposal_id=proposal.pk, user_id=user.pk)
+            if created:
+                GroupWorkoutProposal.objects.filter(pk=proposal.pk).update(votes_count=F('votes_count') + 1)
+        if created:
+            cls._tally_changed(proposal)
+        return created
+
+    @classmethod
+    def remove_vote(cls, proposal, user):
+        """Idempotently remove a vote; returns True if a vote was removed"""
+        with transaction.atomic():
+            deleted, _ = GroupWorkoutVote.objects.filter(proposal_id=proposal.pk, user_id=user.pk).delete()
+            if deleted:
+                GroupWorkoutProposal.objects.filter(pk=proposal.pk, votes_count__gt=0).update(
+                    votes_count=F('votes_count') - 1
+                )
+        if deleted:
+            cls._tally_changed(proposal)
+        return bool(deleted)
+
+    @classmethod
+    def voted_proposal_ids(cls, user, proposals):
+        """Resolve has_voted for a list of proposals with a single query"""
+        if not user or not user.is_authenticated:
+            return set()
+        proposal_ids = [getattr(proposal, 'pk', proposal) for proposal in proposals]
+        if not proposal_ids:
+            return set()
+        return set(
+            GroupWorkoutVote.objects.filter(
+                user_id=user.id, proposal_id__in=proposal_ids
+            ).values_list('proposal_id', flat=True)
+        )
+
+    @classmethod
+    def ranked(cls, group_workout_id):
+        return GroupWorkoutProposal.objects.filter(group_workout_id=group_workout_id).order_by(*LEADER_ORDERING)
+
+    @classmethod
+    def refresh_leader(cls, group_workout_id):
+        """Recompute the leading proposal from stored tallies and cache its id"""
+        leader_id = cls.ranked(group_workout_id).values_list('id', flat=True).first()
+        cache.set(cls._leader_key(group_workout_id), leader_id or NO_LEADER, LEADER_TTL)
+        return leader_id
+
+    @classmethod
+    def leader_id(cls, group_workout_id):
+        leader_id = cache.get(cls._leader_key(group_workout_id))
+        if leader_id is None:
+            return cls.refresh_leader(group_workout_id)
+        return leader_id or None
+
+    @classmethod
+    def leader(cls, group_workout_id):
+        """The most voted proposal, or None if nothing has been proposed"""
+        leader_id = cls.leader_id(group_workout_id)
+        if leader_id is None:
+            return None
+        proposal = GroupWorkoutProposal.objects.select_related(
+            'workout_template', 'proposed_by'
+        ).filter(pk=leader_id).first()
+        if proposal is None:
+            # Cached leader was deleted since it was computed
+            leader_id = cls.refresh_leader(group_workout_id)
+            if leader_id is not None:
+                proposal = GroupWorkoutProposal.objects.select_related(
+                    'workout_template', 'proposed_by'
+                ).filter(pk=leader_id).first()
+        return proposal
+
+    @classmethod
+    def invalidate_leader(cls, group_workout_id):
+        cache.delete(cls._leader_key(group_workout_id))
+
+    @classmethod
+    def _tally_changed(cls, proposal):
+        group_workout_id = proposal.group_workout_id
+        transaction.on_commit(lambda: cls.broadcast_tally(group_workout_id, proposal.pk))
+
+    @classmethod
+    def broadcast_tally(cls, group_workout_id, proposal_id):
+        """Refresh the cached leader and push the new tally to connected participants"""
+        from .chat import GroupWorkoutChat
+
+        leader_id = cls.refresh_leader(group_workout_id)
+        votes_count = GroupWorkoutProposal.objects.filter(pk=proposal_id).values_list(
+            'votes_count', flat=True
+        ).first()
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            async_to_sync(channel_layer.group_send)(
+                GroupWorkoutChat.group_name(group_workout_id),
+                {
+                    'type': 'proposal_tally',
+                    'tally': {
+                        'group_workout': group_workout_id,
+                        'proposal': proposal_id,
+                        'vote_count': votes_count or 0,
+                        'most_voted_proposal': leader_id,
+                    }
+                }
+            )
+        except Exception as e:
+            logger.error(f"Error broadcasting vote tally for group workout {group_workout_id}: {e}")
+
+    @classmethod
+    def recount(cls, queryset=None):
+        """Recompute stored tallies from the vote rows; returns the number of proposals updated"""
+        queryset = GroupWorkoutProposal.objects.all() if queryset is None else queryset
+        counts = GroupWorkoutVote.objects.filter(
+            proposal_id=OuterRef('pk')
+        ).order_by().values('proposal_id').annotate(total=Count('id')).values('total')
+        updated = queryset.update(votes_count=Coalesce(Subquery(counts), Value(0)))
+        for group_workout_id in set(queryset.values_list('group_workout_id', flat=True)):
+            cls.invalidate_leader(group_workout_id)
+        return updated
@@ -0,0 +1,6 @@
+from django.urls import re_path
+from . import consumers
+
+websocket_urlpatterns = [
+    re_path(r'ws/group-workouts/(?P<group_workout_id>\d+)/chat/$', consumers.GroupWorkoutChatConsumer.as_asgi()),
+]
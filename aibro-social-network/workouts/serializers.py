@@ -3,8 +3,9 @@ from rest_framework import serializers
 from .models import (
     WorkoutTemplate, ExerciseTemplate, SetTemplate,
     Program, WorkoutInstance, ExerciseInstance, SetInstance, ProgramShare,
-    WorkoutLog, ExerciseLog, SetLog
+    WorkoutLog, ExerciseLog, SetLog, WorkoutStreak, ProgramCatalogEntry
 )
+from .sparse_fieldsets import SparseFieldsetSerializerMixin
 
 # Template Serializers
 class SetTemplateSerializer(serializers.ModelSerializer):
@@ -51,7 +52,7 @@ class ExerciseTemplateSerializer(serializers.ModelSerializer):
                 return None
         return None
 
-class WorkoutTemplateSerializer(serializers.ModelSerializer):
+class WorkoutTemplateSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     exercises = ExerciseTemplateSerializer(many=True, read_only=True)
     creator_username = serializers.CharField(source='creator.username', read_only=True)
     
@@ -137,7 +138,7 @@ class ExerciseInstanceSerializer(serializers.ModelSerializer):
         
         return data
 
-class WorkoutInstanceSerializer(serializers.ModelSerializer):
+class WorkoutInstanceSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     exercises = ExerciseInstanceSerializer(many=True)
     weekday_name = serializers.CharField(source='get_preferred_weekday_display', read_only=True)
     
@@ -202,9 +203,19 @@ class ProgramShareSerializer(serializers.ModelSerializer):
                  'shared_with_username', 'created_at']
         read_only_fields = ['id', 'created_at']
 
-class ProgramSerializer(serializers.ModelSerializer):
+def resolve_is_liked(program, context):
+    """Use the page's batched like lookup when the view provided one"""
+    liked_ids = context.get('liked_program_ids')
+    if liked_ids is not None:
+        return program.pk in liked_ids
+    request = context.get('request')
+    if request and request.user.is_authenticated:
+        from .likes import ProgramLikeService
+        return ProgramLikeService.is_liked(program.pk, request.user.id)
+    return False
+
+class ProgramSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     workouts = WorkoutInstanceSerializer(source='workout_instances', many=True, read_only=True)
-    likes_count = serializers.IntegerField(read_only=True)
     forks_count = serializers.IntegerField(read_only=True)
     is_liked = serializers.SerializerMethodField()
     creator_username = serializers.CharField(source='creator.username', read_only=True)
@@ -229,23 +240,77 @@ class ProgramSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_liked(self, obj):
+        return resolve_is_liked(obj, self.context)
+
+    def get_is_shared_with_me(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.likes.filter(id=request.user.id).exists()
+            return obj.shares.filter(shared_with=request.user).exists()
         return False
 
-    def get_is_shared_with_me(self, obj):
+    def get_is_owner(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.shares.filter(shared_with=request.user).exists()
+            return obj.creator_id == request.user.id
         return False
 
+class ProgramSummarySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """Lightweight program representation for lists; nested workouts/shares only via ?expand="""
+    workouts_count = serializers.SerializerMethodField()
+    forks_count = serializers.SerializerMethodField()
+    is_liked = serializers.SerializerMethodField()
+    creator_username = serializers.CharField(source='creator.username', read_only=True)
+    is_owner = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Program
+        fields = [
+            'id', 'name', 'description', 'focus', 'sessions_per_week',
+            'difficulty_level', 'recommended_level', 'estimated_completion_weeks',
+            'tags', 'creator', 'creator_username', 'is_active', 'is_public',
+            'workouts_count', 'likes_count', 'forks_count', 'is_liked', 'is_owner',
+            'forked_from', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+        expandable_fields = {
+            'workouts': ('WorkoutInstanceSerializer', {'source': 'workout_instances', 'many': True, 'read_only': True}),
+            'shares': ('ProgramShareSerializer', {'source': 'shares.all', 'many': True, 'read_only': True}),
+        }
+
+    def get_workouts_count(self, obj):
+        if hasattr(obj, 'workouts_count'):
+            return obj.workouts_count
+        return obj.workout_instances.count()
+
+    def get_forks_count(self, obj):
+        if hasattr(obj, 'forks_count'):
+            return obj.forks_count
+        return obj.forks.count()
+
+    def get_is_liked(self, obj):
+        return resolve_is_liked(obj, self.context)
+
     def get_is_owner(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.creator_id == request.user.id
         return False
 
+class ProgramCatalogEntrySerializer(serializers.ModelSerializer):
+    """Discovery catalog row; `id` is the program id so clients can fetch the full program"""
+    id = serializers.IntegerField(source='program_id', read_only=True)
+
+    class Meta:
+        model = ProgramCatalogEntry
+        fields = [
+            'id', 'name', 'description', 'focus', 'difficulty_level',
+            'recommended_level', 'sessions_per_week', 'estimated_completion_weeks',
+            'tags', 'required_equipment', 'creator', 'creator_username',
+            'workouts_count', 'likes_count', 'forks_count', 'active_users_count',
+            'popularity', 'program_created_at', 'refreshed_at',
+        ]
+        read_only_fields = fields
+
 # Log Serializers - UNIFIED APPROACH
 class SetLogSerializer(serializers.ModelSerializer):
     based_on_instance_id = serializers.IntegerField(source='based_on_instance.id', read_only=True)
@@ -321,7 +386,7 @@ class ExerciseLogSerializer(serializers.ModelSerializer):
         
         return data
 
-class WorkoutLogSerializer(serializers.ModelSerializer):
+class WorkoutLogSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Unified serializer for WorkoutLog - handles create, read, and update"""
     exercises = ExerciseLogSerializer(many=True)
     
@@ -513,4 +578,25 @@ class WorkoutLogSerializer(serializers.ModelSerializer):
         # Refresh from db to get the updated instance with all relations
         return WorkoutLog.objects.prefetch_related(
             'exercises__sets', 'workout_partners'
-        ).get(id=instance.id)
\ No newline at end of file
+        ).get(id=instance.id)
+
+
+class WorkoutStreakSerializer(serializers.ModelSerializer):
+    """Streak and milestone counters for a user"""
+    active_streak = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WorkoutStreak
+        fields = [
+            'current_streak', 'active_streak', 'longest_streak',
+            'last_workout_date', 'total_completed', 'timezone', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    def get_active_streak(self, obj):
+        """Current streak, or 0 if it was broken before today in the user's timezone"""
+        from .streaks import get_zone
+        from django.utils import timezone
+
+        today = timezone.now().astimezone(get_zone(obj.timezone)).date()
+        return obj.active_streak(today)
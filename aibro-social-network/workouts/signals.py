@@ -1,43 +1,100 @@
 # workouts/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
-from .group_workouts import GroupWorkout, GroupWorkoutParticipant
-from .models import WorkoutLog
-from notifications.services import NotificationService
+from .group_workouts import GroupWorkout, GroupWorkoutParticipant, GroupWorkoutProposal
+from .group_workout_index import GroupWorkoutIndex
+from .models import WorkoutLog, WorkoutTemplate, Program, WorkoutInstance
+from .streaks import StreakTracker
+from .attribute_index import AttributeIndex
+from .proposal_votes import ProposalVoteService
+
+@receiver(pre_save, sender=WorkoutLog)
+def store_previous_workout_log_state(sender, instance, **kwargs):
+    """Remember the stored date/completed pair so streak updates can be applied as deltas"""
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = WorkoutLog.objects.filter(pk=instance.pk).values_list(
+            'date', 'completed'
+        ).first()
+
+
+@receiver(post_save, sender=WorkoutLog)
+def update_streak_on_workout_log_save(sender, instance, created, **kwargs):
+    """Keep the user's WorkoutStreak in sync with completed workout logs"""
+    previous = getattr(instance, '_previous_state', None)
+    previous_date, was_completed = previous if previous else (None, False)
+    date_changed = previous is not None and previous_date != instance.date
+
+    if was_completed and (not instance.completed or date_changed):
+        StreakTracker.remove_workout(instance.user_id, previous_date)
+
+    if instance.completed and (not was_completed or date_changed):
+        StreakTracker.record_workout(instance)
+
+
+@receiver(post_delete, sender=WorkoutLog)
+def update_streak_on_workout_log_delete(sender, instance, **kwargs):
+    """Roll back streak counters when a completed workout log is deleted"""
+    if instance.completed:
+        StreakTracker.remove_workout(instance.user_id, instance.date)
+
+
+@receiver(post_save, sender=WorkoutTemplate)
+@receiver(post_save, sender=Program)
+@receiver(post_save, sender=WorkoutInstance)
+def sync_attribute_index(sender, instance, **kwargs):
+    """Keep the tag/equipment index in line with the JSON fields"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not {'tags', 'equipment_required', 'required_equipment'} & set(update_fields):
+        return
+    AttributeIndex.sync(instance)
+
+
+@receiver(post_delete, sender=WorkoutTemplate)
+@receiver(post_delete, sender=Program)
+@receiver(post_delete, sender=WorkoutInstance)
+def remove_attribute_index(sender, instance, **kwargs):
+    AttributeIndex.remove(instance)
+
 
 @receiver(post_save, sender=GroupWorkout)
-def handle_group_workout_status(sender, instance, created, **kwargs):
-    """Auto-update status based on scheduled time"""
-    if not created and instance.status == 'scheduled':
-        # If the workout is past its scheduled time by more than 24 hours, mark as completed
-        if timezone.now() > (instance.scheduled_time + timezone.timedelta(hours=24)):
-            instance.status = 'completed'
-            instance.save(update_fields=['status'])
-            
-            # Create workout logs for participants
-            participants = instance.participants.filter(status='joined')
-            for participant in participants:
-                if instance.workout_template:
-                    workout_log = WorkoutLog.objects.create(
-                        user=participant.user,
-                        based_on_instance=instance.workout_template,
-                        program=instance.workout_template.program if instance.workout_template.program else None,
-                        name=instance.title,
-                        date=instance.scheduled_time,
-                        gym=instance.gym,
-                        notes=f"Auto-completed from group workout: {instance.title}",
-                        completed=True
-                    )
-                    
-                    # Update participant record
-                    participant.workout_log = workout_log
-                    participant.save()
-                    
-                    # Send notification
-                    NotificationService.create_notification(
-                        recipient=participant.user,
-                        notification_type='workout_completed',
-                        content=f"Group workout {instance.title} has been automatically marked as completed",
-                        related_object=workout_log
-                    )
\ No newline at end of file
+def index_group_workout_creator(sender, instance, created, **kwargs):
+    """The creator can always see their group workout"""
+    if created:
+        GroupWorkoutIndex.grant(instance.creator_id, instance.pk)
+
+
+@receiver(pre_save, sender=GroupWorkoutParticipant)
+def store_previous_participant_status(sender, instance, **kwargs):
+    instance._previous_status = None
+    if instance.pk:
+        instance._previous_status = GroupWorkoutParticipant.objects.filter(
+            pk=instance.pk
+        ).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=GroupWorkoutParticipant)
+def index_group_workout_participant(sender, instance, created, **kwargs):
+    """Keep the visibility index and the stored joined count in sync"""
+    if created:
+        GroupWorkoutIndex.grant(instance.user_id, instance.group_workout_id)
+
+    was_joined = getattr(instance, '_previous_status', None) == 'joined'
+    is_joined = instance.status == 'joined'
+    if was_joined != is_joined:
+        GroupWorkoutIndex.adjust_participants_count(instance.group_workout_id, 1 if is_joined else -1)
+
+
+@receiver(post_delete, sender=GroupWorkoutParticipant)
+def unindex_group_workout_participant(sender, instance, **kwargs):
+    GroupWorkoutIndex.revoke(instance.user_id, instance.group_workout_id)
+    if instance.status == 'joined':
+        GroupWorkoutIndex.adjust_participants_count(instance.group_workout_id, -1)
+
+
+@receiver(post_save, sender=GroupWorkoutProposal)
+@receiver(post_delete, sender=GroupWorkoutProposal)
+def invalidate_proposal_leader(sender, instance, **kwargs):
+    """A new or removed proposal can change which one leads"""
+    if kwargs.get('created', True):
+        ProposalVoteService.invalidate_leader(instance.group_workout_id)
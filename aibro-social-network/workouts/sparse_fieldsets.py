@@ -0,0 +1,79 @@
+# workouts/sparse_fieldsets.py
+import sys
+
+from django.utils.module_loading import import_string
+
+
+def parse_field_list(value):
+    """Split a comma separated query param into a set of field names"""
+    if not value:
+        return set()
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Lets callers trim and extend a serializer's output.
+
+    `fields` restricts the representation to the given names, `expand` adds
+    entries declared in `Meta.expandable_fields` as
+    `{name: (serializer_class_or_dotted_name, field_kwargs)}`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in set(expand or ()) & set(expandable):
+            serializer_class, field_kwargs = expandable[name]
+            if isinstance(serializer_class, str):
+                serializer_class = self._resolve_serializer(serializer_class)
+            self.fields[name] = serializer_class(**field_kwargs)
+
+        if fields:
+            # Expanded fields are always kept, otherwise ?expand= would need ?fields= too
+            allowed = set(fields) | set(expand or ())
+            for field_name in set(self.fields) - allowed:
+                self.fields.pop(field_name)
+
+    def _resolve_serializer(self, name):
+        if '.' in name:
+            return import_string(name)
+        return getattr(sys.modules[self.__class__.__module__], name)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Reads `?fields=a,b` and `?expand=c` on read requests and passes them to
+    serializers that support them.
+    """
+
+    def get_requested_fields(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return set()
+        return parse_field_list(request.query_params.get('fields'))
+
+    def get_requested_expand(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return set()
+        return parse_field_list(request.query_params.get('expand'))
+
+    def wants_field(self, name):
+        """Whether `name` will be rendered, so querysets can skip unneeded prefetches"""
+        fields = self.get_requested_fields()
+        return not fields or name in fields or name in self.get_requested_expand()
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, SparseFieldsetSerializerMixin):
+            fields = self.get_requested_fields()
+            expand = self.get_requested_expand()
+            if fields:
+                kwargs.setdefault('fields', fields)
+            if expand:
+                kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,189 @@
+# workouts/streaks.py
+import logging
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import WorkoutLog, WorkoutStreak
+
+logger = logging.getLogger(__name__)
+
+WORKOUT_MILESTONES = [10, 25, 50, 100, 200, 500, 1000]
+STREAK_MILESTONES = [3, 7, 14, 30, 60, 100]
+
+ONE_DAY = timedelta(days=1)
+
+
+def get_zone(tz_name):
+    """Resolve an IANA timezone name, falling back to the project timezone"""
+    try:
+        return ZoneInfo(tz_name or settings.TIME_ZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(settings.TIME_ZONE)
+
+
+def to_local_date(value, tz):
+    """Convert a WorkoutLog.date value (datetime, date or ISO string) to a local calendar day"""
+    if isinstance(value, str):
+        value = parse_datetime(value) or parse_date(value)
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        return value
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value.astimezone(tz).date()
+
+
+class StreakState:
+    """Running streak accumulator; days must be added in non-decreasing order"""
+    __slots__ = ('current', 'longest', 'last', 'total')
+
+    def __init__(self, current=0, longest=0, last=None, total=0):
+        self.current = current
+        self.longest = longest
+        self.last = last
+        self.total = total
+
+    def add(self, day):
+        self.total += 1
+        if self.last is not None and day <= self.last:
+            return
+        if self.last is not None and day - self.last == ONE_DAY:
+            self.current += 1
+        else:
+            self.current = 1
+        self.last = day
+        self.longest = max(self.longest, self.current)
+
+    def apply_to(self, streak):
+        streak.current_streak = self.current
+        streak.longest_streak = self.longest
+        streak.last_workout_date = self.last
+        streak.total_completed = self.total
+
+
+class StreakTracker:
+    """Keeps WorkoutStreak rows in sync with completed workout logs in constant time per change"""
+
+    @classmethod
+    def record_workout(cls, workout_log):
+        """Account for a newly completed workout log and fire any milestones it reaches"""
+        with transaction.atomic():
+            streak, _ = WorkoutStreak.objects.select_for_update().get_or_create(
+                user_id=workout_log.user_id
+            )
+            day = to_local_date(workout_log.date, get_zone(streak.timezone))
+            if day is None:
+                return
+
+            previous_current = streak.current_streak
+            state = StreakState(
+                streak.current_streak, streak.longest_streak,
+                streak.last_workout_date, streak.total_completed
+            )
+            run_start = state.last - timedelta(days=state.current - 1) if state.last else None
+
+            if state.last is None or day >= state.last or day >= run_start:
+                state.add(day)
+                state.apply_to(streak)
+            else:
+                # Back-dated log outside the current run: it may bridge older runs
+                cls._rebuild(streak)
+            streak.save()
+
+            reached_streak = streak.current_streak if streak.current_streak > previous_current else None
+            reached_count = streak.total_completed
+
+        transaction.on_commit(
+            lambda: cls._notify_milestones(workout_log, reached_count, reached_streak)
+        )
+        return streak
+
+    @classmethod
+    def remove_workout(cls, user_id, workout_date):
+        """Account for a completed workout log that was deleted, un-completed or re-dated"""
+        with transaction.atomic():
+            streak = WorkoutStreak.objects.select_for_update().filter(user_id=user_id).first()
+            if streak is None:
+                return
+
+            tz = get_zone(streak.timezone)
+            day = to_local_date(workout_date, tz)
+            streak.total_completed = max(streak.total_completed - 1, 0)
+
+            if day is not None and streak.last_workout_date and streak.current_streak:
+                run_start = streak.last_workout_date - timedelta(days=streak.current_streak - 1)
+                in_current_run = run_start <= day <= streak.last_workout_date
+                # An older run may be the one longest_streak counts
+                if in_current_run or streak.longest_streak > streak.current_streak:
+                    day_start = datetime.combine(day, time.min, tzinfo=tz)
+                    still_logged = WorkoutLog.objects.filter(
+                        user_id=user_id,
+                        completed=True,
+                        date__gte=day_start,
+                        date__lt=day_start + ONE_DAY
+                    ).exists()
+                    if not still_logged:
+                        # A run was broken; recompute this user's streaks from history
+                        cls._rebuild(streak)
+            streak.save()
+        return streak
+
+    @classmethod
+    def set_timezone(cls, user, tz_name):
+        """Change the day boundary used for a user's streaks and recompute them"""
+        try:
+            ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError, TypeError):
+            raise ValueError(f"Unknown timezone: {tz_name}")
+
+        with transaction.atomic():
+            streak, _ = WorkoutStreak.objects.select_for_update().get_or_create(user=user)
+            streak.timezone = tz_name
+            cls._rebuild(streak)
+            streak.save()
+        return streak
+
+    @classmethod
+    def _rebuild(cls, streak):
+        """Recompute all counters for one user from their completed logs"""
+        tz = get_zone(streak.timezone)
+        state = StreakState()
+        dates = WorkoutLog.objects.filter(
+            user_id=streak.user_id, completed=True
+        ).order_by('date').values_list('date', flat=True)
+        for value in dates.iterator():
+            state.add(to_local_date(value, tz))
+        state.apply_to(streak)
+
+    @classmethod
+    def _notify_milestones(cls, workout_log, workout_count, streak_days):
+        from notifications.services import NotificationService
+
+        try:
+            if workout_count in WORKOUT_MILESTONES:
+                NotificationService.create_notification(
+                    recipient=workout_log.user,
+                    notification_type='workout_milestone',
+                    related_object=workout_log,
+                    translation_params={
+                        'workout_count': workout_count,
+                        'milestone': workout_count,
+                    }
+                )
+            if streak_days in STREAK_MILESTONES:
+                NotificationService.create_notification(
+                    recipient=workout_log.user,
+                    notification_type='streak_milestone',
+                    related_object=workout_log,
+                    translation_params={
+                        'streak_days': streak_days,
+                    }
+                )
+        except Exception as e:
+            logger.error(f"Error sending milestone notifications for log {workout_log.id}: {e}")
@@ -18,43 +18,58 @@ logger = logging.getLogger(__name__)
 from .models import (
     WorkoutTemplate, ExerciseTemplate, SetTemplate,
     Program, WorkoutInstance, ExerciseInstance, SetInstance,
-    WorkoutLog, ExerciseLog, SetLog, ProgramShare
+    WorkoutLog, ExerciseLog, SetLog, ProgramShare, WorkoutStreak
 )
 from .serializers import (
     WorkoutTemplateSerializer, ExerciseTemplateSerializer, SetTemplateSerializer,
     ProgramSerializer, WorkoutInstanceSerializer, ExerciseInstanceSerializer,
     SetInstanceSerializer, ProgramShareSerializer,
-    WorkoutLogSerializer, ExerciseLogSerializer, SetLogSerializer
+    WorkoutLogSerializer, ExerciseLogSerializer, SetLogSerializer,
+    WorkoutStreakSerializer, ProgramSummarySerializer, ProgramCatalogEntrySerializer
 )
-
-class WorkoutInstanceViewSet(viewsets.ModelViewSet):
+from .sparse_fieldsets import SparseFieldsetViewMixin
+from .likes import ProgramLikeService
+from .catalog import ProgramCatalog, CATALOG_PAGE_TTL, count_subquery
+from .attribute_index import AttributeIndexFilter
+from django.core.cache import cache
+from .streaks import StreakTracker
+from users.counters import UserCounterService
+
+class WorkoutInstanceViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = WorkoutInstanceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [AttributeIndexFilter]
     
     def get_queryset(self):
-        return WorkoutInstance.objects.filter(
+        queryset = WorkoutInstance.objects.filter(
             program__creator=self.request.user
-        ).prefetch_related('exercises', 'exercises__sets')
+        )
+        if self.wants_field('exercises'):
+            queryset = queryset.prefetch_related('exercises', 'exercises__sets')
+        return queryset
 
     def perform_update(self, serializer):
         logger.info(f"Update data received: {self.request.data}")
         serializer.save()
 
 
-class WorkoutTemplateViewSet(viewsets.ModelViewSet):
+class WorkoutTemplateViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = WorkoutTemplateSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter, AttributeIndexFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['created_at', 'name']
 
     def get_queryset(self):
-        return WorkoutTemplate.objects.filter(
+        queryset = WorkoutTemplate.objects.filter(
             creator=self.request.user
-        ).prefetch_related(
-            'exercises',
-            'exercises__sets'
-        )
+        ).select_related('creator')
+        if self.wants_field('exercises'):
+            queryset = queryset.prefetch_related(
+                'exercises',
+                'exercises__sets'
+            )
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(creator=self.request.user)
@@ -139,23 +154,32 @@ class WorkoutTemplateViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-class ProgramViewSet(viewsets.ModelViewSet):
+class ProgramViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = ProgramSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [AttributeIndexFilter]
+    TREE_ACTIONS = ('retrieve', 'update', 'partial_update', 'toggle_active', 'fork')
 
     def get_queryset(self):
         filter_type = self.request.query_params.get('filter', 'all')
         user_id = self.request.query_params.get('user_id')
         
-        queryset = Program.objects.prefetch_related(
-            'workout_instances',
-            'workout_instances__exercises',
-            'workout_instances__exercises__sets',
-            'likes'
-        ).annotate(
-            likes_count=Count('likes', distinct=True),
-            forks_count=Count('forks', distinct=True)
+        # Subqueries, so forks and workouts are not joined into a forks x workouts row product
+        queryset = Program.objects.select_related('creator').annotate(
+            forks_count=count_subquery(Program.objects.all(), 'forked_from'),
+            workouts_count=count_subquery(WorkoutInstance.objects.all(), 'program')
         )
+
+        # The nested workout tree is only rendered on detail views or when expanded
+        renders_tree = self.action in self.TREE_ACTIONS
+        if (renders_tree and self.wants_field('workouts')) or 'workouts' in self.get_requested_expand():
+            queryset = queryset.prefetch_related(
+                'workout_instances',
+                'workout_instances__exercises',
+                'workout_instances__exercises__sets'
+            )
+        if (renders_tree and self.wants_field('shares')) or 'shares' in self.get_requested_expand():
+            queryset = queryset.prefetch_related('shares__shared_with')
         
         if filter_type == 'created':
             if user_id:
@@ -170,14 +194,69 @@ class ProgramViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(is_public=True)
             
         elif filter_type == 'all':
+            # Shares are matched through a subquery so no join/DISTINCT is needed
             queryset = queryset.filter(
-                Q(creator=self.request.user) | 
-                Q(shares__shared_with=self.request.user) |
+                Q(creator=self.request.user) |
+                Q(id__in=ProgramShare.objects.filter(
+                    shared_with=self.request.user
+                ).values('program_id')) |
                 Q(is_public=True)
-            ).distinct()
+            )
         
         return queryset
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProgramSummarySerializer
+        return ProgramSerializer
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        # discover pages hold catalog entries and resolve likes themselves
+        if page is not None and self.action == 'list':
+            self.liked_program_ids = ProgramLikeService.liked_program_ids(self.request.user, page)
+        return page
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        liked_program_ids = getattr(self, 'liked_program_ids', None)
+        if liked_program_ids is not None:
+            context['liked_program_ids'] = liked_program_ids
+        return context
+
+    @action(detail=False, methods=['get'])
+    def discover(self, request):
+        """
+        Ranked public programs from the discovery catalog.
+        Filters: focus, difficulty_level, sessions_per_week, tag (repeatable), equipment (repeatable).
+        Ordering: popular (default), recent, likes, forks, active.
+        """
+        cache_key = ProgramCatalog.page_cache_key(request.query_params)
+        payload = cache.get(cache_key)
+
+        if payload is None:
+            try:
+                queryset = ProgramCatalog.filter_entries(request.query_params)
+            except ValueError:
+                return Response(
+                    {"detail": "sessions_per_week must be an integer"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            page = self.paginate_queryset(queryset)
+            data = ProgramCatalogEntrySerializer(page, many=True).data
+            payload = self.get_paginated_response(data).data
+            cache.set(cache_key, payload, CATALOG_PAGE_TTL)
+
+        # Cached pages are shared between viewers, so like state is resolved per request
+        results = [dict(item) for item in payload['results']]
+        liked_ids = ProgramLikeService.liked_program_ids(
+            request.user, [item['id'] for item in results]
+        )
+        for item in results:
+            item['is_liked'] = item['id'] in liked_ids
+
+        return Response({**payload, 'results': results})
+
     def retrieve(self, request, *args, **kwargs):
         """Custom retrieve to ensure program active status is accurate"""
         instance = self.get_object()
@@ -434,19 +513,25 @@ class ProgramViewSet(viewsets.ModelViewSet):
             
             return Response(self.get_serializer(new_program).data, status=status.HTTP_201_CREATED)
 
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post', 'put', 'delete'])
     def like(self, request, pk=None):
+        """POST toggles the like, PUT likes and DELETE unlikes (both idempotent)"""
         program = self.get_object()
         user = request.user
-        
-        if user in program.likes.all():
-            program.likes.remove(user)
+
+        if request.method == 'PUT':
+            ProgramLikeService.like(program, user)
+            liked = True
+        elif request.method == 'DELETE':
+            ProgramLikeService.unlike(program, user)
             liked = False
         else:
-            program.likes.add(user)
-            liked = True
-            
-        return Response({'liked': liked})
+            liked = ProgramLikeService.toggle(program, user)
+
+        return Response({
+            'liked': liked,
+            'likes_count': ProgramLikeService.get_likes_count(program.pk)
+        })
 
     @action(detail=True, methods=['post'])
     def share(self, request, pk=None):
@@ -475,7 +560,7 @@ class ProgramViewSet(viewsets.ModelViewSet):
             )
 
 
-class WorkoutLogViewSet(viewsets.ModelViewSet):
+class WorkoutLogViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """Simplified WorkoutLog ViewSet using unified serializer"""
     serializer_class = WorkoutLogSerializer  # Single serializer for all operations
     permission_classes = [permissions.IsAuthenticated]
@@ -484,17 +569,17 @@ class WorkoutLogViewSet(viewsets.ModelViewSet):
     ordering = ['-date', '-created_at']
 
     def get_queryset(self):
-        return WorkoutLog.objects.filter(
+        queryset = WorkoutLog.objects.filter(
             # user=self.request.user
         ).select_related(
             'program',
             'based_on_instance',
-            'gym'
-        ).prefetch_related(
-            'exercises',
-            'exercises__sets',
-            'workout_partners'
-        )
+            'gym',
+            'user'
+        ).prefetch_related('workout_partners')
+        if self.wants_field('exercises'):
+            queryset = queryset.prefetch_related('exercises', 'exercises__sets')
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -663,6 +748,20 @@ class WorkoutLogViewSet(viewsets.ModelViewSet):
             'completion_rate': completed_workouts/total_workouts if total_workouts > 0 else 0
         })
 
+    @action(detail=False, methods=['get', 'patch'])
+    def streak(self, request):
+        """Get the current user's streak counters, or PATCH their timezone"""
+        if request.method == 'PATCH':
+            tz_name = request.data.get('timezone')
+            try:
+                streak = StreakTracker.set_timezone(request.user, tz_name)
+            except ValueError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            streak, _ = WorkoutStreak.objects.get_or_create(user=request.user)
+
+        return Response(WorkoutStreakSerializer(streak).data)
+
     @action(detail=False, methods=['get'])
     def with_partners(self, request):
         """Get workout logs where current user was a workout partner"""
@@ -686,25 +785,20 @@ from rest_framework.response import Response
 @permission_classes([IsAuthenticated])
 def get_workouts_count(request):
     """Get the count of workout logs for the current user"""
-    count = request.user.workout_logs.count()
+    count = UserCounterService.get(request.user.id)['workouts_count']
     return Response({"count": count})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_workouts_count(request, user_id):
     """Get the count of workout logs for a specific user"""
-    try:
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        user = User.objects.get(id=user_id)
-        count = WorkoutLog.objects.filter(user=user).count()
-        return Response({"count": count})
-    except User.DoesNotExist:
+    counts = UserCounterService.get_many([user_id]).get(user_id)
+    if counts is None:
         return Response(
             {"detail": "User not found"},
             status=status.HTTP_404_NOT_FOUND
         )
+    return Response({"count": counts['workouts_count']})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])